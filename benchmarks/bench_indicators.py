@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+"""
+times the public functions of investment/data/_indicator.py and investment/math_and_stats on synthetic histories
+(see synthetic.py), without the network
+
+    python benchmarks/bench_indicators.py --save baseline.json       # record a baseline
+    python benchmarks/bench_indicators.py --compare baseline.json    # exit code 1 if any timing regressed beyond --tolerance
+
+single-ticker functions run at each of --bars; the panel engine runs every registered indicator at each of --bars x --tickers,
+up to --max-cells bars x tickers; scalar functions run once per call
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import sys
+import timeit
+import types
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from synthetic import synthetic_history_df, synthetic_panel
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_modules():
+    """
+    import investment.math_and_stats and the computational modules of investment.data, without running investment/data/__init__.py,
+    which also imports yfinance and downloads the ticker lists
+    """
+    sys.path.insert(0, root_dir)
+    import investment
+    math_and_stats = importlib.import_module('investment.math_and_stats')
+    if 'investment.data' not in sys.modules:
+        package = types.ModuleType('investment.data')
+        package.__path__ = [os.path.join(root_dir, 'investment', 'data')]
+        sys.modules['investment.data'] = package
+    indicator = importlib.import_module('investment.data._indicator')
+    panel = importlib.import_module('investment.data._panel')
+    return indicator, panel, math_and_stats
+
+
+indicator, panel, math_and_stats = _load_modules()
+
+sweep_periods = list(range(5, 205, 5))
+
+
+def _series_benchmarks(history_df: pd.DataFrame, index_df: pd.DataFrame):
+    """
+    {name: callable} on a single ticker's history; index_df has no volume
+    """
+    high, low, close, volume = [history_df[column].to_numpy(dtype=float) for column in ['High', 'Low', 'Close', 'Volume']]
+    typical = (high + low + close) / 3
+    index_high, index_low, index_close, index_volume = [index_df[column].to_numpy(dtype=float) for column in ['High', 'Low', 'Close', 'Volume']]
+    codes = indicator.trend_indicator().ADX_codes(high_price=high, low_price=low, close_price=close)[6:] if close.shape[0] > 1 else None
+    returns = np.diff(np.log(close))
+    x = np.arange(close.shape[0], dtype=float)
+    benchmarks = {
+        'volatility_indicator.Bollinger_Band': lambda: indicator.volatility_indicator().Bollinger_Band(typical_price=typical),
+        'trend_indicator.true_range': lambda: indicator.trend_indicator().true_range(high_price=high, low_price=low, close_price=close),
+        'trend_indicator.ADX_codes': lambda: indicator.trend_indicator().ADX_codes(high_price=high, low_price=low, close_price=close),
+        'trend_indicator.ADX': lambda: indicator.trend_indicator().ADX(high_price=high, low_price=low, close_price=close),
+        'momentum_indicator.RSI': lambda: indicator.momentum_indicator().RSI(close_price=close),
+        'momentum_indicator.money_flow': lambda: indicator.momentum_indicator().money_flow(high_price=high, low_price=low, close_price=close, volume=volume),
+        'momentum_indicator.PPO': lambda: indicator.momentum_indicator().PPO(close_price=close),
+        'momentum_indicator.MACD': lambda: indicator.momentum_indicator().MACD(close_price=close),
+        'momentum_indicator.OBV': lambda: indicator.momentum_indicator().OBV(close_price=close, volume=volume),
+        'momentum_indicator.Z_price_vol': lambda: indicator.momentum_indicator().Z_price_vol(close_price=close, volume=volume),
+        'volume_indicator.accumulation_distribution': lambda: indicator.volume_indicator().accumulation_distribution(high_price=high, low_price=low, close_price=close, volume=volume),
+        'volume_indicator.PVI_NVI': lambda: indicator.volume_indicator().PVI_NVI(close_price=close, volume=volume),
+        'momentum_indicator.money_flow[no volume]': lambda: indicator.momentum_indicator().money_flow(high_price=index_high, low_price=index_low, close_price=index_close, volume=index_volume),
+        'momentum_indicator.OBV[no volume]': lambda: indicator.momentum_indicator().OBV(close_price=index_close, volume=index_volume),
+        'volume_indicator.accumulation_distribution[no volume]': lambda: indicator.volume_indicator().accumulation_distribution(high_price=index_high, low_price=index_low, close_price=index_close, volume=index_volume),
+        'volume_indicator.PVI_NVI[no volume]': lambda: indicator.volume_indicator().PVI_NVI(close_price=index_close, volume=index_volume),
+        'moving_average.smoothed': lambda: indicator.moving_average(periods=30).smoothed(close),
+        'moving_average.rma': lambda: indicator.moving_average(periods=30).rma(close),
+        'moving_average.exponential': lambda: indicator.moving_average(periods=30).exponential(close),
+        'moving_average.simple': lambda: indicator.moving_average(periods=30).simple(close),
+        f'indicator_sweep.exponential[{len(sweep_periods)}]': lambda: indicator.indicator_sweep().exponential(close, periods=sweep_periods),
+        f'indicator_sweep.smoothed[{len(sweep_periods)}]': lambda: indicator.indicator_sweep().smoothed(close, periods=sweep_periods),
+        f'indicator_sweep.simple[{len(sweep_periods)}]': lambda: indicator.indicator_sweep().simple(close, periods=sweep_periods),
+        f'indicator_sweep.RSI[{len(sweep_periods)}]': lambda: indicator.indicator_sweep().RSI(close, RSI_periods=sweep_periods),
+        'indicator_sweep.Bollinger_Band[10x3]': lambda: indicator.indicator_sweep().Bollinger_Band(typical, n_smoothing_days=range(10, 110, 10), n_std_dev=[1, 2, 3]),
+        'math_and_stats.sigmoid': lambda: math_and_stats.sigmoid(returns),
+        'math_and_stats.volatility.bs_call': lambda: math_and_stats.volatility().bs_call(S=close, K=100.0, T=0.5, r=0.02, vol=0.3),
+        'math_and_stats.volatility.bs_vega': lambda: math_and_stats.volatility().bs_vega(S=close, K=100.0, T=0.5, r=0.02, sigma=0.3),
+        'math_and_stats.Cubic_Spline_Approximation_Smoothing': lambda: math_and_stats.Cubic_Spline_Approximation_Smoothing(y=close, x=x, smooth=0.9),
+    }
+    if codes is not None:
+        benchmarks['trend_indicator.trend_labels'] = lambda: indicator.trend_indicator().trend_labels(*codes)
+    if close.shape[0] <= 10_000: # LOWESS is quadratic in the number of bars at a fixed frac
+        benchmarks['math_and_stats.Locally_Weighted_Scatterplot_Smoothing'] = lambda: math_and_stats.Locally_Weighted_Scatterplot_Smoothing(y=close, x=x, frac=0.1)
+    return benchmarks
+
+
+def _scalar_benchmarks():
+    def _quiet(function):
+        def _call():
+            with contextlib.redirect_stdout(io.StringIO()): # the z tests print their results
+                return function()
+        return _call
+    return {
+        'math_and_stats.probability.p_A_given_B': lambda: math_and_stats.probability().p_A_given_B(p_B_given_A=0.8, p_A=0.1, p_B=0.2),
+        'math_and_stats.volatility.implied_volatility': lambda: math_and_stats.volatility().implied_volatility(12.0, 100.0, 95.0, 0.5, 0.02),
+        'math_and_stats.one_sample_proportion_z_test': _quiet(lambda: math_and_stats.one_sample_proportion_z_test(0.19, 0.07, 124)),
+        'math_and_stats.two_sample_proportion_z_test': _quiet(lambda: math_and_stats.two_sample_proportion_z_test(41, 351, 195, 605)),
+        'math_and_stats.chisq_test': lambda: math_and_stats.chisq_test(41, 351),
+    }
+
+
+def _time(function, repeat: int):
+    """
+    best seconds per call of repeat rounds, each long enough (>= 0.2s, or a single call) to be timed reliably
+    """
+    function() # warm-up, e.g., numba compilation
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(bars, tickers, repeat: int = 3, max_cells: int = 5_000_000, seed: int = 0, only: str = None):
+    """
+    returns the list of {'name', 'n_bars', 'n_tickers', 'seconds'}
+    only: run the benchmarks whose name contains this
+    """
+    results = []
+    def _record(name, n_bars, n_tickers, function):
+        if (only is not None) and (only not in name):
+            return
+        seconds = _time(function, repeat=repeat)
+        results.append({'name': name, 'n_bars': n_bars, 'n_tickers': n_tickers, 'seconds': seconds})
+        print(f"{name:<60} {n_bars:>8} bars x {n_tickers:>5} tickers: {seconds*1e3:12.3f} ms")
+    for name, function in _scalar_benchmarks().items():
+        _record(name, 1, 1, function)
+    for n_bars in bars:
+        history_df = synthetic_history_df(n_bars=n_bars, seed=seed, gap_fraction=0.001)
+        index_df = synthetic_history_df(n_bars=n_bars, seed=seed+1, zero_volume=True)
+        for name, function in _series_benchmarks(history_df, index_df).items():
+            _record(name, n_bars, 1, function)
+    engine = panel.panel_engine()
+    for n_bars in bars:
+        for n_tickers in tickers:
+            if n_bars * n_tickers > max_cells:
+                print(f"Skipping the panel of {n_bars} bars x {n_tickers} tickers (> {max_cells} cells)")
+                continue
+            if (only is not None) and not any(only in f"panel_engine.{name}" for name in engine.indicators):
+                continue
+            dates, ticker_names, values = synthetic_panel(n_bars=n_bars, n_tickers=n_tickers, seed=seed)
+            ohlcv = panel.ohlcv_panel(dates=dates, tickers=ticker_names, values=values)
+            for name in engine.indicators:
+                _record(f"panel_engine.{name}", n_bars, n_tickers, lambda name=name: engine.compute(ohlcv, name))
+    return results
+
+
+def compare(results, baseline_results, tolerance: float):
+    """
+    returns the regressions, i.e., the timings over tolerance x their baseline; benchmarks missing from either side are ignored
+    """
+    baseline = {(item['name'], item['n_bars'], item['n_tickers']): item['seconds'] for item in baseline_results}
+    regressions = []
+    for item in results:
+        key = (item['name'], item['n_bars'], item['n_tickers'])
+        if key in baseline and item['seconds'] > tolerance * baseline[key]:
+            regressions.append(dict(item, baseline_seconds=baseline[key], ratio=item['seconds']/baseline[key]))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="benchmark the indicators and math_and_stats on synthetic OHLCV histories")
+    parser.add_argument('--bars', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--tickers', type=int, nargs='+', default=[1, 100, 5_000])
+    parser.add_argument('--max-cells', type=int, default=5_000_000, help="largest panel (bars x tickers) to run")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', default=None, help="run the benchmarks whose name contains this")
+    parser.add_argument('--backend', default=None, choices=indicator.backends)
+    parser.add_argument('--dtype-policy', default=None, choices=indicator.dtype_policies)
+    parser.add_argument('--save', default=None, help="write the results to this JSON file")
+    parser.add_argument('--compare', default=None, help="compare with the results of this JSON file")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="a timing over tolerance x its baseline is a regression")
+    args = parser.parse_args(args)
+    if args.backend is not None:
+        indicator.set_backend(args.backend)
+    if args.dtype_policy is not None:
+        indicator.set_dtype_policy(args.dtype_policy)
+    results = run(bars=args.bars, tickers=args.tickers, repeat=args.repeat, max_cells=args.max_cells, seed=args.seed, only=args.only)
+    if args.save is not None:
+        meta = {'date': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(), 'platform': platform.platform(),
+                'processor': platform.processor(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                'backend': indicator.get_backend(), 'dtype_policy': indicator.get_dtype_policy(), 'seed': args.seed}
+        with open(args.save, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=1)
+        print(f"Saved {len(results)} timings to {args.save}")
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], tolerance=args.tolerance)
+        for item in regressions:
+            print(f"Regression: {item['name']} at {item['n_bars']} bars x {item['n_tickers']} tickers: {item['seconds']*1e3:.3f} ms vs. {item['baseline_seconds']*1e3:.3f} ms ({item['ratio']:.2f}x)")
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance}x of {args.compare}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+"""
+deterministic synthetic OHLCV histories, so that the benchmarks need neither the network nor the data cache
+"""
+
+import numpy as np
+import pandas as pd
+
+# business days from here stay within datetime64[ns] (year 2262) even for 100k bars (~383 years)
+first_date = '1800-01-01'
+
+
+def synthetic_ohlcv(n_bars: int, n_tickers: int = 1, seed: int = 0,
+                    start_price: float = 100.0, drift: float = 0.05, volatility = None,
+                    zero_volume_fraction: float = 0.0, gap_fraction: float = 0.0, late_listing_fraction: float = 0.0):
+    """
+    returns n_bars x n_tickers x 5 (Open, High, Low, Close, Volume), as ohlcv_panel's values
+
+    Close: geometric Brownian motion at an annual drift and volatility (by default drawn per ticker in [0.15, 0.60]), 252 bars a year
+    Open: the previous close with an overnight gap; High/Low: beyond max/min(Open, Close); prices rounded to cents, as quoted,
+          with a floor of one cent, as GBM paths over many decades can fall to fractions of a cent
+    Volume: log-normal around 1M shares, higher on large moves; 0 for the zero_volume_fraction of the tickers (e.g., the indices)
+    gap_fraction: the fraction of the bars missing (NaN), e.g., trading halts
+    late_listing_fraction: the fraction of the tickers listed after the first date (NaN before), by up to half of the bars
+    """
+    rng = np.random.default_rng(seed)
+    if volatility is None:
+        volatility = rng.uniform(0.15, 0.60, size=n_tickers)
+    volatility = np.broadcast_to(np.asarray(volatility, dtype=float), (n_tickers,))
+    daily_sigma = volatility / np.sqrt(252)
+    log_returns = (drift - 0.5 * volatility**2) / 252 + daily_sigma * rng.standard_normal(size=(n_bars, n_tickers))
+    close = start_price * np.exp(np.cumsum(log_returns, axis=0))
+    overnight = np.exp(0.25 * daily_sigma * rng.standard_normal(size=(n_bars, n_tickers)))
+    open_ = np.concatenate([np.full(shape=(1, n_tickers), fill_value=start_price), close[:-1]], axis=0) * overnight
+    high = np.maximum(open_, close) * np.exp(0.5 * daily_sigma * np.abs(rng.standard_normal(size=(n_bars, n_tickers))))
+    low = np.minimum(open_, close) * np.exp(-0.5 * daily_sigma * np.abs(rng.standard_normal(size=(n_bars, n_tickers))))
+    volume = np.floor(1e6 * np.exp(0.5 * rng.standard_normal(size=(n_bars, n_tickers))) * (1 + 20 * np.abs(log_returns)))
+    volume[:, rng.random(size=n_tickers) < zero_volume_fraction] = 0
+    prices = [np.maximum(np.round(price, 2), 0.01) for price in (open_, high, low, close)]
+    values = np.stack(prices + [volume], axis=2)
+    values[rng.random(size=(n_bars, n_tickers)) < gap_fraction] = np.nan
+    for ticker in np.flatnonzero(rng.random(size=n_tickers) < late_listing_fraction):
+        values[:rng.integers(1, max(2, n_bars // 2)), ticker] = np.nan
+    return values
+
+
+def synthetic_dates(n_bars: int):
+    return pd.bdate_range(start=first_date, periods=n_bars)
+
+
+def synthetic_history_df(n_bars: int, seed: int = 0, zero_volume: bool = False, gap_fraction: float = 0.0, **kwargs):
+    """
+    a single ticker's history as downloaded (Date, Open, High, Low, Close, Volume), the missing bars being dropped,
+    so the dates skip them
+    """
+    values = synthetic_ohlcv(n_bars=n_bars, n_tickers=1, seed=seed, zero_volume_fraction=float(zero_volume), gap_fraction=gap_fraction, **kwargs)[:, 0, :]
+    history_df = pd.DataFrame(values, columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+    history_df.insert(0, 'Date', synthetic_dates(n_bars))
+    history_df = history_df.dropna().reset_index(drop=True)
+    history_df['Volume'] = history_df['Volume'].astype(np.int64)
+    return history_df
+
+
+def synthetic_panel(n_bars: int, n_tickers: int, seed: int = 0, zero_volume_fraction: float = 0.05, gap_fraction: float = 0.001, late_listing_fraction: float = 0.2):
+    """
+    returns dates, tickers, values, i.e., the arguments of ohlcv_panel(); by default a universe with a few indices (no volume),
+    rare halts and a fifth of the tickers listed late
+    """
+    values = synthetic_ohlcv(n_bars=n_bars, n_tickers=n_tickers, seed=seed, zero_volume_fraction=zero_volume_fraction, gap_fraction=gap_fraction, late_listing_fraction=late_listing_fraction)
+    return synthetic_dates(n_bars), [f"T{idx:05d}" for idx in range(n_tickers)], values
@@ -4,10 +4,23 @@
 #
 #  License: LGPL-3.0
 
-from ._data import test, test_data, get_ticker_data_dict, get_formatted_ticker_data, timedata, risk_free_interest_rate
-from ._indicator import volatility_indicator, trend_indicator, momentum_indicator, volume_indicator, moving_average
+from ._data import test, test_data, get_ticker_data_dict, wait_for_persist, refresh_ticker_histories, download_tickers, apply_history_dtype_policy, get_formatted_ticker_data, timedata, risk_free_interest_rate
+from ._indicator import volatility_indicator, trend_indicator, momentum_indicator, volume_indicator, moving_average, set_output_mode, get_output_mode, set_backend, get_backend, set_dtype_policy, get_dtype_policy, indicator_sweep
+from ._cache import indicator_cache, global_indicator_cache
+from ._summary import compute_ticker_summary, get_ticker_summary_dict
+from ._storage import history_storage, csv_history_storage, parquet_history_storage, feather_history_storage, register_history_storage, set_history_storage, get_history_storage, read_history_df, write_history_df
+from ._scheduler import download_scheduler, download_task, download_cancelled, throttle, set_host_rate_limit
+from ._retry import retry_policy, circuit_breaker, retryable_error, global_retry_policy
+from ._pipeline import indicator_pipeline
+from ._streaming import ema_state, rma_state, smma_state, rsi_state, obv_state, accumulation_distribution_state, PVI_NVI_state, streaming_indicators
+from ._panel import ohlcv_panel, panel_engine
 from ._ticker import tickers_with_no_volume, tickers_with_no_PT, ticker_group_dict, subgroup_group_dict, ticker_subgroup_dict, group_desc_dict, Ticker, global_data_root_dir, nasdaqlisted_df, otherlisted_df, ARK_df_dict, tradable_tickers, IOO_df
 
-__all__ = ["test", "test_data", "get_ticker_data_dict", "get_formatted_ticker_data", "timedata", "risk_free_interest_rate",
-           "volatility_indicator", "trend_indicator", "momentum_indicator", "volume_indicator", "moving_average",
+__all__ = ["test", "test_data", "get_ticker_data_dict", "wait_for_persist", "refresh_ticker_histories", "download_tickers", "apply_history_dtype_policy", "get_formatted_ticker_data", "timedata", "risk_free_interest_rate",
+           "volatility_indicator", "trend_indicator", "momentum_indicator", "volume_indicator", "moving_average", "set_output_mode", "get_output_mode", "set_backend", "get_backend", "set_dtype_policy", "get_dtype_policy", "indicator_sweep",
+           "indicator_cache", "global_indicator_cache", "compute_ticker_summary", "get_ticker_summary_dict",
+           "history_storage", "csv_history_storage", "parquet_history_storage", "feather_history_storage", "register_history_storage", "set_history_storage", "get_history_storage", "read_history_df", "write_history_df",
+           "download_scheduler", "download_task", "download_cancelled", "throttle", "set_host_rate_limit", "retry_policy", "circuit_breaker", "retryable_error", "global_retry_policy", "indicator_pipeline",
+           "ema_state", "rma_state", "smma_state", "rsi_state", "obv_state", "accumulation_distribution_state", "PVI_NVI_state", "streaming_indicators",
+           "ohlcv_panel", "panel_engine",
            "tickers_with_no_volume", "tickers_with_no_PT", "ticker_group_dict", "subgroup_group_dict", "ticker_subgroup_dict", "group_desc_dict", "Ticker", "global_data_root_dir", "nasdaqlisted_df", "otherlisted_df", "ARK_df_dict", "tradable_tickers", "IOO_df"]
\ No newline at end of file
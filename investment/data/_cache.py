@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def _n_bytes(value):
+    """
+    approximate memory footprint of an indicator result (arrays, Series/DataFrames, and lists/tuples/dicts of them)
+    """
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return value.nbytes + sum(sys.getsizeof(item) for item in value.ravel())
+        return value.nbytes
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return int(np.sum(value.memory_usage(index=True, deep=True)))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_n_bytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_n_bytes(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+class indicator_cache(object):
+    def __init__(self, max_bytes: int = 256 * 1024**2):
+        """
+        in-memory LRU cache of indicator results, evicting the least recently used entries once max_bytes is exceeded
+
+        an entry is keyed by ticker, a fingerprint of the history it was computed from (row count and last date), the indicator name
+        and its parameters, so that a redownloaded (or truncated) history never hits a stale entry
+
+        the cached values are shared among callers and must not be modified in place
+        """
+        super().__init__()
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> (value, n_bytes)
+        self._n_bytes = 0
+        self._lock = threading.Lock() # the GUI computes indicators from QThreads as well
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def history_fingerprint(history_df: pd.DataFrame):
+        n_rows = len(history_df.index)
+        last_date = str(history_df['Date'].iloc[-1]) if n_rows > 0 else None
+        return hash((n_rows, last_date))
+
+    def key(self, ticker: str, history_df: pd.DataFrame, indicator: str, **params):
+        from ._indicator import get_output_mode, get_dtype_policy
+        return (_ticker_key(ticker), self.history_fingerprint(history_df), indicator, tuple(sorted(params.items())), get_output_mode(), get_dtype_policy()) # the same results are represented differently per output mode and dtype policy
+
+    def get_or_compute(self, ticker: str, history_df: pd.DataFrame, indicator: str, compute, **params):
+        """
+        compute: callable without arguments, only evaluated on a cache miss
+        params: the indicator parameters that compute() was built with, e.g., RSI_periods=14
+        """
+        key = self.key(ticker, history_df, indicator, **params)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        n_bytes = _n_bytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._n_bytes -= self._entries.pop(key)[1]
+            if n_bytes > self.max_bytes:
+                return # too large to be cached at all
+            self._entries[key] = (value, n_bytes)
+            self._n_bytes += n_bytes
+            while self._n_bytes > self.max_bytes:
+                _, (_, evicted_n_bytes) = self._entries.popitem(last=False)
+                self._n_bytes -= evicted_n_bytes
+
+    def invalidate(self, ticker: str = None):
+        """
+        drop all the entries of a ticker, or everything if ticker is None
+        """
+        with self._lock:
+            for key in [key for key in self._entries.keys() if (ticker is None) or (key[0] == _ticker_key(ticker))]:
+                self._n_bytes -= self._entries.pop(key)[1]
+
+    @property
+    def n_bytes(self):
+        return self._n_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _ticker_key(ticker: str):
+    return ticker.upper() if isinstance(ticker, str) else ticker # 'aapl' and 'AAPL' are one ticker, as in get_ticker_data_dict()
+
+
+global_indicator_cache = indicator_cache()
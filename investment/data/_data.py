@@ -17,7 +17,12 @@ import shutil
 from urllib.request import urlopen
 import base64
 
+import re
 import time
+import threading
+
+from ._scheduler import throttle, download_cancelled, download_scheduler
+from ._retry import global_retry_policy, retryable_error, _throttled_pattern
 
 from functools import total_ordering
 
@@ -172,7 +177,27 @@ def gradient_test():
 # references:
 # https://www.quora.com/Using-Python-whats-the-best-way-to-get-stock-data
 
-def download_ticker_history_df(ticker: str = None, verbose: bool = True, download_today_data: bool = False, auto_retry: bool = False):
+# yf.download() collects its results in module globals (yf.shared), so concurrent downloads, e.g., of a download_scheduler's workers,
+# take turns; the info dicts, most of the requests, are downloaded concurrently
+_yf_download_lock = threading.Lock()
+
+# an HTTP status of throttling or of a server error as a whole word (not in, e.g., the epoch times of a no-data message), or a rate-limit phrase
+def _raise_if_throttled(tickers: list):
+    """
+    yf.download() reports the failure of a ticker in yf.shared._ERRORS instead of raising it: a throttled (or failed) request
+    is raised as a retryable_error, as the other failures (e.g., a delisted ticker) are not to be retried
+    """
+    yf_errors = getattr(getattr(yf, 'shared', None), '_ERRORS', {})
+    for ticker in tickers:
+        message = str(yf_errors.get(ticker, ''))
+        if _throttled_pattern.search(message):
+            raise retryable_error(f"[{ticker}] {message}")
+
+
+def download_ticker_history_df(ticker: str = None, verbose: bool = True, download_today_data: bool = False, auto_retry: bool = False, start: str = None):
+    """
+    start: '%Y-%m-%d' of the first bar to download; by default, the whole history
+    """
     if ticker is None:
         raise ValueError("Error: ticker cannot be None")
 
@@ -185,32 +210,27 @@ def download_ticker_history_df(ticker: str = None, verbose: bool = True, downloa
     
     ####################################################################################################
     if verbose:
-        print(f"\n<--- Try to download history of [{ticker}] from yfinance, end_datetime: [{end_datetime}]")
+        print(f"\n<--- Try to download history of [{ticker}] from yfinance, start: [{start}], end_datetime: [{end_datetime}]")
 
-    successful_download = False
-    retry_times = 5
-    while not successful_download and retry_times>=0:
-        try:
-            df = yf.download(tickers=ticker, start=None, end=end_datetime, auto_adjust=True, actions=True)
-            df.drop_duplicates(inplace = True)
-            successful_download = True
-        except:
-            successful_download = False
-            retry_times -= 1
-            if auto_retry:
-                print(f"Download unsuccessful. ticker = {ticker}. Trying in 5 seconds: ", end='')
-                for seconds in range(5,0,-1):
-                    print(f"{seconds}...", end='')
-                    time.sleep(1)
-            else:
-                print(f"Warning: Download unsuccessful. ticker = {ticker}. No auto retrying.")
-                break
+    def _download():
+        throttle('yahoo.com')
+        with _yf_download_lock:
+            df = yf.download(tickers=ticker, start=start, end=end_datetime, auto_adjust=True, actions=True)
+            _raise_if_throttled([ticker])
+        return df.drop_duplicates()
+
+    try:
+        df = global_retry_policy.call(_download, host = 'yahoo.com', name = f"history of [{ticker}]", max_retries = None if auto_retry else 0, verbose = verbose)
+    except download_cancelled:
+        raise
+    except Exception as error:
+        print(f"Warning: Download unsuccessful. ticker = {ticker}. {'Max. retry times reached' if auto_retry else 'No auto retrying'}: {error}")
+        if verbose:
+            print('Unsuccessful download. Download aborted --->')
+        raise
 
     if verbose:
-        if successful_download == False and retry_times<0:
-            print('Max. retry times reached. Unsuccessful download. Download aborted --->')
-        else:
-            print('Download completed --->')
+        print('Download completed --->')
     ####################################################################################################
 
     df.reset_index(level=0, inplace=True) # convert Date from index to a column
@@ -219,6 +239,63 @@ def download_ticker_history_df(ticker: str = None, verbose: bool = True, downloa
     return df
 
 
+def download_ticker_history_delta_df(ticker: str = None, curr_df: pd.DataFrame = None, n_overlap: int = 6, verbose: bool = True, download_today_data: bool = False, auto_retry: bool = False):
+    """
+    the cached raw history curr_df extended with the bars after it, downloading only from its last n_overlap bars on
+
+    the overlapping bars (except the last cached one, possibly of an incomplete day) must have the cached closes, otherwise the history
+    has been re-adjusted since (auto_adjust=True, e.g., for a split or a dividend) and the whole history is downloaded instead
+    """
+    from ._storage import _utc_dates
+    n_overlap = min(n_overlap, len(curr_df.index))
+    if n_overlap < 2:
+        return download_ticker_history_df(ticker = ticker, verbose = verbose, download_today_data = download_today_data, auto_retry = auto_retry)
+    delta_df = download_ticker_history_df(ticker = ticker, verbose = verbose, download_today_data = download_today_data, auto_retry = auto_retry, start = curr_df['Date'].iloc[-n_overlap].strftime('%Y-%m-%d'))
+    delta_df['Date'] = _utc_dates(delta_df['Date'])
+    extended_df = _extended_history_df(curr_df, delta_df)
+    if extended_df is not None:
+        if verbose:
+            print(f"The overlap of [{ticker}] agrees with the cache: {(delta_df['Date'] > curr_df['Date'].iloc[-1]).sum()} new bar(s) appended")
+        return extended_df
+    if verbose:
+        print(f"The overlap of [{ticker}] disagrees with the cache (a re-adjusted history), downloading the whole history")
+    return download_ticker_history_df(ticker = ticker, verbose = verbose, download_today_data = download_today_data, auto_retry = auto_retry)
+
+
+def _extended_history_df(curr_df: pd.DataFrame, delta_df: pd.DataFrame):
+    """
+    curr_df extended with delta_df (both with Date as UTC datetimes), downloaded from one of its last bars on;
+    None if the overlapping bars (except the last cached one) do not have the cached closes, i.e., a re-adjusted history
+    """
+    if len(delta_df.index) == 0:
+        return None
+    n_overlap = (curr_df['Date'] >= delta_df['Date'].iloc[0]).sum()
+    cached_df = curr_df[['Date','Close']].iloc[-n_overlap:-1] if n_overlap > 0 else curr_df[['Date','Close']].iloc[0:0]
+    overlap_df = cached_df.merge(delta_df[['Date','Close']], on='Date', suffixes=('_cached', '_new'))
+    if (len(cached_df.index) > 0) and (len(overlap_df.index) == len(cached_df.index)) and np.allclose(overlap_df['Close_cached'], overlap_df['Close_new'], rtol=1e-5, atol=0):
+        return pd.concat([curr_df[curr_df['Date'] < delta_df['Date'].iloc[0]], delta_df], ignore_index=True)
+    return None
+
+
+def _history_coverage_issue(curr_df: pd.DataFrame, new_df: pd.DataFrame):
+    """
+    why the redownloaded new_df should not replace the cached curr_df, None if it has a wider date coverage
+    """
+    curr_first_date = curr_df['Date'].iloc[0].date()
+    curr_last_date = curr_df['Date'].iloc[-1].date()
+
+    new_first_date = pd.Timestamp(new_df['Date'].iloc[0]).date() # '%Y-%m-%d' if downloaded, UTC datetimes if extended
+    new_last_date = pd.Timestamp(new_df['Date'].iloc[-1]).date()
+
+    if (curr_df.shape[0] - new_df.shape[0]) > 100:
+        return f"The redownloaded df's rows [n={new_df.shape[0]}] are so much fewer (#<100) than that of the current one [n={curr_df.shape[0]}]"
+    elif (curr_first_date - new_first_date) < timedelta(days=0):
+        return "The redownloaded df has a more recent start date, compared to the current one"
+    elif (curr_last_date - new_last_date) > timedelta(days=0):
+        return "The redownloaded df has an older end date, compared to the current one"
+    return None
+
+
 def download_ticker_info_dict(ticker: str = None, verbose: bool = True, auto_retry: bool = False, web_scraper = None, download_short_interest: bool = False):
 
     if ticker is None:
@@ -234,81 +311,83 @@ def download_ticker_info_dict(ticker: str = None, verbose: bool = True, auto_ret
 
     ####################################################################
 
-    successful_download = False
-    retry_times = 5
-    while not successful_download and retry_times>=0:
-        try:
-            try:
-                info_dict['info'] = this_ticker.info
-            except:
-                info_dict['info'] = None
-
-            info_dict['info']['logo'] = None
-            if 'logo_url' in info_dict['info'].keys():
-                if info_dict['info']['logo_url'] is not None:
-                    try:
-                        page = urlopen(info_dict['info']['logo_url'])
-                        info_dict['info']['logo'] = bytearray(page.read())
-                    except:
-                        pass
-
-            if not 'sector' in info_dict['info'].keys():
-                info_dict['info']['sector'] = None
-
-            if not 'industry' in info_dict['info'].keys():
-                info_dict['info']['industry'] = None    
-                
-            info_dict['actions']                   = this_ticker.actions
-            info_dict['dividends']                 = this_ticker.dividends
-            info_dict['splits']                    = this_ticker.splits
-            info_dict['financials']                = this_ticker.financials
-            info_dict['quarterly_financials']      = this_ticker.quarterly_financials
-            info_dict['major_holders']             = this_ticker.major_holders
-            info_dict['institutional_holders']     = this_ticker.institutional_holders
-            info_dict['balance_sheet']             = this_ticker.balance_sheet
-            info_dict['quarterly_balance_sheet']   = this_ticker.quarterly_balance_sheet
-            info_dict['cashflow']                  = this_ticker.cashflow
-            info_dict['quarterly_cashflow']        = this_ticker.quarterly_cashflow
-            info_dict['earnings']                  = this_ticker.earnings
-            info_dict['quarterly_earnings']        = this_ticker.quarterly_earnings
-            info_dict['sustainability']            = this_ticker.sustainability
-            info_dict['recommendations']           = this_ticker.recommendations
-            info_dict['calendar']                  = this_ticker.calendar
-            info_dict['isin']                      = this_ticker.isin
-            try:
-                info_dict['options']               = this_ticker.options # expiration dates
-                info_dict['option_chain_dict']     = {}
-                for this_expiration_date in this_ticker.options:
-                    opt = this_ticker.option_chain(this_expiration_date)
-                    opt_calls = opt.calls
-                    opt_puts = opt.puts
-                    opt_calls['type'] = 'calls'
-                    opt_puts['type'] = 'puts'
-                    opt_combined = pd.concat([opt_calls, opt_puts], axis=0)
-                    info_dict['option_chain_dict'][this_expiration_date] = opt_combined
-            except:
-                info_dict['options']               = None
-                info_dict['option_chain_dict']     = {}
+    def _download_info():
+        throttle('yahoo.com')
+        info = this_ticker.info
+        if not info: # e.g., a delisted ticker, not to be retried
+            print(f"Warning: no info of ticker = {ticker}")
+            info_dict['info'] = None
+            return
+        info_dict['info'] = info
+
+        info_dict['info']['logo'] = None
+        if 'logo_url' in info_dict['info'].keys():
+            if info_dict['info']['logo_url'] is not None:
+                try:
+                    throttle(info_dict['info']['logo_url'])
+                    page = urlopen(info_dict['info']['logo_url'])
+                    info_dict['info']['logo'] = bytearray(page.read())
+                except (OSError, ValueError): # the logo is optional
+                    pass
 
-            successful_download = True
+        if not 'sector' in info_dict['info'].keys():
+            info_dict['info']['sector'] = None
 
-        except:
-            successful_download = False
-            retry_times -= 1
-            if auto_retry:
-                print(f"Download unsuccessful. ticker = {ticker}. Trying in 5 seconds: ", end='')
-                for seconds in range(5,0,-1):
-                    print(f"{seconds}...", end='')
-                    time.sleep(1)
-            else:
-                print(f"Warning: Download unsuccessful. ticker = {ticker}. No auto retrying.")
-                break
+        if not 'industry' in info_dict['info'].keys():
+            info_dict['info']['industry'] = None    
+            
+        throttle('yahoo.com') # the history, for the actions
+        info_dict['actions']                   = this_ticker.actions
+        info_dict['dividends']                 = this_ticker.dividends
+        info_dict['splits']                    = this_ticker.splits
+        throttle('yahoo.com') # the fundamentals, for the financials and the following
+        info_dict['financials']                = this_ticker.financials
+        info_dict['quarterly_financials']      = this_ticker.quarterly_financials
+        info_dict['major_holders']             = this_ticker.major_holders
+        info_dict['institutional_holders']     = this_ticker.institutional_holders
+        info_dict['balance_sheet']             = this_ticker.balance_sheet
+        info_dict['quarterly_balance_sheet']   = this_ticker.quarterly_balance_sheet
+        info_dict['cashflow']                  = this_ticker.cashflow
+        info_dict['quarterly_cashflow']        = this_ticker.quarterly_cashflow
+        info_dict['earnings']                  = this_ticker.earnings
+        info_dict['quarterly_earnings']        = this_ticker.quarterly_earnings
+        info_dict['sustainability']            = this_ticker.sustainability
+        info_dict['recommendations']           = this_ticker.recommendations
+        info_dict['calendar']                  = this_ticker.calendar
+        info_dict['isin']                      = this_ticker.isin
+        try:
+            info_dict['options']               = this_ticker.options # expiration dates
+            info_dict['option_chain_dict']     = {}
+            for this_expiration_date in this_ticker.options:
+                throttle('yahoo.com')
+                opt = this_ticker.option_chain(this_expiration_date)
+                opt_calls = opt.calls
+                opt_puts = opt.puts
+                opt_calls['type'] = 'calls'
+                opt_puts['type'] = 'puts'
+                opt_combined = pd.concat([opt_calls, opt_puts], axis=0)
+                info_dict['option_chain_dict'][this_expiration_date] = opt_combined
+        except download_cancelled:
+            raise
+        except Exception: # e.g., no options
+            info_dict['options']               = None
+            info_dict['option_chain_dict']     = {}
+
+    try:
+        global_retry_policy.call(_download_info, host = 'yahoo.com', name = f"info of [{ticker}]", max_retries = None if auto_retry else 0, verbose = verbose)
+        successful_download = True
+    except download_cancelled:
+        raise
+    except Exception as error:
+        successful_download = False
+        info_dict.setdefault('info', None)
+        print(f"Warning: Download unsuccessful. ticker = {ticker}. {'Max. retry times reached' if auto_retry else 'No auto retrying'}: {type(error).__name__}: {error}")
 
     ####################################################################
 
     if verbose:
-        if successful_download == False and retry_times<0:
-            print('Max. retry times reached. Unsuccessful download. Download aborted --->')
+        if successful_download == False:
+            print('Unsuccessful download. Download aborted --->')
         else:
             print('Download completed --->')
 
@@ -348,39 +427,53 @@ def get_ticker_data_dict(ticker: str = None,
                          auto_retry: bool = False,
                          keep_up_to_date: bool = False,
                          web_scraper = None,
-                         download_short_interest: bool = False):
+                         download_short_interest: bool = False,
+                         dtype_policy: str = None,
+                         incremental: bool = True):
 
     """
     if keep_up_to_date is True, try to redownload if the last Date is not today
+    incremental: redownload only the bars after the cached history (see download_ticker_history_delta_df()), else the whole history
+    dtype_policy: 'float64' or 'float32' for the history (see apply_history_dtype_policy()); by default as per set_dtype_policy()
     """
 
     def process_and_save_raw_data():
+        """
+        process the downloaded history in memory, once, and persist the raw history and the info dict in the background
+        """
 
-        from ._ticker import Ticker, tickers_with_no_volume
+        from ._ticker import Ticker
+        from ._cache import global_indicator_cache
 
-        nonlocal ticker_history_df       
-        ticker_history_df.to_csv(ticker_history_df_file, index=False)
+        nonlocal history_df
+        history_df = _processed_history_df(ticker_history_df, ticker)
         #
-        history_df = pd.read_csv(ticker_history_df_file, index_col=False)
-        if ticker in tickers_with_no_volume: # these have no volume
-            history_df = history_df[(history_df['Close']>0) & (history_df['High']>0) & (history_df['Low']>0) & (history_df['Open']>0)]
-            history_df['Volume'] = None
-        else:
-            history_df = history_df[(history_df['Close']>0) & (history_df['High']>0) & (history_df['Low']>0) & (history_df['Open']>0) & (history_df['Volume']>0)]
-        history_df['Date'] = pd.to_datetime(history_df['Date'], format='%Y-%m-%d', utc=True) # "utc=True" is to be consistent with yfinance datetimes, which are received as UTC.
+        years = Ticker.max_diff_pct_years
+        for year, max_diff_pct in zip(years, Ticker().max_diff_pct_horizons(ticker_history=history_df, days_list=[365.25*year for year in years])):
+            ticker_info_dict[f'max_diff_pct_{year}yr']  = max_diff_pct
         #
-        for year in [1,2,3,4,5,10,20,30]:
-            ticker_info_dict[f'max_diff_pct_{year}yr']  = Ticker().max_diff_pct(ticker_history=history_df, days=365.25*year)
+        raw_history_df, info_dict_to_save = ticker_history_df, dict(ticker_info_dict) # the returned info_dict gets more keys below
+        def _persist():
+            write_history_df(raw_history_df, data_dir, ticker)
+            with open(ticker_info_dict_file, "wb") as f:
+                pickle.dump(info_dict_to_save, f)
+        _persist_in_background(ticker, _persist)
         #
-        pickle.dump(ticker_info_dict, open(ticker_info_dict_file, "wb"))
+        global_indicator_cache.invalidate(ticker) # a re-adjusted history may keep the same row count and last date
+        if ticker_summary_file.is_file(): # likewise, recomputed on the next read
+            ticker_summary_file.unlink()
 
     from ._ticker import global_data_root_dir, tickers_with_no_volume
+    from ._summary import read_ticker_summary, write_ticker_summary, compute_ticker_summary
+    from ._storage import history_file, history_file_exists, read_history_df, write_history_df
 
     if ticker is None:
         raise ValueError("Error: ticker cannot be None")
 
     ticker = ticker.upper()
 
+    wait_for_persist(ticker) # the cached files of an earlier call are complete
+
     if data_root_dir is None:
         data_root_dir = global_data_root_dir
     
@@ -401,10 +494,12 @@ def get_ticker_data_dict(ticker: str = None,
         except:
             raise IOError(f"cannot create data backup dir: {data_backup_dir}")
 
-    ticker_history_df_file = data_dir / f"{ticker}_history.csv"
     ticker_info_dict_file = data_dir / f"{ticker}_info_dict.pkl"
+    ticker_summary_file = data_dir / f"{ticker}_summary.json"
 
-    if (not ticker_history_df_file.is_file()) or (not ticker_info_dict_file.is_file()):
+    history_df = None # set by process_and_save_raw_data()
+
+    if (not history_file_exists(data_dir, ticker)) or (not ticker_info_dict_file.is_file()):
 
         try:
             ticker_history_df = download_ticker_history_df(ticker = ticker, verbose = verbose, download_today_data = download_today_data, auto_retry = auto_retry)
@@ -420,7 +515,7 @@ def get_ticker_data_dict(ticker: str = None,
 
     elif force_redownload or keep_up_to_date:
 
-        curr_df = pd.read_csv(ticker_history_df_file, index_col=False)
+        curr_df = read_history_df(data_dir, ticker)
         curr_info_dict = pd.read_pickle( ticker_info_dict_file )
 
         do_force_redownload = True
@@ -441,66 +536,297 @@ def get_ticker_data_dict(ticker: str = None,
 
         if do_force_redownload:
             try:
-                new_df = download_ticker_history_df(ticker = ticker, verbose = verbose, download_today_data = download_today_data, auto_retry = auto_retry)
+                if incremental:
+                    new_df = download_ticker_history_delta_df(ticker = ticker, curr_df = curr_df, verbose = verbose, download_today_data = download_today_data, auto_retry = auto_retry)
+                else:
+                    new_df = download_ticker_history_df(ticker = ticker, verbose = verbose, download_today_data = download_today_data, auto_retry = auto_retry)
             except:
                 raise SystemError("cannot download ticker history")
 
-            curr_first_date_str = curr_df['Date'].iloc[0]
-            curr_first_date = datetime.strptime(curr_first_date_str, "%Y-%m-%d").date()
-            curr_last_date_str = curr_df['Date'].iloc[-1]
-            curr_last_date = datetime.strptime(curr_last_date_str, "%Y-%m-%d").date()
-
-            new_first_date_str = new_df['Date'].iloc[0]
-            new_first_date = datetime.strptime(new_first_date_str, "%Y-%m-%d").date()
-            new_last_date_str = new_df['Date'].iloc[-1]
-            new_last_date = datetime.strptime(new_last_date_str, "%Y-%m-%d").date()
-
             # making sure the new df always has a wider date coverage
-            if (curr_df.shape[0] - new_df.shape[0]) > 100:
-                #raise ValueError(f"for ticker [{ticker}], the redownloaded df has fewer rows than the current one")
-                print(f"ticker: [{ticker}]")
-                print(f"*** The redownloaded df's rows [n={new_df.shape[0]}] are so much fewer (#<100) than that of the current one [n={curr_df.shape[0]}] --> the current one will be used instead")
-            elif (curr_first_date - new_first_date) < timedelta(days=0):
-                #raise ValueError(f"for ticker [{ticker}], the redownloaded df has a more recent start date: {new_first_date_str}, compared to the current one: {curr_first_date_str}")
+            coverage_issue = _history_coverage_issue(curr_df, new_df)
+            if coverage_issue is not None:
                 print(f"ticker: [{ticker}]")
-                print("*** The redownloaded df has a more recent start date, compared to the current one --> the current one will be used instead")
-            elif (curr_last_date - new_last_date) > timedelta(days=0):
-                #raise ValueError(f"for ticker [{ticker}], the redownloaded df has an older end date: {new_last_date_str}, compared to the current one: {curr_last_date_str}")
-                print(f"ticker: [{ticker}]")
-                print("*** The redownloaded df has an older end date, compared to the current one --> the current one will be used instead")
+                print(f"*** {coverage_issue} --> the current one will be used instead")
             else:
                 try:
                     ticker_info_dict = download_ticker_info_dict(ticker, verbose = verbose, auto_retry = auto_retry, web_scraper = web_scraper, download_short_interest = download_short_interest)
                 except:
                     raise SystemError("cannot download ticker info dict")
-                shutil.copy2( ticker_history_df_file, data_backup_dir )
+                shutil.copy2( history_file(data_dir, ticker), data_backup_dir )
                 shutil.copy2( ticker_info_dict_file,  data_backup_dir )
                 ticker_history_df = new_df
                 process_and_save_raw_data()
 
-    history_df = pd.read_csv(ticker_history_df_file, index_col=False)
-    if ticker in tickers_with_no_volume: # these have no volume
-        history_df = history_df[(history_df['Close']>0) & (history_df['High']>0) & (history_df['Low']>0) & (history_df['Open']>0)]
-        history_df['Volume'] = None
-    else:
-        history_df = history_df[(history_df['Close']>0) & (history_df['High']>0) & (history_df['Low']>0) & (history_df['Open']>0) & (history_df['Volume']>0)]
-    history_df['Typical'] = ( history_df['Close'] + history_df['High'] + history_df['Low'] ) / 3
-    history_df['Date'] = pd.to_datetime(history_df['Date'], format='%Y-%m-%d', utc=True) # "utc=True" is to be consistent with yfinance datetimes, which are received as UTC.
+    if history_df is None: # not (re)downloaded, from the cache
+        history_df = _processed_history_df(read_history_df(data_dir, ticker), ticker)
+        try:
+            info_dict = pd.read_pickle( ticker_info_dict_file )
+        except:
+            raise RuntimeError(f"ticker = {ticker}")
+    else: # straight from memory
+        info_dict = ticker_info_dict
     #
     if last_date is not None:
         history_df = history_df[history_df['Date']<=last_date]
     #
-    try:
-        info_dict = pd.read_pickle( ticker_info_dict_file )
-    except:
-        raise RuntimeError(f"ticker = {ticker}")
     if 'info' not in info_dict.keys():
         raise KeyError(f"for ticker = [{ticker}], 'info' is not in the info_dict keys")
-    info_dict['history'] = history_df
+    info_dict['history'] = apply_history_dtype_policy(history_df, dtype_policy = dtype_policy)
     info_dict['ticker'] = ticker
+    #
+    if last_date is None: # the summary sidecar is of the whole cached history
+        info_dict['summary'] = read_ticker_summary(ticker_summary_file, history_df = history_df)
+        if info_dict['summary'] is None:
+            info_dict['summary'] = compute_ticker_summary(dict(info_dict, history = history_df)) # from the float64 history
+            write_ticker_summary(ticker_summary_file, info_dict['summary'])
     return info_dict
 
 
+def _split_bulk_history_df(bulk_df: pd.DataFrame, tickers: list):
+    """
+    {ticker: history_df} from the frame of a multi-ticker yf.download(group_by='ticker'), as per download_ticker_history_df()
+    but with Date as UTC datetimes; the tickers without any bar are left out
+    """
+    from ._storage import _utc_dates
+    history_df_dict = {}
+    for ticker in tickers:
+        if isinstance(bulk_df.columns, pd.MultiIndex):
+            if ticker not in bulk_df.columns.get_level_values(0):
+                continue
+            ticker_df = bulk_df[ticker]
+        else: # a single ticker
+            ticker_df = bulk_df
+        if 'Close' not in ticker_df.columns:
+            continue
+        ticker_df = ticker_df.dropna(subset=['Close']).drop_duplicates()
+        if len(ticker_df.index) == 0:
+            continue
+        ticker_df = ticker_df.rename_axis('Date').reset_index()
+        ticker_df.columns.name = None
+        ticker_df['Date'] = _utc_dates(ticker_df['Date'])
+        ticker_df['Volume'] = ticker_df['Volume'].fillna(0).astype(np.int64) # float in a multi-ticker frame, as other tickers have bars on other days
+        history_df_dict[ticker] = ticker_df
+    return history_df_dict
+
+
+def _download_bulk_history_df_dict(tickers: list, start = None, download_today_data: bool = False, verbose: bool = True):
+    """
+    one yf.download of the tickers (threaded by yfinance), split per ticker; returns {ticker: history_df}, {ticker: reason} of the failures
+    """
+    if download_today_data:
+        end_datetime = timedata().now.datetime
+    else:
+        end_datetime = timedata().now.datetime - timedelta(days=1)
+    if verbose:
+        print(f"\n<--- Try to download histories of {len(tickers)} tickers from yfinance, start: [{start}], end_datetime: [{end_datetime}]")
+    def _download():
+        throttle('yahoo.com')
+        with _yf_download_lock:
+            bulk_df = yf.download(tickers=tickers, start=start, end=end_datetime, auto_adjust=True, actions=True, group_by='ticker', threads=True, progress=verbose)
+            if len(bulk_df.index) == 0: # the whole chunk failed, retried if throttled
+                _raise_if_throttled(tickers)
+        return bulk_df
+    try:
+        bulk_df = global_retry_policy.call(_download, host = 'yahoo.com', name = f"histories of {len(tickers)} tickers", verbose = verbose)
+    except download_cancelled:
+        raise
+    except Exception as error:
+        return {}, {ticker: f"download unsuccessful: {error}" for ticker in tickers}
+    history_df_dict = _split_bulk_history_df(bulk_df, tickers)
+    yf_errors = getattr(getattr(yf, 'shared', None), '_ERRORS', {}) # yfinance's per-ticker errors of the last download
+    failures = {ticker: str(yf_errors.get(ticker, "no history downloaded")) for ticker in tickers if ticker not in history_df_dict}
+    if verbose:
+        print(f"Download completed: {len(history_df_dict)} of {len(tickers)} tickers --->")
+    return history_df_dict, failures
+
+
+def refresh_ticker_histories(tickers: list,
+                             chunk_size: int = 100,
+                             incremental: bool = True,
+                             n_overlap: int = 6,
+                             download_today_data: bool = False,
+                             data_root_dir = None,
+                             verbose: bool = True):
+    """
+    refresh the cached histories of many tickers with multi-ticker downloads, chunk_size tickers per yf.download, instead of a
+    download per ticker as in get_ticker_data_dict(force_redownload=True)
+
+    incremental: for the cached histories, download only from their last n_overlap bars on (see download_ticker_history_delta_df()),
+                 in one request per week of those starts, e.g., a single one for a chunk refreshed daily; the re-adjusted ones (whose
+                 overlap disagrees), and the tickers without a cache, are downloaded whole in a later request of the chunk; the tickers
+                 whose delta download failed are reported as failures, not downloaded whole
+    the info dicts are not downloaded: get_ticker_data_dict() downloads them for the tickers without one, and keeps the cached ones
+
+    returns the list of the refreshed tickers, and a dict of the failures, {ticker: reason}, including the redownloaded histories
+    that were not used as they do not cover the cached ones (see _history_coverage_issue())
+    """
+    from ._ticker import global_data_root_dir
+    from ._cache import global_indicator_cache
+    from ._storage import history_file, history_file_exists, read_history_df, write_history_df
+
+    if data_root_dir is None:
+        data_root_dir = global_data_root_dir
+    data_dir = data_root_dir / "ticker_data/yfinance"
+    data_backup_dir = data_dir / "backup"
+    data_backup_dir.mkdir(parents=True, exist_ok=True)
+
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+    refreshed, failures = [], {}
+
+    def save_history_df(ticker, new_df, curr_df = None):
+        if curr_df is not None:
+            coverage_issue = _history_coverage_issue(curr_df, new_df)
+            if coverage_issue is not None:
+                failures[ticker] = f"{coverage_issue}; the current one is kept"
+                return
+        def _persist():
+            if curr_df is not None:
+                shutil.copy2( history_file(data_dir, ticker), data_backup_dir )
+            write_history_df(new_df, data_dir, ticker)
+        _persist_in_background(ticker, _persist)
+        global_indicator_cache.invalidate(ticker)
+        ticker_summary_file = data_dir / f"{ticker}_summary.json"
+        if ticker_summary_file.is_file():
+            ticker_summary_file.unlink()
+        refreshed.append(ticker)
+
+    for chunk_start in range(0, len(tickers), chunk_size):
+        chunk = tickers[chunk_start:chunk_start + chunk_size]
+        curr_df_dict = {}
+        for ticker in chunk:
+            wait_for_persist(ticker)
+            if history_file_exists(data_dir, ticker):
+                try:
+                    curr_df_dict[ticker] = read_history_df(data_dir, ticker)
+                except Exception as error:
+                    print(f"Warning: cannot read the cached history of ticker [{ticker}], downloading the whole history: {error}")
+        #
+        to_download_whole = [ticker for ticker in chunk if (not incremental) or (len(curr_df_dict.get(ticker, [])) < 2)]
+        to_extend = [ticker for ticker in chunk if ticker not in to_download_whole]
+        if len(to_extend) > 0:
+            overlap_start_dict = {ticker: curr_df_dict[ticker]['Date'].iloc[-min(n_overlap, len(curr_df_dict[ticker].index))] for ticker in to_extend}
+            # one download per week of the overlap starts, so that a stale cache does not make the whole chunk download from its start
+            week_dict = {}
+            for ticker, overlap_start in overlap_start_dict.items():
+                week_dict.setdefault((overlap_start - pd.Timedelta(days=overlap_start.dayofweek)).normalize(), []).append(ticker)
+            delta_df_dict = {}
+            for week_tickers in week_dict.values():
+                start = min(overlap_start_dict[ticker] for ticker in week_tickers).strftime('%Y-%m-%d')
+                week_delta_df_dict, delta_failures = _download_bulk_history_df_dict(week_tickers, start = start, download_today_data = download_today_data, verbose = verbose)
+                delta_df_dict.update(week_delta_df_dict)
+                failures.update(delta_failures) # e.g., throttled: not retried with the whole histories
+            for ticker, delta_df in delta_df_dict.items():
+                extended_df = _extended_history_df(curr_df_dict[ticker], delta_df[delta_df['Date'] >= overlap_start_dict[ticker]])
+                if extended_df is None: # a re-adjusted history
+                    to_download_whole.append(ticker)
+                else:
+                    save_history_df(ticker, extended_df, curr_df = curr_df_dict[ticker])
+        if len(to_download_whole) > 0:
+            new_df_dict, chunk_failures = _download_bulk_history_df_dict(to_download_whole, download_today_data = download_today_data, verbose = verbose)
+            failures.update(chunk_failures)
+            for ticker, new_df in new_df_dict.items():
+                save_history_df(ticker, new_df, curr_df = curr_df_dict.get(ticker))
+        #
+        if verbose:
+            print(f"Refreshed {len(refreshed)} of {min(chunk_start + chunk_size, len(tickers))} tickers, {len(failures)} failure(s)")
+
+    return refreshed, failures
+
+
+def download_tickers(tickers: list, n_workers: int = 4, progress_callback = None, scheduler: download_scheduler = None, **kwargs):
+    """
+    get_ticker_data_dict(ticker, **kwargs) of each ticker, n_workers at a time, in the order of tickers (see download_scheduler);
+    e.g., download_tickers(tickers, force_redownload=True, smart_redownload=True) to refresh the cache headless
+
+    progress_callback(n_finished, n_tickers, task), with task.name the ticker; or a scheduler to run the tickers (with its own
+    progress_callback, e.g., to be cancelled from another thread), which is not shut down
+    returns the list of the downloaded tickers, and a dict of the failures, {ticker: reason}; the info dicts are not kept
+    """
+    def _download(ticker):
+        get_ticker_data_dict(ticker = ticker, **kwargs)
+    this_scheduler = download_scheduler(n_workers = n_workers, progress_callback = progress_callback) if scheduler is None else scheduler
+    try:
+        tasks = [this_scheduler.submit(_download, ticker, priority = idx, name = ticker) for idx, ticker in enumerate(tickers)]
+        for task in tasks:
+            task.wait()
+    finally:
+        if scheduler is None:
+            this_scheduler.shutdown(cancel = True)
+    downloaded = [task.name for task in tasks if task.status == 'done']
+    failures = {task.name: ('cancelled' if task.status == 'cancelled' else f"{type(task.error).__name__}: {task.error}") for task in tasks if task.status != 'done'}
+    return downloaded, failures
+
+
+def _processed_history_df(history_df: pd.DataFrame, ticker: str):
+    """
+    the history as used, from the raw one (as downloaded or cached): Date as UTC datetimes, only the bars with positive prices
+    (and volume, except for the tickers without volume, whose volume is None), and the typical price
+    """
+    from ._ticker import tickers_with_no_volume
+    from ._storage import _utc_dates
+    positive = (history_df['Close']>0) & (history_df['High']>0) & (history_df['Low']>0) & (history_df['Open']>0)
+    if ticker in tickers_with_no_volume: # these have no volume
+        history_df = history_df[positive].copy()
+        history_df['Volume'] = None
+    else:
+        history_df = history_df[positive & (history_df['Volume']>0)].copy()
+    history_df['Date'] = _utc_dates(history_df['Date'])
+    history_df['Typical'] = ( history_df['Close'] + history_df['High'] + history_df['Low'] ) / 3
+    return history_df
+
+
+_persist_threads = {} # ticker -> the thread writing its cached files
+_persist_lock = threading.Lock()
+
+def _persist_in_background(ticker: str, function):
+    """
+    run function, the writes of a ticker's cached files, in a thread, after the earlier writes of the ticker;
+    the threads are not daemonic, so the interpreter waits for them at exit
+    """
+    def _run():
+        try:
+            function()
+        except Exception as error:
+            print(f"Warning: cannot save the data of ticker [{ticker}]: {error}")
+    wait_for_persist(ticker)
+    thread = threading.Thread(target=_run, name=f"persist [{ticker}]")
+    with _persist_lock:
+        _persist_threads[ticker] = thread
+    thread.start()
+
+def wait_for_persist(ticker: str = None):
+    """
+    block until the background writes of ticker (of every ticker if None) are done
+    """
+    with _persist_lock:
+        threads = [thread for this_ticker, thread in _persist_threads.items() if (ticker is None) or (this_ticker == ticker)]
+    for thread in threads:
+        thread.join()
+    with _persist_lock:
+        for this_ticker in [this_ticker for this_ticker, thread in _persist_threads.items() if not thread.is_alive()]:
+            del _persist_threads[this_ticker]
+
+
+def apply_history_dtype_policy(history_df: pd.DataFrame, dtype_policy: str = None):
+    """
+    'float64': the history as read
+    'float32': float32 prices (and dividends, stock splits), and uint32 volume (int64 if any volume exceeds the uint32 range);
+               float32 keeps ~7 significant digits, i.e., prices resolve the cent below $100,000
+    """
+    from ._indicator import get_dtype_policy, dtype_policies
+    if dtype_policy is None:
+        dtype_policy = get_dtype_policy()
+    if dtype_policy not in dtype_policies:
+        raise ValueError(f"dtype policy [{dtype_policy}] is not one of {dtype_policies}")
+    if dtype_policy == 'float32':
+        float_columns = [column for column in ['Open', 'High', 'Low', 'Close', 'Typical', 'Adj Close', 'Dividends', 'Stock Splits'] if column in history_df.columns]
+        history_df = history_df.astype({column: np.float32 for column in float_columns})
+        if ('Volume' in history_df.columns) and (len(history_df.index) > 0) and history_df['Volume'].notnull().all(): # tickers_with_no_volume keep their None volume
+            history_df = history_df.astype({'Volume': np.uint32 if history_df['Volume'].max() <= np.iinfo(np.uint32).max else np.int64})
+    return history_df
+
+
 def get_formatted_ticker_data(ticker_data_dict, use_html: bool = False):
     from ._ticker import Ticker
     this_ticker = Ticker(ticker_data_dict=ticker_data_dict)
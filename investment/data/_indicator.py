@@ -4,11 +4,82 @@
 #
 #  License: LGPL-3.0
 
+import os
+
 import pandas as pd
 import numpy as np
+from scipy.signal import lfilter
+
+try:
+    import numba # optional, for the compiled backend
+except ImportError:
+    numba = None
 
 from ..math_and_stats import Cubic_Spline_Approximation_Smoothing
 
+# how undefined indicator values are returned:
+#   'nan': float64 arrays with NaN (e.g., during the warm-up, or all NaN for the volume indicators of a ticker without volume)
+#   'legacy': lists of None whenever an input contains None, and lists prepended with None for ADX, as in the earlier versions
+output_modes = ('nan', 'legacy')
+output_mode = 'nan'
+
+def set_output_mode(mode: str):
+    global output_mode
+    if mode not in output_modes:
+        raise ValueError(f"output mode [{mode}] is not one of {output_modes}")
+    output_mode = mode
+
+def get_output_mode():
+    return output_mode
+
+# how the indicator values are stored:
+#   'float64': float64 arrays
+#   'float32': the values are computed in float64 and returned as float32, to halve the memory of large panels; the trend labels of
+#              ADX are categorical; get_ticker_data_dict() stores the prices as float32 and the volume as uint32 (int64 if too large)
+#   the float32 values are the float64 results rounded to 24 significant bits (relative error <= 2**-24 ~ 6e-8); from a float32
+#   history, the input rounding carries over; vs. the float64 reference on 30 years of daily bars:
+#     EMAs, MACD, Bollinger bands, OBV: ~1e-7 of the price (volume) scale; PVI/NVI: ~1e-6; A/D and its Z-score: ~1e-5 of their range
+#     RSI, ADX/DMI, money flow: ~1e-4 points (on the 0-100 scale)
+#   but prices with exact ties in float64 (e.g., unadjusted cents, where a higher high equals a lower low) can resolve the ties
+#   differently once rounded to float32, which shifts DMI/ADX and money flow by up to a few points around those bars
+dtype_policies = ('float64', 'float32')
+dtype_policy = 'float64'
+
+def set_dtype_policy(policy: str):
+    global dtype_policy
+    if policy not in dtype_policies:
+        raise ValueError(f"dtype policy [{policy}] is not one of {dtype_policies}")
+    dtype_policy = policy
+
+def get_dtype_policy():
+    return dtype_policy
+
+# the kernels of the sequential recurrences (EMA/RMA/SMMA, hence the Wilder chain of ADX and RSI, and PVI/NVI) run on a backend:
+#   'numpy': scipy's lfilter and numpy's cumulative products
+#   'numba': loops compiled by numba.njit on first use, if numba is installed
+# the default is the environment variable INVESTMENT_INDICATOR_BACKEND, or 'numba' if numba is installed and 'numpy' otherwise
+backends = ('numpy', 'numba')
+
+def set_backend(name: str):
+    global backend
+    if name not in backends:
+        raise ValueError(f"backend [{name}] is not one of {backends}")
+    if name == 'numba' and numba is None:
+        raise ImportError("backend [numba] requires numba (pip install numba)")
+    backend = name
+
+def get_backend():
+    return backend
+
+backend = os.environ.get('INVESTMENT_INDICATOR_BACKEND', 'numpy' if numba is None else 'numba')
+if backend not in backends:
+    print(f"Warning: INVESTMENT_INDICATOR_BACKEND = [{backend}] is not one of {backends}, using [numpy]")
+    backend = 'numpy'
+elif backend == 'numba' and numba is None:
+    print(f"Warning: INVESTMENT_INDICATOR_BACKEND = [numba] but numba is not installed, using [numpy]")
+    backend = 'numpy'
+
+
 class volatility_indicator(object):
     def __init__(self):
         super().__init__()
@@ -22,27 +93,107 @@ class volatility_indicator(object):
         n_periods = typical_price.shape[0]
         if n_periods == 0:
             raise ValueError(f"n_periods cannot be zero")
-        MA = moving_average(periods = n_smoothing_days).simple(typical_price)
-        sigma = np.zeros(shape=n_periods, dtype=float)
-        for idx in range(n_periods):
-            if idx < n_smoothing_days:
-                sigma[idx] = np.nan
-            else:
-                sigma[idx] = np.std(typical_price[(idx-n_smoothing_days):(idx)])
+        # one rolling pass for both MA (as moving_average(periods = n_smoothing_days).simple()) and sigma
+        MA, rolling_var = _rolling_mean_var(np.asarray(typical_price, dtype=float), window = n_smoothing_days)
+        MA[:n_smoothing_days] = np.nan
+        # sigma[idx] is the std of the n_smoothing_days days before idx (today is excluded)
+        sigma = np.full(shape=rolling_var.shape, fill_value=np.nan, dtype=float)
+        sigma[n_smoothing_days:] = np.sqrt(rolling_var[(n_smoothing_days-1):-1])
         BOLU = MA + n_std_dev * sigma
         BOLD = MA - n_std_dev * sigma
-        return MA, BOLU, BOLD
+        return _output(MA), _output(BOLU), _output(BOLD)
 
 
 class trend_indicator(object):
+    # categorical trend codes as returned by ADX_codes(); the string labels are only looked up (via trend_labels) when needed
+    # slope code 0 is the first bar, which has no previous ADX; strength code 0 is an undefined (NaN) ADX
+    slope_labels           = np.array(['', 'continued', 'unchanged', 'faded'], dtype=object) # increasing, unchanged, decreasing
+    slope_labels_short     = np.array(['', 'c.', 'u.', 'f.'], dtype=object)
+    strength_labels        = np.array(['', 'weak', 'moderate', 'strong'], dtype=object)
+    strength_labels_short  = np.array(['', 'w.', 'm.', 's.'], dtype=object)
+    direction_labels       = np.array(['nd-trend', 'uptrend', 'downtrend'], dtype=object)
+    direction_labels_short = np.array(['nt.', 'up.', 'dn.'], dtype=object)
+
     def __init__(self):
         super().__init__()
 
+    def ADX_codes(self, high_price: np.ndarray, 
+                        low_price: np.ndarray,
+                        close_price: np.ndarray,
+                        ADX_smoothing_len: int = 14,
+                        DI_len: int = 14,
+                        true_range: np.ndarray = None):
+        """
+        array-only ADX/DMI along axis 0, so the prices can be 1-D (time) or 2-D (time x tickers)
+        returns adx, plus, minus, adx_smoothed, plus_smoothed, minus_smoothed, slope_code, strength_code, direction_code,
+        each of n_periods-1 rows, as the first bar has no previous close
+        true_range: as returned by true_range(), if already computed
+        """
+        if type(high_price) in [pd.Series, pd.DataFrame]:
+            high_price = high_price.to_numpy()
+        if type(low_price) in [pd.Series, pd.DataFrame]:
+            low_price = low_price.to_numpy()
+        if type(close_price) in [pd.Series, pd.DataFrame]:
+            close_price = close_price.to_numpy()
+        if (high_price.shape[0] != low_price.shape[0]) or (high_price.shape[0] != close_price.shape[0]) or (low_price.shape[0] != close_price.shape[0]):
+            raise RuntimeError(f"The lengths of high_price [{high_price.shape[0]}], low_price [{low_price.shape[0]}], close_price [{close_price.shape[0]}] are different")
+        high_price = np.asarray(high_price, dtype=float)
+        low_price = np.asarray(low_price, dtype=float)
+        close_price = np.asarray(close_price, dtype=float)
+        higher_highs = np.diff(high_price, axis=0)
+        lower_lows = -np.diff(low_price, axis=0)
+        DM_plus = np.where((higher_highs > lower_lows) & (higher_highs > 0), higher_highs, 0.0) # Directional Movement
+        DM_minus = np.where((lower_lows > higher_highs) & (lower_lows > 0), lower_lows, 0.0)
+        TR = self.true_range(high_price = high_price, low_price = low_price, close_price = close_price) if true_range is None else np.asarray(true_range, dtype=float)
+        TR_rma = moving_average(periods = DI_len)._rma(TR)
+        TR_rma[TR_rma == 0] = np.nan
+        plus = 100 * moving_average(periods = DI_len)._rma(DM_plus) / TR_rma
+        minus = 100 * moving_average(periods = DI_len)._rma(DM_minus) / TR_rma
+        plus_and_minus = plus + minus
+        adx = np.abs(plus - minus)
+        adx = 100 * np.divide(adx, plus_and_minus, out=adx, where=(plus_and_minus != 0))
+        adx_smoothed = moving_average(periods = ADX_smoothing_len)._rma(adx)
+        plus_smoothed = moving_average(periods = ADX_smoothing_len)._rma(plus)
+        minus_smoothed = moving_average(periods = ADX_smoothing_len)._rma(minus)
+        # spline smoothed
+        slope_code = np.zeros(shape=adx.shape, dtype=np.int8)
+        strength_code = np.zeros(shape=adx.shape, dtype=np.int8)
+        direction_code = np.zeros(shape=adx.shape, dtype=np.int8)
+        if adx.shape[0] >= 2:
+            x = np.arange(adx.shape[0])
+            adx_smooth = 0.90
+            adx_csaps, adx_smooth = Cubic_Spline_Approximation_Smoothing(x=x, y=adx.T, smooth=adx_smooth)
+            adx_csaps = np.asarray(adx_csaps).T
+            #
+            slope_code[1:] = np.where(adx_csaps[1:] > adx_csaps[:-1], 1, np.where(adx_csaps[1:] == adx_csaps[:-1], 2, 3))
+            strength_code[:] = np.select([adx_csaps < 20, adx_csaps <= 40, adx_csaps > 40], [1, 2, 3], default=0)
+            direction_code[:] = np.select([plus > minus, plus < minus], [1, 2], default=0)
+        return _output(adx), _output(plus), _output(minus), _output(adx_smoothed), _output(plus_smoothed), _output(minus_smoothed), slope_code, strength_code, direction_code
+
+    def true_range(self, high_price: np.ndarray, low_price: np.ndarray, close_price: np.ndarray):
+        """
+        True Range from the second bar onwards (n_periods-1 rows), along axis 0
+        """
+        high_price = np.asarray(high_price, dtype=float)
+        low_price = np.asarray(low_price, dtype=float)
+        close_price = np.asarray(close_price, dtype=float)
+        return np.maximum(np.maximum(high_price[1:]-low_price[1:], high_price[1:]-close_price[:-1]), low_price[1:]-close_price[:-1])
+
+    def trend_labels(self, slope_code: np.ndarray, strength_code: np.ndarray, direction_code: np.ndarray, short: bool = False):
+        """
+        e.g., 'continued moderate uptrend' or, if short, 'c.m.up.'
+        """
+        if short:
+            return self.slope_labels_short[slope_code] + self.strength_labels_short[strength_code] + self.direction_labels_short[direction_code]
+        else:
+            return self.slope_labels[slope_code] + ' ' + self.strength_labels[strength_code] + ' ' + self.direction_labels[direction_code]
+
     def ADX(self, high_price: np.ndarray, 
                   low_price: np.ndarray,
                   close_price: np.ndarray,
                   ADX_smoothing_len: int = 14,
-                  DI_len: int = 14):
+                  DI_len: int = 14,
+                  true_range: np.ndarray = None):
         """
         Average Directional Index (ADX)
         https://www.investopedia.com/articles/trading/07/adx-trend-indicator.asp
@@ -50,106 +201,29 @@ class trend_indicator(object):
 
         DI = Directional Indicator (i.e., DMI+, DMI-)
         """
-        if type(high_price) == pd.Series:
-            high_price = high_price.to_numpy()
-        if type(low_price) == pd.Series:
-            low_price = low_price.to_numpy()
         if type(close_price) == pd.Series:
             close_price = close_price.to_numpy()
         n_periods = close_price.shape[0]
         if n_periods <= 1:
             #raise ValueError(f"n_periods cannot be <= 1")
-            return [None,], [None,], [None,], [None,], [None,], [None,], [None,], [None,]
-        if (high_price.shape[0] != low_price.shape[0]) or (high_price.shape[0] != close_price.shape[0]) or (low_price.shape[0] != close_price.shape[0]):
-            raise RuntimeError(f"The lengths of high_price [{high_price.shape[0]}], low_price [{low_price.shape[0]}], close_price [{close_price.shape[0]}] are different")
-        higher_highs = list(np.diff(high_price))
-        lower_lows = list(-np.diff(low_price))
-        higher_highs.insert(0, None)
-        lower_lows.insert(0, None)
-        DM_plus = [None] * n_periods # Directional Movement
-        DM_minus = [None] * n_periods
-        TR = [None] * n_periods # True Range
-        for idx in range(1, n_periods):
-            if higher_highs[idx] > lower_lows[idx] and higher_highs[idx] > 0:
-                DM_plus[idx] = higher_highs[idx]
-            else:
-                DM_plus[idx] = 0
-            if lower_lows[idx] > higher_highs[idx] and lower_lows[idx] > 0:
-                DM_minus[idx] = lower_lows[idx]
-            else:
-                DM_minus[idx] = 0
-            TR[idx] = max(high_price[idx]-low_price[idx],
-                          high_price[idx]-close_price[idx-1],
-                          low_price[idx]-close_price[idx-1])
-        TR_rma = moving_average(periods = DI_len).rma(data_series = np.array(TR[1:]))
-        TR_rma[TR_rma == 0] = np.nan
-        plus = 100 * moving_average(periods = DI_len).rma(data_series = np.array(DM_plus[1:])) / TR_rma
-        minus = 100 * moving_average(periods = DI_len).rma(data_series = np.array(DM_minus[1:])) / TR_rma
-        plus_and_minus = plus + minus
-        adx = abs(plus - minus)
-        for idx in range(n_periods-1):
-            if plus_and_minus[idx] != 0:
-                adx[idx] /= plus_and_minus[idx]
-        adx *= 100
-        adx_smoothed = moving_average(periods = ADX_smoothing_len).rma(data_series = adx)
-        plus_smoothed = moving_average(periods = ADX_smoothing_len).rma(data_series = plus)
-        minus_smoothed = moving_average(periods = ADX_smoothing_len).rma(data_series = minus)
-        # spline smoothed
-        if len(adx) == 0:
-            trend = trend_short = []
-        elif len(adx) == 1:
-            trend = trend_short = [None,]
+            if output_mode == 'legacy':
+                return [None,], [None,], [None,], [None,], [None,], [None,], [None,], [None,]
+            nan = _output(np.full(shape=close_price.shape, fill_value=np.nan, dtype=float))
+            label = _output_labels(np.full(shape=close_price.shape, fill_value=None, dtype=object))
+            return nan, nan.copy(), nan.copy(), nan.copy(), nan.copy(), nan.copy(), label, label.copy()
+        adx, plus, minus, adx_smoothed, plus_smoothed, minus_smoothed, slope_code, strength_code, direction_code = self.ADX_codes(high_price = high_price, low_price = low_price, close_price = close_price, ADX_smoothing_len = ADX_smoothing_len, DI_len = DI_len, true_range = true_range)
+        if adx.shape[0] == 1:
+            trend = trend_short = np.full(shape=adx.shape, fill_value=None, dtype=object)
         else:
-            x = np.arange(len(adx))
-            adx_smooth = 0.90
-            adx_csaps, adx_smooth = Cubic_Spline_Approximation_Smoothing(x=x, y=adx, smooth=adx_smooth)            
-            #
-            trend = [None] * (n_periods-1)
-            trend_short = [None] * (n_periods-1)
-            for idx in range(len(adx)):
-                adx_slope = ''
-                adx_slope_short = ''
-                trend_strength = ''
-                trend_strength_short = ''
-                trend_direction = ''
-                trend_direction_short = ''
-                #
-                if idx > 0:
-                    if adx_csaps[idx] > adx_csaps[idx-1]:
-                        adx_slope = 'continued' # increasing
-                        adx_slope_short = 'c.'
-                    elif adx_csaps[idx] == adx_csaps[idx-1]:
-                        adx_slope = 'unchanged' # unchanged
-                        adx_slope_short = 'u.'
-                    else:
-                        adx_slope = 'faded' # decreasing
-                        adx_slope_short = 'f.'
-                #
-                if adx_csaps[idx] < 20:
-                    trend_strength = 'weak'
-                    trend_strength_short = 'w.'
-                elif 20 <= adx_csaps[idx] and adx_csaps[idx] <= 40:
-                    trend_strength = 'moderate'
-                    trend_strength_short = 'm.'
-                elif 40 < adx_csaps[idx]:
-                    trend_strength = 'strong'
-                    trend_strength_short = 's.'
-                #
-                if plus[idx] > minus[idx]:
-                    trend_direction = 'uptrend'
-                    trend_direction_short = 'up.'
-                elif plus[idx] < minus[idx]:
-                    trend_direction = 'downtrend'
-                    trend_direction_short = 'dn.'
-                else:
-                    trend_direction = 'nd-trend'
-                    trend_direction_short = 'nt.'
-                trend[idx] = f"{adx_slope} {trend_strength} {trend_direction}"
-                trend_short[idx] = f"{adx_slope_short}{trend_strength_short}{trend_direction_short}"
-            #
+            trend = self.trend_labels(slope_code, strength_code, direction_code)
+            trend_short = self.trend_labels(slope_code, strength_code, direction_code, short=True)
         #for debugging
         #print(f"adx={adx}, plus={plus}, minus={minus}, adx_smoothed={adx_smoothed}, plus_smoothed={plus_smoothed}, minus_smoothed={minus_smoothed}, trend={trend}, trend_short={trend_short}")
-        return [None] + list(adx), [None] + list(plus), [None] + list(minus), [None] + list(adx_smoothed), [None] + list(plus_smoothed), [None] + list(minus_smoothed), [None] + trend, [None] + trend_short
+        if output_mode == 'legacy':
+            return [None] + list(adx), [None] + list(plus), [None] + list(minus), [None] + list(adx_smoothed), [None] + list(plus_smoothed), [None] + list(minus_smoothed), [None] + list(trend), [None] + list(trend_short)
+        # the first bar has no previous close, hence no ADX
+        values = [_prepend(values, np.nan) for values in (adx, plus, minus, adx_smoothed, plus_smoothed, minus_smoothed)]
+        return tuple(values) + (_output_labels(_prepend(trend, None)), _output_labels(_prepend(trend_short, None)))
 
     """
     def trends(self, high_price: np.ndarray, low_price: np.ndarray, close_price: np.ndarray,):
@@ -183,37 +257,20 @@ class momentum_indicator(object):
         n_periods = close_price.shape[0]
         if n_periods == 0:
             raise ValueError(f"n_periods cannot be zero")
-        up_periods = np.zeros(shape=n_periods, dtype=float)
-        down_periods = np.zeros(shape=n_periods, dtype=float)
-        RSI = np.zeros(shape=n_periods, dtype=float)
-        up_periods[0] = 0
-        down_periods[0] = 0
-        for i in range(1, n_periods):
-            if close_price[i]>close_price[i-1]:
-                up_periods[i] = close_price[i] - close_price[i-1]
-                down_periods[i] = 0
-            elif close_price[i]<close_price[i-1]:
-                up_periods[i] = 0
-                down_periods[i] = close_price[i-1] - close_price[i]
-            else:
-                up_periods[i] = 0
-                down_periods[i] = 0
-        up   = moving_average(periods=RSI_periods).smoothed(up_periods)
-        down = moving_average(periods=RSI_periods).smoothed(down_periods)
-        for i in range(n_periods):
-            if down[i] == 0:
-                RSI[i] = 100
-            elif up[i] == 0:
-                RSI[i] = 0
-            elif (up[i] is None) or (down[i] is None):
-                RSI[i] = None
-            else:
-                RSI[i] = 100 - 100/(1+up[i]/down[i])
-        return RSI
+        close_price = np.asarray(close_price, dtype=float)
+        price_change = np.nan_to_num(np.diff(close_price, axis=0, prepend=close_price[:1])) # zero change on the first day, and from or to a missing close
+        up_periods = np.clip(price_change, 0, None)
+        down_periods = np.clip(-price_change, 0, None)
+        up   = moving_average(periods=RSI_periods)._smoothed(up_periods)
+        down = moving_average(periods=RSI_periods)._smoothed(down_periods)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            RSI = np.where(down == 0, 100.0, np.where(up == 0, 0.0, 100 - 100/(1+up/down))) # NaN during the warm-up
+        return _output(RSI)
 
-    def money_flow(self, high_price: np.ndarray, low_price: np.ndarray, close_price: np.ndarray, volume: np.ndarray, periods = 14):
+    def money_flow(self, high_price: np.ndarray, low_price: np.ndarray, close_price: np.ndarray, volume: np.ndarray, periods = 14, typical_price: np.ndarray = None):
         """
         https://www.fidelity.com/learning-center/trading-investing/technical-analysis/technical-indicator-guide/MFI
+        typical_price: (high + low + close)/3, if already computed (e.g., the 'Typical' column of the history)
         """
         if type(high_price) == pd.Series:
             high_price = high_price.to_numpy()       
@@ -226,53 +283,59 @@ class momentum_indicator(object):
         n_periods = close_price.shape[0]
         if n_periods == 0:
             raise ValueError(f"n_periods cannot be zero")
-        if any(volume==None):
+        if output_mode == 'legacy' and _has_none(volume):
             return [None]*n_periods
-        typical_price = (high_price + low_price + close_price)/3
-        money_flow = typical_price * volume
-        positive_money_flow = np.zeros(shape=n_periods, dtype=float)
-        negative_money_flow = np.zeros(shape=n_periods, dtype=float)
-        MFI = np.zeros(shape=n_periods, dtype=float) # https://en.wikipedia.org/wiki/Money_flow_index
-        if n_periods > periods:
-            for today_idx in range(periods):
-                MFI[today_idx] = None
-            for today_idx in range(periods, n_periods):
-                for idx in range(periods):
-                    if typical_price[today_idx-idx] > typical_price[today_idx-idx-1]:
-                        positive_money_flow[today_idx] += money_flow[today_idx-idx]
-                    elif typical_price[today_idx-idx] < typical_price[today_idx-idx-1]:
-                        negative_money_flow[today_idx] += money_flow[today_idx-idx]
-                MFI[today_idx] = 100 * positive_money_flow[today_idx] / (positive_money_flow[today_idx]+negative_money_flow[today_idx])
+        volume = _to_float(volume)
+        if typical_price is None:
+            typical_price = (np.asarray(high_price, dtype=float) + np.asarray(low_price, dtype=float) + np.asarray(close_price, dtype=float))/3
         else:
-            for today_idx in range(n_periods):
-                MFI[today_idx] = None
-        return MFI
+            typical_price = np.asarray(typical_price, dtype=float)
+        money_flow = typical_price * np.asarray(volume, dtype=float)
+        MFI = np.full(shape=typical_price.shape, fill_value=np.nan, dtype=float) # https://en.wikipedia.org/wiki/Money_flow_index
+        if n_periods > periods:
+            typical_price_change = np.diff(typical_price, axis=0, prepend=typical_price[:1])
+            positive_money_flow = np.where(typical_price_change > 0, money_flow, 0.0)
+            negative_money_flow = np.where(typical_price_change < 0, money_flow, 0.0)
+            # sums over the window (today-periods, today]; a missing volume only makes the windows containing it NaN
+            positive_money_flow = _window_sums(positive_money_flow, [periods])[periods:, 0]
+            negative_money_flow = _window_sums(negative_money_flow, [periods])[periods:, 0]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                MFI[periods:] = 100 * positive_money_flow / (positive_money_flow + negative_money_flow)
+        return _output(MFI)
         
-    def PPO(self, close_price: np.ndarray, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+    def PPO(self, close_price: np.ndarray, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9, fast_EMA: np.ndarray = None, slow_EMA: np.ndarray = None):
         """
         https://www.investopedia.com/terms/p/ppo.asp
         """
         if type(close_price) == pd.Series:
             close_price = close_price.to_numpy()
-        fast_EMA = moving_average(periods=fast_period).exponential(close_price)
-        slow_EMA = moving_average(periods=slow_period).exponential(close_price)
+        close_price = np.asarray(close_price, dtype=float)
+        if fast_EMA is None: # the EMAs can be shared with MACD/PPO
+            fast_EMA = moving_average(periods=fast_period)._exponential(close_price)
+        if slow_EMA is None:
+            slow_EMA = moving_average(periods=slow_period)._exponential(close_price)
+        fast_EMA, slow_EMA = np.asarray(fast_EMA, dtype=float), np.asarray(slow_EMA, dtype=float)
         ppo = 100 * (fast_EMA - slow_EMA) / slow_EMA # the only thing that differs vs. MACD
-        signal = moving_average(periods=signal_period).exponential(ppo)
+        signal = moving_average(periods=signal_period)._exponential(ppo)
         histogram = ppo - signal
-        return ppo, signal, histogram            
+        return _output(ppo), _output(signal), _output(histogram)
 
-    def MACD(self, close_price: np.ndarray, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+    def MACD(self, close_price: np.ndarray, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9, fast_EMA: np.ndarray = None, slow_EMA: np.ndarray = None):
         """
         https://www.investopedia.com/terms/m/macd.asp
         """
         if type(close_price) == pd.Series:
             close_price = close_price.to_numpy()
-        fast_EMA = moving_average(periods=fast_period).exponential(close_price)
-        slow_EMA = moving_average(periods=slow_period).exponential(close_price)
+        close_price = np.asarray(close_price, dtype=float)
+        if fast_EMA is None: # the EMAs can be shared with MACD/PPO
+            fast_EMA = moving_average(periods=fast_period)._exponential(close_price)
+        if slow_EMA is None:
+            slow_EMA = moving_average(periods=slow_period)._exponential(close_price)
+        fast_EMA, slow_EMA = np.asarray(fast_EMA, dtype=float), np.asarray(slow_EMA, dtype=float)
         macd = fast_EMA - slow_EMA # when fast > slow, it's positive
-        signal = moving_average(periods=signal_period).exponential(macd)
+        signal = moving_average(periods=signal_period)._exponential(macd)
         histogram = macd - signal
-        return macd, signal, histogram
+        return _output(macd), _output(signal), _output(histogram)
     
     def OBV(self, close_price: np.ndarray, volume: np.ndarray):
         """
@@ -283,18 +346,14 @@ class momentum_indicator(object):
         if type(volume) == pd.Series:
             volume = volume.to_numpy()
         n_periods = close_price.shape[0]
-        if any(volume==None):
+        if output_mode == 'legacy' and _has_none(volume):
             return [None]*n_periods
-        obv = np.zeros(shape=n_periods, dtype=float)
-        obv[0] = 0
-        for idx in range(1, n_periods):
-            if close_price[idx] > close_price[idx-1]:
-                obv[idx] = obv[idx-1] + volume[idx] # *close_price[idx]*(close_price[idx]-close_price[idx-1])
-            elif close_price[idx] < close_price[idx-1]:
-                obv[idx] = obv[idx-1] - volume[idx] # *close_price[idx]*(close_price[idx-1]-close_price[idx])
-            else:
-                obv[idx] = obv[idx-1]
-        return obv
+        volume = _to_float(volume)
+        close_price = np.asarray(close_price, dtype=float)
+        direction = np.nan_to_num(np.sign(np.diff(close_price, axis=0))) # no change from or to a missing close
+        signed_volume = np.where(direction != 0, direction * volume[1:], 0.0) # *close_price*(close_price change) is not used
+        obv = np.concatenate([np.zeros(shape=(1,) + close_price.shape[1:], dtype=float), np.cumsum(signed_volume, axis=0)])
+        return _output(_drop_no_data(obv, _no_data(volume)))
 
     def Z_price_vol(self, close_price: np.ndarray, volume: np.ndarray):
         if type(close_price) == pd.Series:
@@ -302,11 +361,11 @@ class momentum_indicator(object):
         if type(volume) == pd.Series:
             volume = volume.to_numpy()
         n_periods = volume.shape[0]
-        if any(volume==None):
+        if output_mode == 'legacy' and _has_none(volume):
             return [None]*n_periods
-        price_vol = close_price * volume
-        Z_price_vol = (price_vol - price_vol.mean())/(price_vol.std())
-        return Z_price_vol
+        price_vol = np.asarray(close_price, dtype=float) * _to_float(volume)
+        Z_price_vol = (price_vol - price_vol.mean(axis=0))/(price_vol.std(axis=0))
+        return _output(Z_price_vol)
 
 # https://www.investopedia.com/terms/v/volume-analysis.asp
 class volume_indicator(object):
@@ -330,21 +389,18 @@ class volume_indicator(object):
         n_periods = close_price.shape[0]
         if n_periods == 0:
             raise ValueError(f"n_periods cannot be zero")
-        if any(volume==None):
+        if output_mode == 'legacy' and _has_none(volume):
             return [None]*n_periods, [None]*n_periods
-        ad = np.zeros(shape=n_periods, dtype=float)
-        if high_price[0] == low_price[0]:
-            ad[0] = 0
-        else:
-            ad[0] = ((close_price[0] - low_price[0]) - (high_price[0] - close_price[0])) / (high_price[0] - low_price[0]) * volume[0] # CMFV: Current money flow volume
-        for today_idx in range(1, n_periods):
-            if high_price[today_idx] == low_price[today_idx]:
-                CMFV = 0
-            else:
-                CMFV = ((close_price[today_idx] - low_price[today_idx]) - (high_price[today_idx] - close_price[today_idx])) / (high_price[today_idx] - low_price[today_idx]) * volume[today_idx]
-            ad[today_idx] = ad[today_idx-1] + CMFV
-        Z_ad = (ad - ad.mean())/(ad.std())
-        return ad, Z_ad
+        volume = _to_float(volume)
+        high_price = np.asarray(high_price, dtype=float)
+        low_price = np.asarray(low_price, dtype=float)
+        close_price = np.asarray(close_price, dtype=float)
+        price_range = high_price - low_price
+        with np.errstate(divide='ignore', invalid='ignore'):
+            CMFV = np.where(price_range == 0, 0.0, ((close_price - low_price) - (high_price - close_price)) / price_range * volume) # CMFV: Current money flow volume
+        ad = _drop_no_data(np.cumsum(CMFV, axis=0), _no_data(volume)) # CMFV is 0 rather than NaN on the days the price did not move
+        Z_ad = (ad - ad.mean(axis=0))/(ad.std(axis=0))
+        return _output(ad), _output(Z_ad)
         
     def PVI_NVI(self, close_price: np.ndarray, volume: np.ndarray):
         if type(close_price) == pd.Series:
@@ -354,28 +410,24 @@ class volume_indicator(object):
         n_periods = close_price.shape[0]
         if n_periods == 0:
             raise ValueError(f"n_periods cannot be zero")
-        if any(volume==None):
+        if output_mode == 'legacy' and _has_none(volume):
             return [None]*n_periods, [None]*n_periods, [None]*n_periods, [None]*n_periods, [None]*n_periods, [None]*n_periods
-        PVI = np.zeros(shape=n_periods, dtype=float)
-        NVI = np.zeros(shape=n_periods, dtype=float)
-        PVI[0] = 1000
-        NVI[0] = 1000
-        EMA_short_period_volume = moving_average(periods=self.short_periods).exponential(volume)
+        close_price = np.asarray(close_price, dtype=float)
+        volume = _to_float(volume)
+        EMA_short_period_volume = moving_average(periods=self.short_periods)._exponential(volume)
         use_EMA_short_period_volume = False # the reason to use EMA_short_periods not daily volume is to get a more even-keeled reference volume
         if use_EMA_short_period_volume:
             reference_volume = EMA_short_period_volume
         else:
-            reference_volume = volume.copy()
-        for today_idx in range(1, n_periods):
-            if volume[today_idx] > reference_volume[today_idx-1]:
-                PVI[today_idx] = PVI[today_idx-1] + ((close_price[today_idx] - close_price[today_idx-1]) / close_price[today_idx-1] * PVI[today_idx-1])
-                NVI[today_idx] = NVI[today_idx-1]
-            else:
-                PVI[today_idx] = PVI[today_idx-1]
-                NVI[today_idx] = NVI[today_idx-1] + ((close_price[today_idx] - close_price[today_idx-1]) / close_price[today_idx-1] * NVI[today_idx-1])
-        PVI *= 1000/np.max(PVI)
-        NVI *= 1000/np.max(NVI)
-        return PVI, NVI, moving_average(periods=self.short_periods).exponential(PVI), moving_average(periods=self.short_periods).exponential(NVI), moving_average(periods=self.long_periods).exponential(PVI), moving_average(periods=self.long_periods).exponential(NVI)
+            reference_volume = volume
+        # PVI moves with the price on days the volume rises above the reference volume, NVI on the other days; both start at 1000
+        PVI, NVI = _kernel('PVI_NVI')(close_price, volume, reference_volume)
+        no_volume = _no_data(volume) # NaN volumes are never up, which would make NVI the price itself
+        PVI = _drop_no_data(PVI, no_volume)
+        NVI = _drop_no_data(NVI, no_volume)
+        PVI *= 1000/np.max(PVI, axis=0)
+        NVI *= 1000/np.max(NVI, axis=0)
+        return _output(PVI), _output(NVI), _output(moving_average(periods=self.short_periods)._exponential(PVI)), _output(moving_average(periods=self.short_periods)._exponential(NVI)), _output(moving_average(periods=self.long_periods)._exponential(PVI)), _output(moving_average(periods=self.long_periods)._exponential(NVI))
 
 
 class moving_average(object):
@@ -388,24 +440,27 @@ class moving_average(object):
     def smoothed(self, data_series: np.ndarray):
         """
         https://en.wikipedia.org/wiki/Moving_average
+        SMMA[periods-1] = mean(data[:periods]); SMMA[t] = ((periods-1)*SMMA[t-1] + data[t])/periods, i.e., Wilder smoothing
+        evaluated as a recursive filter along axis 0; NaN during the warm-up
         """
         if type(data_series) in [pd.Series, pd.DataFrame]:
             data_series = data_series.to_numpy()
         n_periods = data_series.shape[0]
-        if any(data_series==None):
+        if output_mode == 'legacy' and _has_none(data_series):
             return [None]*n_periods
-        if n_periods<self.periods:
-            return [None] * n_periods
-        elif n_periods == self.periods:
-            return [None] * (self.periods-1) + [data_series.mean()]
-        else:
-            SMMA = np.zeros(shape=n_periods, dtype=float)
-            for i in range(self.periods-1):
-                SMMA[i] = None
-            SMMA[self.periods-1] = data_series[:self.periods].mean()
-            for idx in range(self.periods, n_periods):
-                SMMA[idx] = ((self.periods-1)*SMMA[idx-1] + data_series[idx])/self.periods
+        return _output(self._smoothed(_to_float(data_series)))
+
+    def _smoothed(self, data: np.ndarray):
+        n_periods = data.shape[0]
+        SMMA = np.full(shape=data.shape, fill_value=np.nan, dtype=float)
+        if n_periods < self.periods:
             return SMMA
+        alpha = 1 / self.periods
+        seed = data[:self.periods].mean(axis=0)
+        SMMA[self.periods-1] = seed
+        if n_periods > self.periods:
+            SMMA[self.periods:] = _kernel('recursive_filter')(data[self.periods:], alpha, seed) # carries SMMA[periods-1] into the filter
+        return SMMA
 
     def rma(self, data_series: np.ndarray):
         """
@@ -413,31 +468,352 @@ class moving_average(object):
         """
         return np.array(self.exponential(data_series = data_series, use_default_alpha = False, alpha = 1 / self.periods))
 
+    def _rma(self, data: np.ndarray):
+        return self._exponential(data, alpha = 1 / self.periods)
+
     def exponential(self, data_series: np.ndarray, use_default_alpha: bool = True, alpha = None):
+        """
+        EMA[0] = data[0]; EMA[t] = alpha * data[t] + (1-alpha) * EMA[t-1]
+        evaluated as a first-order recursive (IIR) filter along axis 0, so data_series can be 1-D (time) or 2-D (time x tickers)
+        """
         if use_default_alpha:
             alpha = self.multiplier
         if type(data_series) in [pd.Series, pd.DataFrame]:
             data_series = data_series.to_numpy()
         n_periods = data_series.shape[0]
-        if any(data_series==None):
+        if output_mode == 'legacy' and _has_none(data_series):
             return [None]*n_periods
-        EMA = np.zeros(shape=n_periods, dtype=float)
-        EMA[0] = data_series[0]
-        for idx in range(1, n_periods):
-            EMA[idx] = (data_series[idx] * alpha) + (EMA[idx-1] * (1-alpha))
-        return EMA
+        return _output(self._exponential(_to_float(data_series), alpha = alpha))
+
+    def _exponential(self, data: np.ndarray, alpha = None):
+        """
+        the float64 EMA of float data, for use within the indicators
+        """
+        if alpha is None:
+            alpha = self.multiplier
+        if data.shape[0] == 0:
+            return np.zeros(shape=data.shape, dtype=float)
+        return _kernel('recursive_filter')(np.asarray(data, dtype=float), alpha, data[0]) # such that EMA[0] = data[0]
 
     def simple(self, data_series: np.ndarray):
         if type(data_series) in [pd.Series, pd.DataFrame]:
             data_series = data_series.to_numpy()
         n_periods = data_series.shape[0]
-        if any(data_series==None):
+        if output_mode == 'legacy' and _has_none(data_series):
             return [None]*n_periods
-        SMA = np.zeros(shape=n_periods, dtype=float)
-        data = np.array(data_series)
-        for idx in range(n_periods):
-            if idx > (self.periods-1):
-                SMA[idx] = np.mean(data[(idx-self.periods+1):(idx+1)])
+        SMA, _ = _rolling_mean_var(_to_float(data_series), window = self.periods)
+        SMA[:self.periods] = np.nan # the first valid value is at idx = periods
+        return _output(SMA)
+
+
+class indicator_sweep(object):
+    def __init__(self):
+        """
+        an indicator over many parameter values in one call, for 1-D data: each method returns n_periods x n_parameters,
+        column j being the indicator with the j-th parameter value
+
+        e.g.,
+            EMA = indicator_sweep().exponential(close_price, periods=range(5, 201)) # EMA[:, j] == moving_average(periods=5+j).exponential(close_price)
+        """
+        super().__init__()
+
+    def exponential(self, data_series: np.ndarray, periods, smoothing = 2):
+        data = _to_float(data_series)
+        periods = np.asarray(periods, dtype=float).reshape(-1)
+        if data.shape[0] == 0:
+            return np.zeros(shape=(0, periods.size), dtype=float)
+        alpha = smoothing / (1+periods)
+        start = np.zeros(shape=periods.shape, dtype=int)
+        return _output(_kernel('recursive_filter_sweep')(data, alpha, start, np.full(shape=periods.shape, fill_value=data[0]))) # EMA[0] = data[0]
+
+    def smoothed(self, data_series: np.ndarray, periods):
+        """
+        as moving_average(periods=p).smoothed(), with the seeds (the means of the first p values) from one cumulative sum
+        """
+        data = _to_float(data_series)
+        periods = np.asarray(periods, dtype=int).reshape(-1)
+        seed = np.full(shape=periods.shape, fill_value=np.nan, dtype=float)
+        in_range = periods <= data.shape[0]
+        seed[in_range] = np.cumsum(data)[periods[in_range]-1] / periods[in_range]
+        SMMA = _kernel('recursive_filter_sweep')(data, 1 / periods, periods, seed)
+        SMMA[periods[in_range]-1, np.flatnonzero(in_range)] = seed[in_range] # NaN during the warm-up
+        return _output(SMMA)
+
+    def simple(self, data_series: np.ndarray, periods):
+        """
+        as moving_average(periods=p).simple(), all the periods from one cumulative sum
+        """
+        data = _to_float(data_series)
+        periods = np.asarray(periods, dtype=int).reshape(-1)
+        SMA = _window_sums(data, periods) / periods
+        SMA[np.arange(data.shape[0])[:, np.newaxis] < periods] = np.nan # the first valid value is at idx = periods
+        return _output(SMA)
+
+    def RSI(self, close_price: np.ndarray, RSI_periods):
+        """
+        as momentum_indicator().RSI(RSI_periods=p); the price changes are computed once for all the periods
+        """
+        close_price = _to_float(close_price)
+        if close_price.shape[0] == 0:
+            raise ValueError(f"n_periods cannot be zero")
+        price_change = np.nan_to_num(np.diff(close_price, prepend=close_price[:1])) # zero change on the first day, and from or to a missing close
+        up = np.asarray(self.smoothed(np.clip(price_change, 0, None), RSI_periods), dtype=float)
+        down = np.asarray(self.smoothed(np.clip(-price_change, 0, None), RSI_periods), dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            RSI = np.where(down == 0, 100.0, np.where(up == 0, 0.0, 100 - 100/(1+up/down))) # NaN during the warm-up
+        return _output(RSI)
+
+    def Bollinger_Band(self, typical_price: np.ndarray, n_smoothing_days, n_std_dev):
+        """
+        as volatility_indicator().Bollinger_Band(n_smoothing_days=d, n_std_dev=k) over the grid of d and k;
+        returns MA of n_periods x len(n_smoothing_days), and BOLU, BOLD of n_periods x len(n_smoothing_days) x len(n_std_dev),
+        the rolling means and variances of all the d being computed at once (see _window_mean_var()), and only the k broadcast
+        """
+        typical_price = _to_float(typical_price)
+        n_smoothing_days = np.asarray(n_smoothing_days, dtype=int).reshape(-1)
+        n_std_dev = np.asarray(n_std_dev, dtype=float).reshape(-1)
+        if typical_price.shape[0] == 0:
+            raise ValueError(f"n_periods cannot be zero")
+        MA, rolling_var = _window_mean_var(typical_price, n_smoothing_days)
+        MA[np.arange(typical_price.shape[0])[:, np.newaxis] < n_smoothing_days] = np.nan
+        sigma = np.full(shape=MA.shape, fill_value=np.nan, dtype=float)
+        sigma[1:] = np.sqrt(rolling_var[:-1]) # today is excluded
+        band = sigma[:, :, np.newaxis] * n_std_dev[np.newaxis, np.newaxis, :]
+        BOLU = MA[:, :, np.newaxis] + band
+        BOLD = MA[:, :, np.newaxis] - band
+        return _output(MA), _output(BOLU), _output(BOLD)
+
+
+def _rolling_mean_var(data: np.ndarray, window: int):
+    """
+    rolling mean and (population) variance of data[(idx-window+1):(idx+1)] along axis 0, NaN where the window is incomplete or contains NaN
+    pandas' rolling kernels are O(n) online updates with compensated sums, so unlike a plain cumsum of squares the variance does not
+    cancel catastrophically on long histories whose price level drifts by orders of magnitude
+    """
+    if window < 1 or data.shape[0] < window:
+        return np.full(shape=data.shape, fill_value=np.nan, dtype=float), np.full(shape=data.shape, fill_value=np.nan, dtype=float)
+    rolling = (pd.Series(data) if data.ndim == 1 else pd.DataFrame(data)).rolling(window=window, min_periods=window)
+    return np.array(rolling.mean(), dtype=float), np.array(rolling.var(ddof=0), dtype=float)
+
+
+def _window_sums(data: np.ndarray, windows):
+    """
+    sums of data[(idx-window+1):(idx+1)] along axis 0 for each of the windows, from one cumulative sum: n_periods x len(windows)
+    (x the other axes of data), NaN where the window is incomplete or contains NaN
+    """
+    windows = np.asarray(windows, dtype=int).reshape(-1)
+    is_nan = np.isnan(data)
+    zeros = np.zeros(shape=(1,) + data.shape[1:], dtype=float)
+    cum_data = np.concatenate([zeros, np.cumsum(np.where(is_nan, 0.0, data), axis=0)])
+    cum_nan = np.concatenate([zeros, np.cumsum(is_nan, axis=0)])
+    end = np.arange(1, data.shape[0]+1)[:, np.newaxis]
+    start = end - windows[np.newaxis, :]
+    in_range = (start >= 0).reshape(start.shape + (1,)*(data.ndim-1))
+    start = np.maximum(start, 0)
+    is_valid = in_range & (cum_nan[end] - cum_nan[start] == 0)
+    return np.where(is_valid, cum_data[end] - cum_data[start], np.nan)
+
+
+def _window_mean_var(data: np.ndarray, windows):
+    """
+    rolling mean and (population) variance of data[(idx-window+1):(idx+1)] for each of the windows of 1-D data: n_periods x len(windows),
+    NaN where the window is incomplete or contains NaN
+    the data are cut into blocks of max(windows) values, centered on their block's mean, so a window is within the block of its last
+    value and at most the block before: its sums are cumulative sums within those blocks (the earlier one re-centered on the mean of the
+    later one); unlike a plain cumsum of squares, the variance does not cancel catastrophically on long histories whose price level
+    drifts by orders of magnitude
+    """
+    windows = np.asarray(windows, dtype=int).reshape(-1)
+    n_periods = data.shape[0]
+    block_size = max(1, int(windows.max()))
+    n_blocks = -(-n_periods // block_size)
+    blocks = np.full(shape=n_blocks*block_size, fill_value=np.nan, dtype=float)
+    blocks[:n_periods] = data
+    blocks = blocks.reshape(n_blocks, block_size)
+    is_nan = np.isnan(blocks)
+    center = np.where(is_nan, 0.0, blocks).sum(axis=1) / np.maximum(block_size - is_nan.sum(axis=1), 1)
+    deviation = np.where(is_nan, 0.0, blocks - center[:, np.newaxis])
+    # per block, the sums of the deviations and of their squares before each value, and in the whole block, flattened: the sums of block b
+    # before its idx-th value are at b*(block_size+1) + idx
+    cum_deviation, cum_squared_deviation = [np.concatenate([np.zeros(shape=(n_blocks, 1), dtype=float), np.cumsum(moment, axis=1)], axis=1).reshape(-1)
+                                            for moment in (deviation, deviation**2)]
+    last_nan_idx = np.maximum.accumulate(np.where(is_nan.reshape(-1), np.arange(n_blocks*block_size), -1))[:n_periods, np.newaxis]
+    # per last value (n_periods x 1): the sums in its block up to it, and the previous block's sums and mean vs. its block's
+    last = np.arange(n_periods)[:, np.newaxis]
+    last_block = last // block_size
+    last_block_start = last_block * block_size
+    tail_sum = cum_deviation[last + last_block + 1]
+    tail_sum_of_squares = cum_squared_deviation[last + last_block + 1]
+    previous_block_end = np.maximum(last_block_start + last_block - 1, 0) # previous_block*(block_size+1) + block_size
+    shift = center[np.maximum(last_block-1, 0)] - center[last_block]
+    # per window (n_periods x len(windows)): its sums in the previous block (if it starts there), less the sums before its first value
+    first = last - windows[np.newaxis, :] + 1
+    is_valid = (first >= 0) & (first > last_nan_idx)
+    spans = first < last_block_start
+    first = np.maximum(first, 0)
+    first_flat_idx = first + first // block_size
+    head_sum = np.where(spans, cum_deviation[previous_block_end], 0.0) - cum_deviation[first_flat_idx]
+    head_sum_of_squares = np.where(spans, cum_squared_deviation[previous_block_end], 0.0) - cum_squared_deviation[first_flat_idx]
+    # the values in the previous block, re-centered on the mean of the last value's block
+    head_shift = np.where(spans, shift, 0.0)
+    head_offset = (last_block_start - first) * head_shift # n_head * shift
+    window_sum = tail_sum + head_sum + head_offset
+    window_sum_of_squares = tail_sum_of_squares + head_sum_of_squares + head_shift * (2 * head_sum + head_offset)
+    mean = window_sum / windows
+    var = np.maximum(window_sum_of_squares / windows - mean**2, 0.0)
+    return np.where(is_valid, center[last_block] + mean, np.nan), np.where(is_valid, var, np.nan)
+
+
+def _has_none(values):
+    """
+    the check of the 'legacy' output mode; only object arrays (e.g., the None volume of tickers_with_no_volume) can contain None
+    """
+    values = np.asarray(values)
+    return (values.dtype == object) and bool(np.any(values == None))
+
+
+def _to_float(values):
+    """
+    float64 array of values, None as NaN
+    """
+    if type(values) in [pd.Series, pd.DataFrame]:
+        values = values.to_numpy()
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = np.where(values == None, np.nan, values)
+    return values.astype(float, copy=False)
+
+
+def _no_data(values: np.ndarray):
+    """
+    True where a float series is all NaN (e.g., the volume of tickers_with_no_volume), per column for 2-D values
+    """
+    return np.isnan(values).all(axis=0)
+
+
+def _drop_no_data(values: np.ndarray, no_data):
+    """
+    NaN for the series (columns) that have no data
+    """
+    if np.any(no_data):
+        if values.ndim == 1:
+            values[:] = np.nan
+        else:
+            values[:, no_data] = np.nan
+    return values
+
+
+def _output(values: np.ndarray):
+    """
+    float64 values as stored under the dtype policy
+    """
+    if dtype_policy == 'float32' and isinstance(values, np.ndarray) and values.dtype == np.float64:
+        return values.astype(np.float32)
+    return values
+
+
+def _output_labels(labels: np.ndarray):
+    """
+    string labels as stored under the dtype policy
+    """
+    if dtype_policy == 'float32':
+        return pd.Categorical(labels)
+    return labels
+
+
+def _prepend(values: np.ndarray, fill_value):
+    return np.concatenate([np.full(shape=(1,) + values.shape[1:], fill_value=fill_value, dtype=values.dtype), values])
+
+
+###########################################################################################
+# backend kernels; they operate along axis 0, and the loops of the numba backend on (time x columns) arrays
+
+def _recursive_filter_numpy(data: np.ndarray, alpha: float, initial: np.ndarray):
+    """
+    y[t] = alpha * data[t] + (1-alpha) * y[t-1], with y[-1] = initial
+    """
+    zi = ((1-alpha) * np.asarray(initial, dtype=float))[np.newaxis]
+    y, _ = lfilter([alpha], [1, -(1-alpha)], data, axis=0, zi=zi)
+    return y
+
+def _recursive_filter_loop(data: np.ndarray, alpha: float, initial: np.ndarray):
+    y = np.empty_like(data)
+    for col in range(data.shape[1]):
+        previous = initial[col]
+        for idx in range(data.shape[0]):
+            previous = alpha * data[idx, col] + (1-alpha) * previous
+            y[idx, col] = previous
+    return y
+
+def _recursive_filter_sweep_numpy(data: np.ndarray, alpha: np.ndarray, start: np.ndarray, initial: np.ndarray):
+    """
+    the recursive filter of 1-D data for each alpha: y[:, j] is NaN before row start[j], from which it is filtered with y[start[j]-1] = initial[j]
+    """
+    y = np.full(shape=(alpha.size, data.shape[0]), fill_value=np.nan, dtype=float) # transposed, so that each filter writes contiguous memory
+    for col in range(alpha.size):
+        if start[col] < data.shape[0]:
+            y[col, start[col]:], _ = lfilter([alpha[col]], [1, -(1-alpha[col])], data[start[col]:], zi=[(1-alpha[col]) * initial[col]])
+    return y.T
+
+def _recursive_filter_sweep_loop(data: np.ndarray, alpha: np.ndarray, start: np.ndarray, initial: np.ndarray):
+    y = np.full((data.shape[0], alpha.size), np.nan)
+    for col in range(alpha.size):
+        previous = initial[col]
+        for idx in range(start[col], data.shape[0]):
+            previous = alpha[col] * data[idx] + (1-alpha[col]) * previous
+            y[idx, col] = previous
+    return y
+
+def _PVI_NVI_numpy(close_price: np.ndarray, volume: np.ndarray, reference_volume: np.ndarray):
+    price_ratio = close_price[1:] / close_price[:-1]
+    volume_up = volume[1:] > reference_volume[:-1]
+    ones = np.ones(shape=(1,) + close_price.shape[1:], dtype=float)
+    PVI = 1000 * np.concatenate([ones, np.cumprod(np.where(volume_up, price_ratio, 1.0), axis=0)])
+    NVI = 1000 * np.concatenate([ones, np.cumprod(np.where(volume_up, 1.0, price_ratio), axis=0)])
+    return PVI, NVI
+
+def _PVI_NVI_loop(close_price: np.ndarray, volume: np.ndarray, reference_volume: np.ndarray):
+    PVI = np.empty_like(close_price)
+    NVI = np.empty_like(close_price)
+    for col in range(close_price.shape[1]):
+        PVI_product = NVI_product = 1.0
+        PVI[0, col] = NVI[0, col] = 1000.0
+        for idx in range(1, close_price.shape[0]):
+            price_ratio = close_price[idx, col] / close_price[idx-1, col]
+            if volume[idx, col] > reference_volume[idx-1, col]:
+                PVI_product *= price_ratio
             else:
-                SMA[idx] = np.nan
-        return SMA
\ No newline at end of file
+                NVI_product *= price_ratio
+            PVI[idx, col] = 1000 * PVI_product
+            NVI[idx, col] = 1000 * NVI_product
+    return PVI, NVI
+
+def _recursive_filter_numba(data: np.ndarray, alpha: float, initial: np.ndarray):
+    data = np.asarray(data, dtype=float)
+    data_2d = np.ascontiguousarray(data.reshape(data.shape[0], -1))
+    initial = np.ascontiguousarray(np.broadcast_to(np.asarray(initial, dtype=float).reshape(-1), data_2d.shape[1:]))
+    y = _jit(_recursive_filter_loop)(data_2d, float(alpha), initial)
+    return y.reshape(data.shape)
+
+def _recursive_filter_sweep_numba(data: np.ndarray, alpha: np.ndarray, start: np.ndarray, initial: np.ndarray):
+    as_1d = lambda values, dtype: np.ascontiguousarray(np.asarray(values, dtype=dtype).reshape(-1))
+    return _jit(_recursive_filter_sweep_loop)(as_1d(data, float), as_1d(alpha, float), as_1d(start, np.int64), as_1d(initial, float))
+
+def _PVI_NVI_numba(close_price: np.ndarray, volume: np.ndarray, reference_volume: np.ndarray):
+    shape = close_price.shape
+    as_2d = lambda values: np.ascontiguousarray(np.asarray(values, dtype=float).reshape(shape[0], -1))
+    PVI, NVI = _jit(_PVI_NVI_loop)(as_2d(close_price), as_2d(volume), as_2d(reference_volume))
+    return PVI.reshape(shape), NVI.reshape(shape)
+
+_jitted = {}
+
+def _jit(loop):
+    if loop not in _jitted:
+        _jitted[loop] = numba.njit(loop)
+    return _jitted[loop]
+
+_kernels = {'numpy': {'recursive_filter': _recursive_filter_numpy, 'recursive_filter_sweep': _recursive_filter_sweep_numpy, 'PVI_NVI': _PVI_NVI_numpy},
+            'numba': {'recursive_filter': _recursive_filter_numba, 'recursive_filter_sweep': _recursive_filter_sweep_numba, 'PVI_NVI': _PVI_NVI_numba}}
+
+def _kernel(name: str):
+    return _kernels[backend][name]
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from ._indicator import volatility_indicator, trend_indicator, momentum_indicator, volume_indicator, moving_average, get_dtype_policy, _prepend
+
+
+class ohlcv_panel(object):
+    fields = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+    def __init__(self, dates, tickers, values: np.ndarray, dtype = None):
+        """
+        date-aligned OHLCV of many tickers
+        values: contiguous array of n_dates x n_tickers x 5 (Open, High, Low, Close, Volume), NaN where a ticker has no bar
+        dtype: float64, or float32 to halve the memory of universe-scale panels (the indicators are still computed in float64);
+               by default as per the dtype policy of the indicators (see set_dtype_policy())
+        """
+        super().__init__()
+        if dtype is None:
+            dtype = np.float32 if get_dtype_policy() == 'float32' else np.float64
+        values = np.ascontiguousarray(values, dtype=dtype)
+        if values.shape != (len(dates), len(tickers), len(self.fields)):
+            raise ValueError(f"values of shape {values.shape} do not match {len(dates)} dates x {len(tickers)} tickers x {len(self.fields)} fields")
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = list(tickers)
+        self.values = values
+
+    @classmethod
+    def from_history_dict(cls, history_df_dict: dict, dtype = None):
+        """
+        history_df_dict: {ticker: history_df}, e.g., the 'history' of get_ticker_data_dict() of each ticker
+        the dates are the union of the dates of all the tickers
+        """
+        tickers = list(history_df_dict.keys())
+        dates = pd.DatetimeIndex([])
+        for history_df in history_df_dict.values():
+            dates = dates.union(pd.DatetimeIndex(history_df['Date']))
+        if dtype is None:
+            dtype = np.float32 if get_dtype_policy() == 'float32' else np.float64
+        values = np.full(shape=(len(dates), len(tickers), len(cls.fields)), fill_value=np.nan, dtype=dtype)
+        for idx, history_df in enumerate(history_df_dict.values()):
+            rows = dates.get_indexer(pd.DatetimeIndex(history_df['Date']))
+            values[rows, idx, :] = history_df[list(cls.fields)].to_numpy(dtype=np.float64, na_value=np.nan)
+        return cls(dates=dates, tickers=tickers, values=values, dtype=dtype)
+
+    def field(self, name: str):
+        """
+        n_dates x n_tickers view of a field
+        """
+        return self.values[:, :, self.fields.index(name)]
+
+    @property
+    def mask(self):
+        """
+        True where a ticker has a bar
+        """
+        return ~np.isnan(self.field('Close'))
+
+    def to_frame(self, values: np.ndarray):
+        """
+        n_dates x n_tickers DataFrame of an indicator
+        """
+        return pd.DataFrame(values, index=self.dates, columns=self.tickers)
+
+
+def _ADX(fields: dict, ADX_smoothing_len: int = 14, DI_len: int = 14):
+    if fields['Close'].shape[0] <= 1:
+        nan = np.full(shape=fields['Close'].shape, fill_value=np.nan, dtype=float)
+        zeros = np.zeros(shape=fields['Close'].shape, dtype=np.int8)
+        return (nan,)*6 + (zeros,)*3
+    results = trend_indicator().ADX_codes(high_price=fields['High'], low_price=fields['Low'], close_price=fields['Close'], ADX_smoothing_len=ADX_smoothing_len, DI_len=DI_len)
+    return tuple(_prepend(values, np.nan if values.dtype.kind == 'f' else 0) for values in results) # no ADX on the first bar
+
+
+def _typical_price(fields: dict):
+    return (fields['High'] + fields['Low'] + fields['Close']) / 3
+
+
+class panel_engine(object):
+    def __init__(self):
+        """
+        computes a registered indicator for all the tickers of an ohlcv_panel at once
+
+        each ticker's bars are first compacted to the top of its column (a stable sort of the missing bars to the bottom), so
+        that the recurrences see consecutive bars exactly as in the ticker's own history, the indicator is evaluated on the
+        n_bars x n_tickers block along axis 0, and the results are scattered back to the dates, NaN where a ticker has no bar
+
+        causal indicators (RSI, EMAs, MACD, ...) ignore the trailing NaN of the shorter columns and run in one pass;
+        indicators normalized over the whole history (A/D Z-score, PVI/NVI, Z_price_vol) or smoothed over it (the ADX trend codes)
+        are registered with whole_history=True and run once per distinct number of bars, on the tickers with that many bars
+
+        e.g.,
+            panel = ohlcv_panel.from_history_dict({ticker: get_ticker_data_dict(ticker)['history'] for ticker in tickers})
+            RSI = panel_engine().compute(panel, 'RSI', RSI_periods=14)['RSI'] # n_dates x n_tickers
+        """
+        super().__init__()
+        self._indicators = OrderedDict()
+        self.register('RSI', lambda fields, RSI_periods=14: (momentum_indicator().RSI(close_price=fields['Close'], RSI_periods=RSI_periods),), ['RSI'])
+        self.register('MACD', lambda fields, fast_period=12, slow_period=26, signal_period=9: momentum_indicator().MACD(close_price=fields['Close'], fast_period=fast_period, slow_period=slow_period, signal_period=signal_period), ['macd', 'signal', 'histogram'])
+        self.register('PPO', lambda fields, fast_period=12, slow_period=26, signal_period=9: momentum_indicator().PPO(close_price=fields['Close'], fast_period=fast_period, slow_period=slow_period, signal_period=signal_period), ['ppo', 'signal', 'histogram'])
+        self.register('money_flow', lambda fields, periods=14: (momentum_indicator().money_flow(high_price=fields['High'], low_price=fields['Low'], close_price=fields['Close'], volume=fields['Volume'], periods=periods),), ['money_flow'])
+        self.register('OBV', lambda fields: (momentum_indicator().OBV(close_price=fields['Close'], volume=fields['Volume']),), ['OBV'])
+        self.register('Z_price_vol', lambda fields: (momentum_indicator().Z_price_vol(close_price=fields['Close'], volume=fields['Volume']),), ['Z_price_vol'], whole_history=True)
+        self.register('accumulation_distribution', lambda fields: volume_indicator().accumulation_distribution(high_price=fields['High'], low_price=fields['Low'], close_price=fields['Close'], volume=fields['Volume']), ['ad', 'Z_ad'], whole_history=True)
+        self.register('PVI_NVI', lambda fields, short_periods=9, long_periods=255: volume_indicator(short_periods=short_periods, long_periods=long_periods).PVI_NVI(close_price=fields['Close'], volume=fields['Volume']), ['PVI', 'NVI', 'PVI_EMA_short', 'NVI_EMA_short', 'PVI_EMA_long', 'NVI_EMA_long'], whole_history=True)
+        self.register('ADX', _ADX, ['ADX', 'DMI+', 'DMI-', 'ADX_smoothed', 'DMI+_smoothed', 'DMI-_smoothed', 'slope_code', 'strength_code', 'direction_code'], whole_history=True)
+        self.register('Bollinger_Band', lambda fields, n_smoothing_days=20, n_std_dev=2: volatility_indicator().Bollinger_Band(typical_price=_typical_price(fields), n_smoothing_days=n_smoothing_days, n_std_dev=n_std_dev), ['MA', 'BOLU', 'BOLD'])
+        self.register('EMA', lambda fields, periods=30, field='Close': (moving_average(periods=periods).exponential(fields[field]),), ['EMA'])
+        self.register('SMA', lambda fields, periods=30, field='Close': (moving_average(periods=periods).simple(fields[field]),), ['SMA'])
+
+    def register(self, name: str, function, output_names, whole_history: bool = False):
+        """
+        function(fields, **params): fields is {'Open': ..., 'High': ..., 'Low': ..., 'Close': ..., 'Volume': ...} of n_bars x n_tickers arrays,
+        and it returns a tuple of n_bars x n_tickers arrays, one per output name
+        whole_history: the function is not causal, i.e., the value of a bar depends on later bars
+        """
+        self._indicators[name] = (function, list(output_names), whole_history)
+
+    @property
+    def indicators(self):
+        return list(self._indicators.keys())
+
+    def compute(self, panel: ohlcv_panel, name: str, **params):
+        """
+        returns {output name: n_dates x n_tickers array}; float outputs are NaN where a ticker has no bar, integer (code) outputs 0
+        """
+        if name not in self._indicators:
+            raise KeyError(f"indicator [{name}] is not registered, available: {self.indicators}")
+        function, output_names, whole_history = self._indicators[name]
+        mask = panel.mask
+        n_bars = mask.sum(axis=0)
+        order = np.argsort(~mask, axis=0, kind='stable') # the rows of each ticker's bars first, in date order
+        compacted = {field: np.take_along_axis(panel.field(field), order, axis=0) for field in panel.fields}
+        if whole_history:
+            results = None
+            for n in np.unique(n_bars[n_bars > 0]):
+                columns = np.flatnonzero(n_bars == n)
+                group_results = function({field: values[:n, columns] for field, values in compacted.items()}, **params)
+                if results is None:
+                    results = [np.full(shape=mask.shape, fill_value=np.nan if values.dtype.kind == 'f' else 0, dtype=values.dtype) for values in group_results]
+                for values, group_values in zip(results, group_results):
+                    values[:n, columns] = group_values
+            if results is None: # no bars at all
+                results = [np.full(shape=mask.shape, fill_value=np.nan, dtype=float) for _ in output_names]
+        else:
+            results = [np.asarray(values) for values in function(compacted, **params)]
+        in_bars = np.arange(mask.shape[0])[:, np.newaxis] < n_bars[np.newaxis, :]
+        output_dict = OrderedDict()
+        for output_name, values in zip(output_names, results):
+            fill_value = np.nan if values.dtype.kind == 'f' else 0
+            output = np.full(shape=mask.shape, fill_value=fill_value, dtype=values.dtype)
+            np.put_along_axis(output, order, np.where(in_bars, values, fill_value), axis=0) # back to the dates
+            output_dict[output_name] = output
+        return output_dict
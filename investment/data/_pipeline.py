@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from ._indicator import volatility_indicator, trend_indicator, momentum_indicator, volume_indicator, moving_average
+
+
+class indicator_pipeline(object):
+    def __init__(self):
+        """
+        a declarative indicator DAG: every node is a function of other nodes, named after what it computes (e.g., "EMA(history['Close'],12)"),
+        so the same intermediate declared by several indicators (EMA of Close at period p, True Range, typical price) is a single node
+        that run() evaluates only once per history
+
+        e.g.,
+            pipeline = indicator_pipeline()
+            pipeline.output(['MACD_macd','MACD_signal','MACD_histogram'], pipeline.MACD(fast_period=12, slow_period=26, signal_period=9))
+            pipeline.output(['PPO_ppo','PPO_signal','PPO_histogram'], pipeline.PPO(fast_period=12, slow_period=26, signal_period=9)) # shares EMA12 and EMA26
+            results = pipeline.run(history_df) # {'MACD_macd': ..., 'MACD_signal': ..., ...}
+        """
+        super().__init__()
+        self._nodes = OrderedDict() # name -> (function, input node names); declared inputs always come first, so this is a topological order
+        self._outputs = OrderedDict() # output name -> node name
+
+    def node(self, name: str, function, *inputs):
+        """
+        declare name = function(*inputs) unless a node of that name already exists; 'history' is the history DataFrame itself
+        """
+        for input_name in inputs:
+            if (input_name != 'history') and (input_name not in self._nodes):
+                raise KeyError(f"input node [{input_name}] of [{name}] is undefined")
+        if name not in self._nodes:
+            self._nodes[name] = (function, inputs)
+        return name
+
+    def _items(self, name: str, n_items: int):
+        """
+        one node per element of a node returning a tuple
+        """
+        return [self.node(f"{name}[{idx}]", lambda value, idx=idx: value[idx], name) for idx in range(n_items)]
+
+    def output(self, output_names, node_names):
+        if isinstance(output_names, str):
+            output_names, node_names = [output_names], [node_names]
+        if len(output_names) != len(node_names):
+            raise ValueError(f"{len(output_names)} output names for {len(node_names)} nodes")
+        for output_name, node_name in zip(output_names, node_names):
+            if node_name not in self._nodes:
+                raise KeyError(f"node [{node_name}] is undefined")
+            self._outputs[output_name] = node_name
+
+    @property
+    def n_nodes(self):
+        return len(self._nodes)
+
+    def run(self, history_df: pd.DataFrame):
+        """
+        evaluate every node once, in declaration order, and return {output name: value}
+        """
+        values = {'history': history_df}
+        for name, (function, inputs) in self._nodes.items():
+            values[name] = function(*[values[input_name] for input_name in inputs])
+        return OrderedDict((output_name, values[node_name]) for output_name, node_name in self._outputs.items())
+
+    ###########################################################################################
+    # shared intermediates
+
+    def column(self, column: str):
+        return self.node(f"history['{column}']", lambda history_df: history_df[column].to_numpy(), 'history')
+
+    def typical_price(self):
+        """
+        the 'Typical' column that get_ticker_data_dict() adds, or (high + low + close)/3 otherwise
+        """
+        def _typical_price(history_df):
+            if 'Typical' in history_df.columns:
+                return history_df['Typical'].to_numpy()
+            return ((history_df['High'] + history_df['Low'] + history_df['Close']) / 3).to_numpy()
+        return self.node("typical_price()", _typical_price, 'history')
+
+    def EMA(self, source: str, periods: int):
+        return self.node(f"EMA({source},{periods})", lambda data: moving_average(periods=periods).exponential(np.asarray(data)), source)
+
+    def true_range(self):
+        return self.node("true_range()", lambda high, low, close: trend_indicator().true_range(high_price=high, low_price=low, close_price=close), self.column('High'), self.column('Low'), self.column('Close'))
+
+    ###########################################################################################
+    # indicators; each returns the names of its output nodes
+
+    def RSI(self, RSI_periods: int = 14):
+        return [self.node(f"RSI({RSI_periods})", lambda close: momentum_indicator().RSI(close_price=close, RSI_periods=RSI_periods), self.column('Close'))]
+
+    def MACD(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        name = self.node(f"MACD({fast_period},{slow_period},{signal_period})",
+                         lambda close, fast_EMA, slow_EMA: momentum_indicator().MACD(close_price=close, fast_period=fast_period, slow_period=slow_period, signal_period=signal_period, fast_EMA=fast_EMA, slow_EMA=slow_EMA),
+                         self.column('Close'), self.EMA(self.column('Close'), fast_period), self.EMA(self.column('Close'), slow_period))
+        return self._items(name, 3)
+
+    def PPO(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        name = self.node(f"PPO({fast_period},{slow_period},{signal_period})",
+                         lambda close, fast_EMA, slow_EMA: momentum_indicator().PPO(close_price=close, fast_period=fast_period, slow_period=slow_period, signal_period=signal_period, fast_EMA=fast_EMA, slow_EMA=slow_EMA),
+                         self.column('Close'), self.EMA(self.column('Close'), fast_period), self.EMA(self.column('Close'), slow_period))
+        return self._items(name, 3)
+
+    def ADX(self, ADX_smoothing_len: int = 14, DI_len: int = 14):
+        name = self.node(f"ADX({ADX_smoothing_len},{DI_len})",
+                         lambda high, low, close, TR: trend_indicator().ADX(high_price=high, low_price=low, close_price=close, ADX_smoothing_len=ADX_smoothing_len, DI_len=DI_len, true_range=TR),
+                         self.column('High'), self.column('Low'), self.column('Close'), self.true_range())
+        return self._items(name, 8)
+
+    def OBV(self):
+        return [self.node("OBV()", lambda close, volume: momentum_indicator().OBV(close_price=close, volume=volume), self.column('Close'), self.column('Volume'))]
+
+    def Z_price_vol(self):
+        return [self.node("Z_price_vol()", lambda close, volume: momentum_indicator().Z_price_vol(close_price=close, volume=volume), self.column('Close'), self.column('Volume'))]
+
+    def money_flow(self, periods: int = 14):
+        return [self.node(f"money_flow({periods})",
+                          lambda high, low, close, volume, typical: momentum_indicator().money_flow(high_price=high, low_price=low, close_price=close, volume=volume, periods=periods, typical_price=typical),
+                          self.column('High'), self.column('Low'), self.column('Close'), self.column('Volume'), self.typical_price())]
+
+    def accumulation_distribution(self):
+        name = self.node("accumulation_distribution()",
+                         lambda high, low, close, volume: volume_indicator().accumulation_distribution(high_price=high, low_price=low, close_price=close, volume=volume),
+                         self.column('High'), self.column('Low'), self.column('Close'), self.column('Volume'))
+        return self._items(name, 2)
+
+    def PVI_NVI(self, short_periods: int = 9, long_periods: int = 255):
+        name = self.node(f"PVI_NVI({short_periods},{long_periods})",
+                         lambda close, volume: volume_indicator(short_periods=short_periods, long_periods=long_periods).PVI_NVI(close_price=close, volume=volume),
+                         self.column('Close'), self.column('Volume'))
+        return self._items(name, 6)
+
+    def Bollinger_Band(self, n_smoothing_days: int = 20, n_std_dev: float = 2):
+        name = self.node(f"Bollinger_Band({n_smoothing_days},{n_std_dev})",
+                         lambda typical: volatility_indicator().Bollinger_Band(typical_price=typical, n_smoothing_days=n_smoothing_days, n_std_dev=n_std_dev),
+                         self.typical_price())
+        return self._items(name, 3)
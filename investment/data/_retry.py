@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.error import URLError
+
+from ._scheduler import download_cancelled, _current, _host_key
+
+try:
+    import requests
+    _transport_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError)
+except ImportError:
+    _transport_errors = ()
+
+try:
+    from yfinance.exceptions import YFRateLimitError # newer versions of yfinance
+    _throttling_errors = (YFRateLimitError,)
+except ImportError:
+    _throttling_errors = ()
+
+
+# the messages of the failures reported rather than raised (e.g., by yf.download()) that are throttling, server errors or failed
+# connections: the HTTP status as a whole number (not, e.g., 1500 or 5000), or the wording of the error
+_throttled_pattern = re.compile(r"\b(429|5\d\d)\b|Too Many Requests|Rate ?limit|timed out|Connection (aborted|reset|refused)", re.IGNORECASE)
+
+
+class retryable_error(Exception):
+    """
+    a transient failure without an exception of its own, e.g., a throttled download reported as an empty result;
+    retry_after: the seconds to wait before retrying, if the server said so
+    """
+    def __init__(self, message: str = None, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _status_code(error: Exception):
+    """
+    the HTTP status of requests' HTTPError (error.response) or of urllib's HTTPError (error.code), if any
+    """
+    response = getattr(error, 'response', None)
+    status_code = getattr(response, 'status_code', None)
+    if status_code is None:
+        status_code = getattr(error, 'code', None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def retry_after_seconds(error: Exception):
+    """
+    the Retry-After of the error's response (in seconds or as an HTTP date), or of a retryable_error; None if there is none
+    """
+    if isinstance(error, retryable_error):
+        return error.retry_after
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if headers is None:
+        headers = getattr(error, 'headers', None)
+    value = None if headers is None else headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _sleep(seconds: float):
+    """
+    time.sleep(), interrupted with download_cancelled if the scheduler's task running in this thread is cancelled
+    """
+    task = getattr(_current, 'task', None)
+    if task is None:
+        time.sleep(seconds)
+    elif task._cancel_event.wait(seconds):
+        raise download_cancelled("cancelled while waiting to retry")
+
+
+class circuit_breaker(object):
+    """
+    pauses a host after failure_threshold consecutive failures: the calls wait cooldown seconds, then one goes through;
+    its success closes the breaker, its failure pauses the host again, for twice as long (up to max_cooldown)
+    """
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0, max_cooldown: float = 600.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._state = {} # host -> [consecutive failures, paused until (time.monotonic()), the next cooldown]
+        self._lock = threading.Lock()
+
+    def _host_state(self, host: str):
+        return self._state.setdefault(host, [0, 0.0, self.cooldown])
+
+    def pause_seconds(self, host: str):
+        with self._lock:
+            return max(0.0, self._host_state(host)[1] - time.monotonic())
+
+    def record_success(self, host: str):
+        with self._lock:
+            self._state.pop(host, None)
+
+    def record_failure(self, host: str):
+        """
+        returns the seconds the host is paused for, 0 if it is not
+        """
+        with self._lock:
+            state = self._host_state(host)
+            state[0] += 1
+            if state[0] < self.failure_threshold:
+                return 0.0
+            cooldown = state[2]
+            state[1] = time.monotonic() + cooldown
+            state[2] = min(self.max_cooldown, 2 * cooldown)
+            return cooldown
+
+
+class retry_policy(object):
+    """
+    call() with retries: exponential backoff with full jitter, i.e., a random wait in [0, min(max_delay, base_delay * multiplier**attempt)],
+    or the server's Retry-After (up to max_retry_after); a host's calls wait while its circuit_breaker pauses it
+
+    the errors are decided per class, first match in this order:
+      download_cancelled                         -> raised at once
+      retryable_error                            -> retried
+      an HTTP status (see _status_code())        -> retried if in retryable_status_codes (throttling, server errors), else fatal
+      retryable_errors (connection, timeout)     -> retried
+      any other Exception                        -> fatal, e.g., a KeyError of a delisted ticker, or a programming error
+    only throttling, server errors and connection failures count toward the host's circuit breaker (see is_host_failure())
+    """
+    retryable_status_codes = (408, 425, 429, 500, 502, 503, 504)
+    retryable_errors = (ConnectionError, TimeoutError, URLError) + _transport_errors + _throttling_errors
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0, multiplier: float = 2.0, max_delay: float = 60.0, max_retry_after: float = 300.0,
+                 breaker: circuit_breaker = None, seed: int = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.breaker = circuit_breaker() if breaker is None else breaker
+        self._random = random.Random(seed)
+
+    def is_retryable(self, error: Exception):
+        if isinstance(error, download_cancelled):
+            return False
+        if isinstance(error, retryable_error):
+            return True
+        status_code = _status_code(error)
+        if status_code is not None:
+            return status_code in self.retryable_status_codes
+        return isinstance(error, self.retryable_errors)
+
+    def is_host_failure(self, error: Exception):
+        """
+        whether the error tells of the host rather than of the request: throttling (429), a server error (5xx), or a failed connection
+        """
+        status_code = _status_code(error)
+        if status_code is not None:
+            return (status_code == 429) or (500 <= status_code < 600)
+        return self.is_retryable(error)
+
+    def delay(self, attempt: int, error: Exception = None):
+        """
+        the seconds to wait before retry number attempt (from 0)
+        """
+        retry_after = None if error is None else retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * self.multiplier ** attempt))
+
+    def call(self, function, host: str = None, name: str = None, max_retries: int = None, verbose: bool = True):
+        """
+        function() until it succeeds, raising its last error once it is fatal or max_retries (by default self.max_retries) are spent;
+        host: a host or URL, whose failures count toward its circuit breaker
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        host = None if host is None else (_host_key(host) or host)
+        name = getattr(function, '__name__', 'download') if name is None else name
+        attempt = 0
+        while True:
+            if host is not None:
+                pause_seconds = self.breaker.pause_seconds(host)
+                if pause_seconds > 0:
+                    if verbose:
+                        print(f"[{host}] is paused after repeated failures, waiting {pause_seconds:.1f} seconds")
+                    _sleep(pause_seconds)
+            try:
+                result = function()
+            except Exception as error:
+                if not self.is_retryable(error):
+                    raise
+                if (host is not None) and self.is_host_failure(error):
+                    pause_seconds = self.breaker.record_failure(host)
+                    if (pause_seconds > 0) and verbose:
+                        print(f"Warning: [{host}] failed repeatedly, pausing it for {pause_seconds:.1f} seconds")
+                if attempt >= max_retries:
+                    raise
+                delay = self.delay(attempt, error)
+                if verbose:
+                    print(f"Download unsuccessful: {name} [{type(error).__name__}: {error}]. Retry {attempt+1}/{max_retries} in {delay:.1f} seconds")
+                _sleep(delay)
+                attempt += 1
+            else:
+                if host is not None:
+                    self.breaker.record_success(host)
+                return result
+
+
+# the retry policy of the downloads of investment.data
+global_retry_policy = retry_policy()
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+import itertools
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class download_cancelled(Exception):
+    pass
+
+
+class token_bucket(object):
+    """
+    at most rate requests per second on average, in bursts of up to capacity requests; thread-safe
+    """
+    def __init__(self, rate: float, capacity: float = 1):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._last_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel_event: threading.Event = None):
+        """
+        block until a token is available and take it; False if cancel_event is set in the meantime
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_time) * self.rate)
+                self._last_time = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_seconds = (1 - self._tokens) / self.rate
+            if cancel_event is None:
+                time.sleep(wait_seconds)
+            elif cancel_event.wait(wait_seconds):
+                return False
+
+
+# the hosts downloaded from, and their buckets: (requests per second, burst)
+# a host matches the hosts of the URLs ending with it, e.g., 'yahoo.com' for query1.finance.yahoo.com
+host_rate_limits = {'yahoo.com':            (2.0, 5),
+                    'ishares.com':          (1.0, 2),
+                    'ark-funds.com':        (1.0, 2),
+                    'ftp.nasdaqtrader.com': (1.0, 2)}
+
+_host_buckets = {}
+_host_buckets_lock = threading.Lock()
+
+def set_host_rate_limit(host: str, rate: float = None, capacity: float = 1):
+    """
+    rate requests per second to host, in bursts of up to capacity; no limit if rate is None
+    """
+    with _host_buckets_lock:
+        if rate is None:
+            host_rate_limits.pop(host, None)
+        else:
+            host_rate_limits[host] = (rate, capacity)
+        _host_buckets.pop(host, None)
+
+def _host_key(host_or_url: str):
+    host = (urlparse(host_or_url).hostname if '://' in host_or_url else host_or_url).lower()
+    for this_host in host_rate_limits.keys():
+        if (host == this_host) or host.endswith(f".{this_host}"):
+            return this_host
+    return None
+
+def throttle(host_or_url: str, cancel_event: threading.Event = None):
+    """
+    wait for the rate limit of the host (or of the URL's host) before a request; no wait for the hosts without a limit
+    in a scheduler's task, the task's cancellation interrupts the wait with download_cancelled
+    """
+    host = _host_key(host_or_url)
+    if host is None:
+        return
+    with _host_buckets_lock:
+        if host not in _host_buckets:
+            _host_buckets[host] = token_bucket(*host_rate_limits[host])
+        bucket = _host_buckets[host]
+    if cancel_event is None:
+        task = getattr(_current, 'task', None)
+        cancel_event = None if task is None else task._cancel_event
+    if not bucket.acquire(cancel_event = cancel_event):
+        raise download_cancelled(f"cancelled while waiting for [{host}]")
+
+
+_current = threading.local() # the task a worker thread runs
+
+
+class download_task(object):
+    """
+    a function submitted to a download_scheduler; status is 'pending', 'running', 'done', 'failed' or 'cancelled'
+    """
+    def __init__(self, function, args, kwargs, priority: int = 0, name: str = None, host: str = None):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.name = name
+        self.host = host
+        self.status = 'pending'
+        self.result = None
+        self.error = None
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+
+    def cancel(self):
+        """
+        a pending task is not run; a running one is interrupted at its next throttle()
+        """
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def done(self):
+        return self._done_event.is_set()
+
+    def wait(self, timeout: float = None):
+        return self._done_event.wait(timeout)
+
+    def __repr__(self):
+        return f"download_task(name={self.name!r}, priority={self.priority}, status={self.status!r})"
+
+
+class download_scheduler(object):
+    """
+    runs the submitted tasks in n_workers threads, the lowest priority first (then in the order of submission), and calls
+    progress_callback(n_finished, n_submitted, task) from the worker thread after each task, whatever its status, one call
+    at a time and with n_finished increasing;
+    the requests of the tasks are rate limited per host (see throttle()), so throughput grows with n_workers up to the limits
+
+        scheduler = download_scheduler(n_workers=8, progress_callback=lambda n, total, task: print(f"{n}/{total} {task.name}"))
+        tasks = [scheduler.submit(get_ticker_data_dict, ticker=ticker, name=ticker) for ticker in tickers]
+        scheduler.wait()
+        scheduler.shutdown()
+    """
+    def __init__(self, n_workers: int = 4, progress_callback = None):
+        if n_workers < 1:
+            raise ValueError(f"n_workers must be at least 1, got {n_workers}")
+        self.n_workers = n_workers
+        self.progress_callback = progress_callback
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._all_done = threading.Condition(self._lock)
+        self._tasks = []
+        self._n_finished = 0
+        self._n_reported = 0 # the finished tasks whose progress_callback has returned
+        self._progress_lock = threading.Lock()
+        self._workers = []
+        self._is_shutdown = False
+
+    def submit(self, function, *args, priority: int = 0, name: str = None, host: str = None, **kwargs):
+        """
+        host: a host (or URL) to throttle() before running the task, for a function that does not throttle its own requests
+        """
+        task = download_task(function, args, kwargs, priority = priority, name = name, host = host)
+        with self._lock:
+            if self._is_shutdown:
+                raise RuntimeError("cannot submit a task to a download_scheduler after shutdown()")
+            self._tasks.append(task)
+            if len(self._workers) < self.n_workers:
+                worker = threading.Thread(target=self._work, name=f"download worker {len(self._workers)}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+        self._queue.put((priority, next(self._counter), task))
+        return task
+
+    def _work(self):
+        while True:
+            _, _, task = self._queue.get()
+            if task is None: # shutdown
+                return
+            if task.cancelled:
+                task.status = 'cancelled'
+            else:
+                task.status = 'running'
+                _current.task = task
+                try:
+                    if task.host is not None:
+                        throttle(task.host)
+                    task.result = task.function(*task.args, **task.kwargs)
+                    task.status = 'done'
+                except download_cancelled:
+                    task.status = 'cancelled'
+                except Exception as error:
+                    task.error = error
+                    task.status = 'cancelled' if task.cancelled else 'failed' # e.g., download_cancelled wrapped by the function
+                finally:
+                    _current.task = None
+            task._done_event.set()
+            with self._progress_lock: # the callbacks in the order of n_finished, one at a time
+                with self._lock:
+                    self._n_finished += 1
+                    n_finished, n_submitted = self._n_finished, len(self._tasks)
+                if self.progress_callback is not None:
+                    try:
+                        self.progress_callback(n_finished, n_submitted, task)
+                    except Exception as error:
+                        print(f"Warning: the progress callback failed: {error}")
+                with self._lock:
+                    self._n_reported = n_finished
+                    self._all_done.notify_all()
+
+    @property
+    def tasks(self):
+        with self._lock:
+            return list(self._tasks)
+
+    def cancel(self):
+        """
+        cancel every task submitted so far
+        """
+        for task in self.tasks:
+            task.cancel()
+
+    def wait(self, timeout: float = None):
+        """
+        block until every task submitted so far is finished, and its progress reported; False on timeout
+        """
+        with self._lock:
+            return self._all_done.wait_for(lambda: self._n_reported == len(self._tasks), timeout = timeout)
+
+    def shutdown(self, wait: bool = True, cancel: bool = False):
+        """
+        stop the workers once the tasks are finished (cancelled first if cancel)
+        """
+        if cancel:
+            self.cancel()
+        with self._lock:
+            self._is_shutdown = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._queue.put((float('inf'), next(self._counter), None))
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait = True, cancel = exc_type is not None)
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+import os
+import shutil
+from collections import OrderedDict
+
+import pandas as pd
+
+try:
+    import pyarrow # optional, for the columnar formats
+except ImportError:
+    pyarrow = None
+
+
+def _utc_dates(dates: pd.Series):
+    """
+    Date as UTC datetimes, from the '%Y-%m-%d' strings of download_ticker_history_df() (and of the CSV files) or from datetimes
+    "utc=True" is to be consistent with yfinance datetimes, which are received as UTC.
+    """
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates.dt.tz_localize('UTC') if dates.dt.tz is None else dates.dt.tz_convert('UTC')
+    return pd.to_datetime(dates, format='%Y-%m-%d', utc=True)
+
+
+class history_storage(object):
+    """
+    the file format of a ticker's cached history, {ticker}_history{suffix} in the data dir of get_ticker_data_dict()
+    read() returns Date as UTC datetimes, whatever the format
+    """
+    name = None
+    suffix = None
+
+    def path(self, data_dir, ticker: str):
+        return data_dir / f"{ticker}_history{self.suffix}"
+
+    def read(self, path):
+        raise NotImplementedError
+
+    def write(self, history_df: pd.DataFrame, path):
+        raise NotImplementedError
+
+
+class csv_history_storage(history_storage):
+    """
+    the format of the earlier versions, kept for import/export: Date as '%Y-%m-%d', every value parsed from text on read
+    """
+    name = 'csv'
+    suffix = '.csv'
+
+    def read(self, path):
+        history_df = pd.read_csv(path, index_col=False)
+        history_df['Date'] = _utc_dates(history_df['Date'])
+        return history_df
+
+    def write(self, history_df: pd.DataFrame, path):
+        history_df.assign(Date = _utc_dates(history_df['Date']).dt.strftime('%Y-%m-%d')).to_csv(path, index=False)
+
+
+class parquet_history_storage(history_storage):
+    """
+    columnar and compressed, with native datetime64 and float columns (requires pyarrow)
+    """
+    name = 'parquet'
+    suffix = '.parquet'
+
+    def read(self, path):
+        return pd.read_parquet(path)
+
+    def write(self, history_df: pd.DataFrame, path):
+        history_df.assign(Date = _utc_dates(history_df['Date'])).reset_index(drop=True).to_parquet(path, index=False)
+
+
+class feather_history_storage(history_storage):
+    """
+    Arrow IPC, uncompressed columns mapped as they are, the fastest to read (requires pyarrow)
+    """
+    name = 'feather'
+    suffix = '.feather'
+
+    def read(self, path):
+        return pd.read_feather(path)
+
+    def write(self, history_df: pd.DataFrame, path):
+        history_df.assign(Date = _utc_dates(history_df['Date'])).reset_index(drop=True).to_feather(path)
+
+
+_history_storages = OrderedDict((storage.name, storage) for storage in [csv_history_storage(), parquet_history_storage(), feather_history_storage()])
+
+def register_history_storage(storage: history_storage):
+    """
+    add a storage, e.g., a subclass of history_storage for another format, selectable by set_history_storage(storage.name)
+    """
+    _history_storages[storage.name] = storage
+
+# the format of the cached histories:
+#   'parquet' (the default; 'csv' if pyarrow is not installed), 'feather', or 'csv' (for import/export, as in the earlier versions)
+# the default is the environment variable INVESTMENT_HISTORY_STORAGE; a history found in another format, e.g., a CSV cache of
+# an earlier version, is converted on its first read, and the older file moved to the backup dir
+def set_history_storage(name: str):
+    global history_storage_name
+    if name not in _history_storages:
+        raise ValueError(f"history storage [{name}] is not one of {list(_history_storages.keys())}")
+    if (name in ('parquet', 'feather')) and (pyarrow is None):
+        raise ImportError(f"history storage [{name}] requires pyarrow (pip install pyarrow)")
+    history_storage_name = name
+
+def get_history_storage():
+    return history_storage_name
+
+history_storage_name = os.environ.get('INVESTMENT_HISTORY_STORAGE', 'csv' if pyarrow is None else 'parquet')
+if history_storage_name not in _history_storages:
+    print(f"Warning: INVESTMENT_HISTORY_STORAGE = [{history_storage_name}] is not one of {list(_history_storages.keys())}, using [csv]")
+    history_storage_name = 'csv'
+elif (history_storage_name in ('parquet', 'feather')) and (pyarrow is None):
+    print(f"Warning: INVESTMENT_HISTORY_STORAGE = [{history_storage_name}] but pyarrow is not installed, using [csv]")
+    history_storage_name = 'csv'
+
+
+def _storage(name: str = None):
+    return _history_storages[get_history_storage() if name is None else name]
+
+
+def history_file(data_dir, ticker: str, storage: str = None):
+    return _storage(storage).path(data_dir, ticker)
+
+
+def history_file_exists(data_dir, ticker: str):
+    """
+    True if the history is cached in any format
+    """
+    return any(storage.path(data_dir, ticker).is_file() for storage in _history_storages.values())
+
+
+def read_history_df(data_dir, ticker: str, storage: str = None):
+    """
+    the cached history, converted to the storage format first if it is only found in another one
+    """
+    this_storage = _storage(storage)
+    path = this_storage.path(data_dir, ticker)
+    if not path.is_file():
+        for other_storage in _history_storages.values():
+            other_path = other_storage.path(data_dir, ticker)
+            if (other_storage is not this_storage) and other_path.is_file():
+                history_df = other_storage.read(other_path)
+                write_history_df(history_df, data_dir, ticker, storage = this_storage.name)
+                (data_dir / "backup").mkdir(parents=True, exist_ok=True)
+                shutil.move(str(other_path), str(data_dir / "backup" / other_path.name))
+                return history_df
+    return this_storage.read(path)
+
+
+def write_history_df(history_df: pd.DataFrame, data_dir, ticker: str, storage: str = None):
+    """
+    written to a temporary file first, so that a reader never sees a partial history
+    """
+    this_storage = _storage(storage)
+    path = this_storage.path(data_dir, ticker)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    this_storage.write(history_df, tmp_path)
+    os.replace(tmp_path, path)
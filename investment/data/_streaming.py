@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from ._indicator import _to_float, _no_data
+
+
+def _as_array(values):
+    if type(values) in [pd.Series, pd.DataFrame]:
+        values = values.to_numpy()
+    return np.asarray(values, dtype=float)
+
+
+class _indicator_state(object):
+    """
+    an indicator recurrence whose O(1) state is advanced by update(new values), instead of recomputing the whole history
+
+    the values can be 1-D (time) or 2-D (time x tickers), the state then holds one value per ticker;
+    seed(history) is update() on a fresh state, so a seeded state emits exactly what the batch indicator in _indicator.py emits;
+    to_dict()/from_dict() (de)serialize the parameters and the state to/from plain (JSON-compatible) python objects
+    """
+    _params = ()
+    _state = ()
+
+    def reset(self):
+        raise NotImplementedError
+
+    def seed(self, *args):
+        self.reset()
+        return self.update(*args)
+
+    def update(self, *args):
+        raise NotImplementedError
+
+    def to_dict(self):
+        return {'class': type(self).__name__,
+                'params': {name: getattr(self, name) for name in self._params},
+                'state': {name: _encode(getattr(self, name)) for name in self._state}}
+
+    @classmethod
+    def from_dict(cls, state_dict: dict):
+        state_class = _state_classes[state_dict['class']]
+        if not issubclass(state_class, cls):
+            raise TypeError(f"[{state_dict['class']}] is not a {cls.__name__}")
+        obj = state_class(**state_dict['params'])
+        for name, value in state_dict['state'].items():
+            setattr(obj, name, _decode(value))
+        return obj
+
+
+def _encode(value):
+    if isinstance(value, _indicator_state):
+        return value.to_dict()
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        return _indicator_state.from_dict(value)
+    if isinstance(value, (list, float)):
+        return np.asarray(value, dtype=float)
+    return value
+
+
+class ema_state(_indicator_state):
+    _params = ('periods', 'smoothing', 'alpha')
+    _state = ('value',)
+
+    def __init__(self, periods: int = 30, smoothing = 2, alpha = None):
+        """
+        EMA[0] = data[0]; EMA[t] = alpha * data[t] + (1-alpha) * EMA[t-1], as moving_average(periods, smoothing).exponential()
+        alpha: overrides smoothing/(1+periods), e.g., 1/periods for rma
+        """
+        super().__init__()
+        self.periods = periods
+        self.smoothing = smoothing
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.value = None # EMA of the last bar
+
+    def update(self, data_series: np.ndarray):
+        data = _as_array(data_series)
+        if data.shape[0] == 0:
+            return data.copy()
+        alpha = self.smoothing / (1+self.periods) if self.alpha is None else self.alpha
+        last = data[:1] if self.value is None else np.asarray(self.value)[np.newaxis]
+        EMA, _ = lfilter([alpha], [1, -(1-alpha)], data, axis=0, zi=(1-alpha) * last)
+        self.value = EMA[-1]
+        return EMA
+
+
+class rma_state(ema_state):
+    _params = ('periods',)
+
+    def __init__(self, periods: int = 14):
+        """
+        see rma in https://www.tradingview.com/pine-script-reference/, as moving_average(periods).rma()
+        """
+        super().__init__(periods=periods, alpha=1/periods)
+
+
+class smma_state(_indicator_state):
+    _params = ('periods',)
+    _state = ('value', 'warm_up')
+
+    def __init__(self, periods: int = 14):
+        """
+        SMMA[periods-1] = mean(data[:periods]); SMMA[t] = ((periods-1)*SMMA[t-1] + data[t])/periods, as moving_average(periods).smoothed()
+        the state holds the (at most periods) values seen so far until the first SMMA is available
+        """
+        super().__init__()
+        self.periods = periods
+        self.reset()
+
+    def reset(self):
+        self.value = None # SMMA of the last bar, None during the warm-up
+        self.warm_up = None # values of the warm-up bars
+
+    def update(self, data_series: np.ndarray):
+        data = _as_array(data_series)
+        SMMA = np.full(shape=data.shape, fill_value=np.nan, dtype=float)
+        idx = 0
+        if self.value is None:
+            idx = min(self.periods - (0 if self.warm_up is None else self.warm_up.shape[0]), data.shape[0])
+            self.warm_up = data[:idx] if self.warm_up is None else np.concatenate([self.warm_up, data[:idx]])
+            if self.warm_up.shape[0] < self.periods:
+                return SMMA
+            self.value = self.warm_up.mean(axis=0)
+            self.warm_up = None
+            SMMA[idx-1] = self.value
+        if idx < data.shape[0]:
+            alpha = 1 / self.periods
+            SMMA[idx:], _ = lfilter([alpha], [1, -(1-alpha)], data[idx:], axis=0, zi=((1-alpha) * np.asarray(self.value))[np.newaxis])
+            self.value = SMMA[-1]
+        return SMMA
+
+
+class rsi_state(_indicator_state):
+    _params = ('RSI_periods',)
+    _state = ('last_close', 'up', 'down')
+
+    def __init__(self, RSI_periods: int = 14):
+        """
+        as momentum_indicator().RSI()
+        """
+        super().__init__()
+        self.RSI_periods = RSI_periods
+        self.reset()
+
+    def reset(self):
+        self.last_close = None
+        self.up = smma_state(periods=self.RSI_periods)
+        self.down = smma_state(periods=self.RSI_periods)
+
+    def update(self, close_price: np.ndarray):
+        close_price = _as_array(close_price)
+        if close_price.shape[0] == 0:
+            return close_price.copy()
+        previous_close = close_price[:1] if self.last_close is None else np.asarray(self.last_close)[np.newaxis] # zero change on the first day
+        price_change = np.nan_to_num(np.diff(close_price, axis=0, prepend=previous_close)) # no change from or to a missing close
+        self.last_close = close_price[-1]
+        up = self.up.update(np.clip(price_change, 0, None))
+        down = self.down.update(np.clip(-price_change, 0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            RSI = np.where(down == 0, 100.0, np.where(up == 0, 0.0, 100 - 100/(1+up/down))) # NaN during the warm-up
+        return RSI
+
+
+class obv_state(_indicator_state):
+    _state = ('last_close', 'value')
+
+    def __init__(self):
+        """
+        as momentum_indicator().OBV()
+        """
+        super().__init__()
+        self.reset()
+
+    def reset(self):
+        self.last_close = None
+        self.value = None
+
+    def update(self, close_price: np.ndarray, volume: np.ndarray):
+        close_price = _as_array(close_price)
+        volume = _as_array(volume)
+        if close_price.shape[0] == 0:
+            return close_price.copy()
+        if self.last_close is None: # OBV starts at zero on the first day
+            previous_close, previous_obv = close_price[:1], np.zeros(shape=close_price.shape[1:], dtype=float)
+        else:
+            previous_close, previous_obv = np.asarray(self.last_close)[np.newaxis], np.asarray(self.value)
+        direction = np.nan_to_num(np.sign(np.diff(close_price, axis=0, prepend=previous_close))) # no change from or to a missing close
+        signed_volume = np.where(direction != 0, direction * volume, 0.0)
+        obv = previous_obv + np.cumsum(signed_volume, axis=0)
+        self.last_close, self.value = close_price[-1], obv[-1]
+        return obv
+
+
+class accumulation_distribution_state(_indicator_state):
+    _state = ('value', 'n', 'mean', 'M2')
+
+    def __init__(self):
+        """
+        as volume_indicator().accumulation_distribution()
+
+        the Z-score of A/D is relative to the mean and the standard deviation of the whole history, which the state keeps as
+        running moments (https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Parallel_algorithm); the Z-scores
+        emitted for the new bars are those of the batch indicator over the history extended with the new bars, while the
+        Z-scores emitted earlier are not revised
+        """
+        super().__init__()
+        self.reset()
+
+    def reset(self):
+        self.value = None # A/D of the last bar
+        self.n = 0
+        self.mean = None
+        self.M2 = None # sum of squared deviations from the mean
+
+    def update(self, high_price: np.ndarray, low_price: np.ndarray, close_price: np.ndarray, volume: np.ndarray):
+        high_price = _as_array(high_price)
+        low_price = _as_array(low_price)
+        close_price = _as_array(close_price)
+        volume = _as_array(volume)
+        if close_price.shape[0] == 0:
+            return close_price.copy(), close_price.copy()
+        price_range = high_price - low_price
+        with np.errstate(divide='ignore', invalid='ignore'):
+            CMFV = np.where(price_range == 0, 0.0, ((close_price - low_price) - (high_price - close_price)) / price_range * volume) # CMFV: Current money flow volume
+        ad = np.cumsum(CMFV, axis=0)
+        if self.value is not None:
+            ad += np.asarray(self.value)
+        self.value = ad[-1]
+        # merge the moments of the new bars into the running ones
+        n_new = ad.shape[0]
+        mean_new = ad.mean(axis=0)
+        M2_new = ((ad - mean_new)**2).sum(axis=0)
+        if self.n == 0:
+            self.mean, self.M2 = mean_new, M2_new
+        else:
+            delta = mean_new - np.asarray(self.mean)
+            n_total = self.n + n_new
+            self.mean = np.asarray(self.mean) + delta * n_new / n_total
+            self.M2 = np.asarray(self.M2) + M2_new + delta**2 * self.n * n_new / n_total
+        self.n += n_new
+        Z_ad = (ad - self.mean)/np.sqrt(self.M2 / self.n)
+        return ad, Z_ad
+
+
+class PVI_NVI_state(_indicator_state):
+    _params = ('short_periods', 'long_periods')
+    _state = ('last_close', 'last_volume', 'PVI', 'NVI', 'PVI_max', 'NVI_max', 'PVI_EMA_short', 'NVI_EMA_short', 'PVI_EMA_long', 'NVI_EMA_long')
+
+    def __init__(self, short_periods: int = 9, long_periods: int = 255):
+        """
+        as volume_indicator(short_periods, long_periods).PVI_NVI()
+
+        PVI and NVI are normalized by their maximum over the whole history; the state keeps the unnormalized indexes and their
+        running maxima, and since the EMAs are linear the EMAs of the unnormalized indexes are normalized the same way;
+        the values emitted for the new bars are those of the batch indicator over the history extended with the new bars,
+        while the values emitted earlier are to be rescaled by the ratio of the old maximum to the new one (see scale())
+        """
+        super().__init__()
+        self.short_periods = short_periods
+        self.long_periods = long_periods
+        self.reset()
+
+    def reset(self):
+        self.last_close = self.last_volume = None
+        self.PVI = self.NVI = None # unnormalized, starting at 1000
+        self.PVI_max = self.NVI_max = None
+        self.PVI_EMA_short = ema_state(periods=self.short_periods)
+        self.NVI_EMA_short = ema_state(periods=self.short_periods)
+        self.PVI_EMA_long = ema_state(periods=self.long_periods)
+        self.NVI_EMA_long = ema_state(periods=self.long_periods)
+
+    def scale(self):
+        """
+        (PVI, NVI) normalization factors of the last emitted values
+        """
+        return 1000/np.asarray(self.PVI_max), 1000/np.asarray(self.NVI_max)
+
+    def update(self, close_price: np.ndarray, volume: np.ndarray):
+        close_price = _as_array(close_price)
+        volume = _as_array(volume)
+        if close_price.shape[0] == 0:
+            return (close_price.copy(),)*6
+        if self.last_close is None:
+            ones = np.ones(shape=(1,) + close_price.shape[1:], dtype=float)
+            price_ratio = np.concatenate([ones, close_price[1:] / close_price[:-1]])
+            volume_up = np.concatenate([np.zeros(shape=ones.shape, dtype=bool), volume[1:] > volume[:-1]])
+            previous_PVI = previous_NVI = 1000.0
+        else:
+            price_ratio = close_price / np.concatenate([np.asarray(self.last_close)[np.newaxis], close_price[:-1]])
+            volume_up = volume > np.concatenate([np.asarray(self.last_volume)[np.newaxis], volume[:-1]]) # the reference volume is the daily volume
+            previous_PVI, previous_NVI = np.asarray(self.PVI), np.asarray(self.NVI)
+        PVI = previous_PVI * np.cumprod(np.where(volume_up, price_ratio, 1.0), axis=0)
+        NVI = previous_NVI * np.cumprod(np.where(volume_up, 1.0, price_ratio), axis=0)
+        self.last_close, self.last_volume, self.PVI, self.NVI = close_price[-1], volume[-1], PVI[-1], NVI[-1]
+        self.PVI_max = PVI.max(axis=0) if self.PVI_max is None else np.maximum(self.PVI_max, PVI.max(axis=0))
+        self.NVI_max = NVI.max(axis=0) if self.NVI_max is None else np.maximum(self.NVI_max, NVI.max(axis=0))
+        PVI_scale, NVI_scale = self.scale()
+        return (PVI * PVI_scale, NVI * NVI_scale,
+                self.PVI_EMA_short.update(PVI) * PVI_scale, self.NVI_EMA_short.update(NVI) * NVI_scale,
+                self.PVI_EMA_long.update(PVI) * PVI_scale, self.NVI_EMA_long.update(NVI) * NVI_scale)
+
+
+_state_classes = {state_class.__name__: state_class for state_class in [ema_state, rma_state, smma_state, rsi_state, obv_state, accumulation_distribution_state, PVI_NVI_state]}
+
+
+class streaming_indicators(object):
+    def __init__(self, RSI_periods: int = 14, short_periods: int = 9, long_periods: int = 255):
+        """
+        the streamable indicators of a ticker, advanced by the rows appended to its history
+
+        e.g.,
+            indicators = streaming_indicators()
+            indicators.seed(history_df)              # once, O(history)
+            state_dict = indicators.to_dict()        # JSON-compatible, to be saved along with the history
+            ...
+            indicators = streaming_indicators.from_dict(state_dict)
+            new_index_df = indicators.update(new_history_df) # O(new bars); rows not after the last seen date are skipped
+        """
+        super().__init__()
+        self.RSI_periods = RSI_periods
+        self.short_periods = short_periods
+        self.long_periods = long_periods
+        self.last_date = None
+        self.has_volume = None
+        self.states = {'RSI': rsi_state(RSI_periods=RSI_periods),
+                       'Close_EMA_short': ema_state(periods=short_periods),
+                       'Close_EMA_long': ema_state(periods=long_periods),
+                       'OBV': obv_state(),
+                       'OBV_EMA_short': ema_state(periods=short_periods),
+                       'OBV_EMA_long': ema_state(periods=long_periods),
+                       'accumulation_distribution': accumulation_distribution_state(),
+                       'PVI_NVI': PVI_NVI_state(short_periods=short_periods, long_periods=long_periods)}
+
+    def seed(self, history_df: pd.DataFrame):
+        for state in self.states.values():
+            state.reset()
+        self.last_date = None
+        self.has_volume = None
+        return self.update(history_df)
+
+    def update(self, history_df: pd.DataFrame):
+        """
+        returns a DataFrame with the Date and the indicators (named as in the GUI) of the rows of history_df after the last seen date
+        """
+        if self.last_date is not None:
+            history_df = history_df[history_df['Date'] > pd.Timestamp(self.last_date)]
+        index_df = pd.DataFrame({'Date': history_df['Date'].to_numpy()})
+        if len(history_df.index) == 0:
+            return index_df
+        if self.has_volume is None:
+            self.has_volume = not np.all(_no_data(_to_float(history_df['Volume'])))
+        self.last_date = str(history_df['Date'].iloc[-1])
+        close = history_df['Close'].to_numpy(dtype=float)
+        index_df[f"RSI{self.RSI_periods}"] = self.states['RSI'].update(close)
+        index_df[f"Close_EMA{self.short_periods}"] = self.states['Close_EMA_short'].update(close)
+        index_df[f"Close_EMA{self.long_periods}"] = self.states['Close_EMA_long'].update(close)
+        if self.has_volume:
+            volume = history_df['Volume'].to_numpy(dtype=float)
+            OBV = self.states['OBV'].update(close, volume)
+            index_df['OBV'] = OBV
+            index_df[f"OBV_EMA{self.short_periods}"] = self.states['OBV_EMA_short'].update(OBV)
+            index_df[f"OBV_EMA{self.long_periods}"] = self.states['OBV_EMA_long'].update(OBV)
+            index_df['Accumulation_Distribution'], index_df['Accumulation_Distribution_Zscore'] = self.states['accumulation_distribution'].update(history_df['High'], history_df['Low'], close, volume)
+            PVI_NVI_columns = ['PVI', 'NVI', f"PVI_EMA{self.short_periods}", f"NVI_EMA{self.short_periods}", f"PVI_EMA{self.long_periods}", f"NVI_EMA{self.long_periods}"]
+            for column, values in zip(PVI_NVI_columns, self.states['PVI_NVI'].update(close, volume)):
+                index_df[column] = values
+        return index_df
+
+    def to_dict(self):
+        return {'params': {'RSI_periods': self.RSI_periods, 'short_periods': self.short_periods, 'long_periods': self.long_periods},
+                'last_date': self.last_date,
+                'has_volume': self.has_volume,
+                'states': {name: state.to_dict() for name, state in self.states.items()}}
+
+    @classmethod
+    def from_dict(cls, state_dict: dict):
+        obj = cls(**state_dict['params'])
+        obj.last_date = state_dict['last_date']
+        obj.has_volume = state_dict['has_volume']
+        obj.states = {name: _indicator_state.from_dict(state) for name, state in state_dict['states'].items()}
+        return obj
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+import json
+import os
+
+import pandas as pd
+
+# bumped whenever the fields change, so that older summary files are recomputed
+summary_version = 1
+
+
+def history_summary_key(history_df: pd.DataFrame):
+    """
+    what a summary was computed from: a redownloaded (or truncated) history has another row count or last date
+    """
+    n_rows = len(history_df.index)
+    return {'n_rows': n_rows, 'last_date': str(history_df['Date'].iloc[-1]) if n_rows > 0 else None}
+
+
+def ticker_summary_file(ticker: str, data_root_dir = None):
+    """
+    the summary sidecar next to the ticker's cached history, as managed by get_ticker_data_dict()
+    """
+    if data_root_dir is None:
+        from ._ticker import global_data_root_dir
+        data_root_dir = global_data_root_dir
+    return data_root_dir / "ticker_data/yfinance" / f"{ticker.upper()}_summary.json"
+
+
+def compute_ticker_summary(ticker_data_dict: dict, n_extremes: int = 10):
+    """
+    the statistics that the info panel and screening read on every display, computed once per history:
+    last close, 52-week high/low, the n_extremes all-time highs and lows, max_diff_pct over Ticker.max_diff_pct_years,
+    HV over Ticker.HV_periods, and the dividends yield of the last 12 months
+    """
+    from ._ticker import Ticker
+    this_ticker = Ticker(ticker_data_dict={key: value for key, value in ticker_data_dict.items() if key != 'summary'}) # from the history, not from an older summary
+    history_df = this_ticker.ticker_history
+    summary = {'version': summary_version, 'history': history_summary_key(history_df), 'n_extremes': n_extremes}
+    if len(history_df.index) == 0:
+        return summary
+    summary['last_close_price'] = float(this_ticker.last_close_price)
+    summary['fifty_two_weeks_high'] = this_ticker.fifty_two_weeks_high
+    summary['fifty_two_weeks_low'] = this_ticker.fifty_two_weeks_low
+    summary['all_time_highs'] = [[str(date), float(high)] for date, high in this_ticker.all_time_highs_df(n=n_extremes).itertuples(index=False)]
+    summary['all_time_lows'] = [[str(date), float(low)] for date, low in this_ticker.all_time_lows_df(n=n_extremes).itertuples(index=False)]
+    max_diff_pct = this_ticker.max_diff_pct_horizons(ticker_history=history_df, days_list=[365.25*year for year in Ticker.max_diff_pct_years])
+    summary['max_diff_pct'] = {str(year): [float(value) for value in values] for year, values in zip(Ticker.max_diff_pct_years, max_diff_pct)}
+    summary['HV'] = {str(period): this_ticker.historical_volatility(periods=period) for period in Ticker.HV_periods}
+    try:
+        summary['last_1yr_dividends_pct'] = float(this_ticker.last_1yr_dividends_pct)
+    except (KeyError, TypeError, AttributeError, ValueError): # e.g., no info or dividends were downloaded; left to Ticker on display, as before
+        pass
+    return summary
+
+
+def read_ticker_summary(summary_file, history_df: pd.DataFrame = None):
+    """
+    the summary in summary_file, or None if there is none, it is of an older version, or (given history_df) it is of another history
+    """
+    try:
+        with open(summary_file, 'r') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if summary.get('version') != summary_version:
+        return None
+    if (history_df is not None) and (summary.get('history') != history_summary_key(history_df)):
+        return None
+    return summary
+
+
+def write_ticker_summary(summary_file, summary: dict):
+    """
+    written to a temporary file first, so that a reader never sees a partial summary
+    """
+    tmp_file = f"{summary_file}.tmp"
+    try:
+        with open(tmp_file, 'w') as f:
+            json.dump(summary, f)
+        os.replace(tmp_file, summary_file)
+    except OSError as error:
+        print(f"Warning: cannot write the summary [{summary_file}]: {error}")
+
+
+def get_ticker_summary_dict(ticker: str, data_root_dir = None):
+    """
+    the summary sidecar of a cached ticker (see compute_ticker_summary()), without loading its history, e.g., to screen the universe;
+    None if the ticker has no (current) summary yet, which get_ticker_data_dict() writes
+    """
+    return read_ticker_summary(ticker_summary_file(ticker, data_root_dir = data_root_dir))
@@ -10,6 +10,7 @@ import numpy as np
 import pandas as pd
 
 from ._data import timedata
+from ._scheduler import throttle
 from datetime import datetime, timedelta, timezone
 from calendar import day_name
 
@@ -118,6 +119,7 @@ def download_and_load_IOO_data(data_root_dir: str = None):
         print(f'Attempt to download [{ETF_name}] data from www.ishares.com ...', end='')
         url = "https://www.ishares.com/us/products/239737/ishares-global-100-etf/1467271812596.ajax?fileType=csv&fileName=IOO_holdings&dataType=fund"
         headers = {'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36'} # https://stackoverflow.com/questions/57155387/workaround-for-blocked-get-requests-in-python
+        throttle(url)
         r = requests.get(url, headers=headers)
         if r.status_code == 200:
             with open(filename, 'wb') as outfile:
@@ -201,6 +203,7 @@ def download_and_load_ARK_data(data_root_dir: str = None):
             print(f'Attempt to download [{ETF_name}] data from ark-funds.com ...', end='')
             url = "https://ark-funds.com/wp-content/uploads/funds-etf-csv/" + pairs[ETF_name]
             headers = {'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36'} # https://stackoverflow.com/questions/57155387/workaround-for-blocked-get-requests-in-python
+            throttle(url)
             r = requests.get(url, headers=headers)
             if r.status_code == 200:
                 with open(filename, 'wb') as outfile:
@@ -248,6 +251,7 @@ def download_nasdaqtrader_data(data_root_dir: str = None):
     ftp_server = 'ftp.nasdaqtrader.com'
     ftp_username = 'anonymous'
     ftp_password = 'anonymous'
+    throttle(ftp_server)
     ftp = ftplib.FTP(ftp_server)
     ftp.login(ftp_username, ftp_password)
     files = [('SymbolDirectory/nasdaqlisted.txt', data_dir / 'nasdaqlisted.txt'), 
@@ -717,6 +721,9 @@ tradable_tickers = [ticker for ticker in ticker_group_dict['All'] if (ticker not
 ###########################################################################################
 
 class Ticker(object):
+    HV_periods = (10, 20, 21, 30, 60) # the windows of the HV properties
+    max_diff_pct_years = (1, 2, 3, 4, 5, 10, 20, 30) # the horizons of max_diff_pct_{year}yr
+
     def __init__(self, ticker=None, ticker_data_dict=None, last_date=None, keep_up_to_date=False, web_scraper=None):
         """
         if keep_up_to_date = True ==> try to download the lastest data so it's as new as today
@@ -1162,40 +1169,85 @@ class Ticker(object):
         else:
             return None
 
+    @property
+    def summary(self):
+        """
+        the precomputed summary of the history (see compute_ticker_summary()), if any and if it is of this very history
+        """
+        from ._summary import history_summary_key
+        summary = getattr(self, 'ticker_data_dict', {}).get('summary')
+        if (summary is not None) and (summary['history'] == history_summary_key(self.ticker_history)):
+            return summary
+        return None
+
     @property
     def fifty_two_weeks_high(self):
+        summary = self.summary
+        if (summary is not None) and ('fifty_two_weeks_high' in summary):
+            return summary['fifty_two_weeks_high']
         history_df = self.ticker_history[['Date','High']]
         history_df = history_df[history_df['Date'] >= (self.last_date - timedelta(weeks=52))]
         return float(history_df['High'].max())
 
     @property
     def fifty_two_weeks_low(self):
+        summary = self.summary
+        if (summary is not None) and ('fifty_two_weeks_low' in summary):
+            return summary['fifty_two_weeks_low']
         history_df = self.ticker_history[['Date','Low']]
         history_df = history_df[history_df['Date'] >= (self.last_date - timedelta(weeks=52))]
         return float(history_df['Low'].min())
 
     def days_to_double(self, ticker_history: pd.DataFrame = None, days=None):
+        """
+        mean, std and count of the calendar days from each day's Low to the first High at least twice as high, over the last days
+        (the days without such a High are not counted); (None, None, None) if none doubled
+        """
         if days is None:
             raise ValueError('days cannot be None')
-        if ticker_history is None:
-            ticker_history = self.ticker_history
-        history_df = ticker_history[['Date','High','Low']]
-        last_date = ticker_history['Date'].iloc[-1]
-        history_df = history_df[history_df['Date'] >= (last_date - timedelta(days=days))]
-        days = []
-        for this_date in history_df['Date'].tolist():
-            this_date_low = float(history_df[history_df['Date'] == this_date]['Low'])
-            subsequent_double = history_df[(history_df['Date'] >= this_date) & (history_df['High'] >= this_date_low*2)]
-            if subsequent_double['Date'].size > 0:
-                subsequent_double_date = subsequent_double['Date'].iloc[0]
-                #print(this_date, subsequent_double_date, this_date_low, subsequent_double['High'].iloc[0])
-                days.append( (subsequent_double_date - this_date).days )
+        days = self.days_to_double_distribution(ticker_history=ticker_history, days=days)['days_to_double'].dropna().to_numpy()
         if len(days)>0:
             arr = np.array(days)
             return int(np.mean(arr,axis=0)), int(np.std(arr,axis=0)), arr.size
         else:
             return None, None, None
 
+    def days_to_double_distribution(self, ticker_history: pd.DataFrame = None, days=None, multiple=2):
+        """
+        per day of the last days: Date, Low, double_date (the first date on or after it with High >= multiple x Low) and
+        days_to_double (calendar days to double_date), NaT/NaN if the price has not reached it
+
+        O(n log n): a sparse table of range maxima of High, max(High[idx:idx+2**k]), over which every day jumps at once, by
+        decreasing powers of two, past the blocks whose max stays below its threshold; the next bar is then the first to reach it
+        """
+        if days is None:
+            raise ValueError('days cannot be None')
+        if ticker_history is None:
+            ticker_history = self.ticker_history
+        history_df = ticker_history[['Date','High','Low']]
+        if len(history_df.index) > 0:
+            last_date = ticker_history['Date'].iloc[-1]
+            history_df = history_df[history_df['Date'] >= (last_date - timedelta(days=days))]
+        history_df = history_df.reset_index(drop=True)
+        high = history_df['High'].to_numpy(dtype=float)
+        high = np.where(np.isnan(high), -np.inf, high) # a missing High never reaches the threshold
+        threshold = multiple * history_df['Low'].to_numpy(dtype=float)
+        n_days = high.shape[0]
+        range_max = [high] # range_max[k][idx] = max(high[idx:idx+2**k])
+        while 2**len(range_max) <= n_days:
+            previous, width = range_max[-1], 2**(len(range_max)-1)
+            range_max.append(np.maximum(previous[:-width], previous[width:]))
+        idx = np.arange(n_days)
+        for k in range(len(range_max)-1, -1, -1):
+            in_range = idx + 2**k <= n_days
+            below = np.zeros(shape=n_days, dtype=bool)
+            below[in_range] = range_max[k][idx[in_range]] < threshold[in_range]
+            idx[below] += 2**k
+        found = idx < n_days
+        found[found] = high[idx[found]] >= threshold[found] # False for a NaN Low
+        double_date = history_df['Date'].iloc[np.where(found, idx, 0)].reset_index(drop=True).where(found)
+        return pd.DataFrame({'Date': history_df['Date'], 'Low': history_df['Low'], 'double_date': double_date, 'days_to_double': (double_date - history_df['Date']).dt.days})
+
     def highest_price_in_the_recent_past(self, days=90):
         if self.ticker_data_dict['history'] is not None:
             history_df = self.ticker_data_dict['history'][['Date','High']]
@@ -1208,35 +1260,46 @@ class Ticker(object):
                 return None
 
     def max_diff_pct(self, ticker_history: pd.DataFrame, days=None):
+        """
+        [low_to_high_max_pct, high_to_low_max_pct] over the last days: the max run-up from a Low to a subsequent (or same-day) High,
+        and the max drawdown from a High to a subsequent (or same-day) Low, in percent
+        """
         #print(f'max_diff_pct, days=[{days}]')
         if days is None:
             raise ValueError('days cannot be None')
-        history_df = ticker_history[['Date','High','Low']]
-        if len(history_df.index) == 0:
-            return [None, None]
+        return self.max_diff_pct_horizons(ticker_history=ticker_history, days_list=[days])[0]
+
+    def max_diff_pct_horizons(self, ticker_history: pd.DataFrame, days_list):
+        """
+        max_diff_pct() for each of days_list, in one O(n) pass over the history:
+        the highest High (lowest Low) from each bar on is a suffix max (min), hence the run-up (drawdown) from each bar, and the best
+        of these from each bar on is again a suffix max (min), read at the first bar of each horizon
+        returns [[low_to_high_max_pct, high_to_low_max_pct] for days in days_list]
+        """
+        if len(ticker_history.index) == 0:
+            return [[None, None] for _ in days_list]
+        high = ticker_history['High'].to_numpy(dtype=float)
+        low = ticker_history['Low'].to_numpy(dtype=float)
+        # fmax/fmin skip NaN, as pandas' max()/min() do
+        with np.errstate(divide='ignore', invalid='ignore'):
+            low_to_high_pct = 100 * (np.fmax.accumulate(high[::-1])[::-1] - low) / low
+            high_to_low_pct = 100 * (np.fmin.accumulate(low[::-1])[::-1] - high) / high
+        low_to_high_max_pct = np.fmax.accumulate(low_to_high_pct[::-1])[::-1]
+        high_to_low_max_pct = np.fmin.accumulate(high_to_low_pct[::-1])[::-1]
         last_date = ticker_history['Date'].iloc[-1]
-        history_df = history_df[history_df['Date'] >= (last_date - timedelta(days=days))]
-        low_to_high_max_pct = high_to_low_max_pct = 0
-        for this_date in history_df['Date'].tolist():
-            #
-            this_date_high_value = history_df[history_df['Date'] == this_date]['High']
-            this_date_high = float(this_date_high_value)
-            subsequent_lowest = float(history_df[history_df['Date'] >= this_date]['Low'].min())
-            high_to_low_pct = 100 * (subsequent_lowest - this_date_high) / this_date_high
-            if high_to_low_pct < high_to_low_max_pct:
-                high_to_low_max_pct = high_to_low_pct
-            #
-            this_date_low_value = history_df[history_df['Date'] == this_date]['Low']
-            this_date_low = float(this_date_low_value)
-            subsequent_highest = float(history_df[history_df['Date'] >= this_date]['High'].max())
-            low_to_high_pct = 100 * (subsequent_highest - this_date_low) / this_date_low
-            if low_to_high_pct > low_to_high_max_pct:
-                low_to_high_max_pct = low_to_high_pct
-        return [low_to_high_max_pct, high_to_low_max_pct]
+        results = []
+        for days in days_list:
+            first_idx = ticker_history['Date'].searchsorted(last_date - timedelta(days=days), side='left')
+            low_to_high, high_to_low = float(low_to_high_max_pct[first_idx]), float(high_to_low_max_pct[first_idx])
+            results.append([low_to_high if low_to_high > 0 else 0, high_to_low if high_to_low < 0 else 0]) # 0 if no run-up (drawdown)
+        return results
 
     def max_diff_pct_year_n(self, year_n=None):
         if year_n is None:
             raise ValueError('year_n cannot be None')
+        summary = self.summary
+        if (summary is not None) and (str(year_n) in summary.get('max_diff_pct', {})): # the info dict's keys are of its last download, the summary of the current history
+            return summary['max_diff_pct'][str(year_n)]
         key = f"max_diff_pct_{year_n}yr"
         if (key in self.ticker_data_dict.keys()) and (self.ticker_data_dict[key] is not None):
             return self.ticker_data_dict[key]
@@ -1282,12 +1345,22 @@ class Ticker(object):
         return self.ticker_history['Close'].iloc[-1]
 
     def all_time_highs_df(self, n=3):
-        highs_df = self.ticker_history[['Date', 'High']]
-        return highs_df.sort_values(by=['High'], ascending=False).head(n=n)
+        summary = self.summary
+        if (summary is not None) and ('all_time_highs' in summary) and (n <= summary['n_extremes']):
+            return self._extremes_df(summary['all_time_highs'][:n], 'High')
+        return self.ticker_history[['Date', 'High']].nlargest(n, 'High') # a partial sort
 
     def all_time_lows_df(self, n=3):
-        lows_df = self.ticker_history[['Date', 'Low']]
-        return lows_df.sort_values(by=['Low'], ascending=True).head(n=n)
+        summary = self.summary
+        if (summary is not None) and ('all_time_lows' in summary) and (n <= summary['n_extremes']):
+            return self._extremes_df(summary['all_time_lows'][:n], 'Low')
+        return self.ticker_history[['Date', 'Low']].nsmallest(n, 'Low')
+
+    @staticmethod
+    def _extremes_df(extremes, price_name):
+        extremes_df = pd.DataFrame(extremes, columns=['Date', price_name])
+        extremes_df['Date'] = pd.to_datetime(extremes_df['Date'], utc=True)
+        return extremes_df
 
     def nearest_actual_date(self, target_datetime):
         idx = min( self.ticker_history['Date'].searchsorted(target_datetime), len(self.ticker_history) - 1 )
@@ -1418,6 +1491,9 @@ class Ticker(object):
 
     @property
     def last_1yr_dividends_pct(self):
+        summary = self.summary
+        if (summary is not None) and ('last_1yr_dividends_pct' in summary):
+            return summary['last_1yr_dividends_pct']
         if self.pay_dividends:
             if 'trailingAnnualDividendYield' in self.ticker_info.keys() and self.ticker_info['trailingAnnualDividendYield'] is not None:
                 return self.ticker_info['trailingAnnualDividendYield'] * 100
@@ -1529,22 +1605,30 @@ class Ticker(object):
     @property
     def RSI(self):
         from ._indicator import momentum_indicator
-        return momentum_indicator().RSI(close_price = self.ticker_history['Close'])
+        from ._cache import global_indicator_cache
+        return global_indicator_cache.get_or_compute(self.ticker, self.ticker_history, 'RSI', lambda: momentum_indicator().RSI(close_price = self.ticker_history['Close'], RSI_periods = 14), RSI_periods = 14)
 
     @property
     def ADX(self):
         from ._indicator import trend_indicator
-        return trend_indicator().ADX(high_price = self.ticker_history['High'], low_price = self.ticker_history['Low'], close_price = self.ticker_history['Close'])
+        from ._cache import global_indicator_cache
+        return global_indicator_cache.get_or_compute(self.ticker, self.ticker_history, 'ADX', lambda: trend_indicator().ADX(high_price = self.ticker_history['High'], low_price = self.ticker_history['Low'], close_price = self.ticker_history['Close'], ADX_smoothing_len = 14, DI_len = 14), ADX_smoothing_len = 14, DI_len = 14)
+
+    def _curr_trend(self, short: bool = False):
+        from ._indicator import trend_indicator
+        from ._cache import global_indicator_cache
+        if len(self.ticker_history) <= 2:
+            return None
+        adx, plus, minus, adx14, plus14, minus14, slope_code, strength_code, direction_code = global_indicator_cache.get_or_compute(self.ticker, self.ticker_history, 'ADX_codes', lambda: trend_indicator().ADX_codes(high_price = self.ticker_history['High'], low_price = self.ticker_history['Low'], close_price = self.ticker_history['Close'], ADX_smoothing_len = 14, DI_len = 14), ADX_smoothing_len = 14, DI_len = 14)
+        return trend_indicator().trend_labels(slope_code[-1:], strength_code[-1:], direction_code[-1:], short=short)[0] # only the last label is built
 
     @property
     def curr_trend(self):
-        adx, plus, minus, adx14, plus14, minus14, trend, trend_short = self.ADX
-        return trend[-1]
+        return self._curr_trend()
 
     @property
     def curr_trend_short(self):
-        adx, plus, minus, adx14, plus14, minus14, trend, trend_short = self.ADX
-        return trend_short[-1]
+        return self._curr_trend(short=True)
 
     def standard_deviation_of_price(self, periods = 252, price_name = 'Close'):
         prices = self.ticker_history[price_name][-periods:]
@@ -1572,11 +1656,35 @@ class Ticker(object):
         #    return np.std(interday_returns[-periods:]) * (252**0.5)
         #else:
         #    return None
-        interday_returns_df = self.daily_log_returns_df
-        if interday_returns_df.shape[0] >= (periods+1):
-            return np.std(interday_returns_df['log_returns'][-periods:]) * (252**0.5)
-        else:
+        summary = self.summary
+        if (summary is not None) and (str(periods) in summary.get('HV', {})):
+            return summary['HV'][str(periods)]
+        # the last value of the term structure; HV10, HV20, HV21, HV30 and HV60 share the one of HV_periods
+        HV = self.historical_volatility_term_structure(periods = self.HV_periods if periods in self.HV_periods else (periods,))[f"HV{periods}"]
+        if (HV.shape[0] == 0) or np.isnan(HV.iloc[-1]):
             return None
+        return float(HV.iloc[-1])
+
+    def historical_volatility_term_structure(self, periods = None):
+        """
+        annualized historical volatility as time series, one column HV{period} per period (by default HV_periods), next to Date (from the second bar);
+        the value on a date is historical_volatility(period) of the history up to that date, i.e., NaN until more than period log returns are available
+
+        the daily log returns are computed once for all the periods, and the result is cached per history
+        """
+        from ._indicator import _rolling_mean_var
+        from ._cache import global_indicator_cache
+        periods = self.HV_periods if periods is None else tuple(int(period) for period in np.atleast_1d(periods))
+        def _term_structure():
+            close = self.ticker_history['Close'].to_numpy(dtype=float)
+            log_returns = np.log(close[1:] / close[:-1])
+            HV_df = pd.DataFrame({'Date': self.ticker_history['Date'].iloc[1:].reset_index(drop=True)})
+            for period in periods:
+                _, rolling_var = _rolling_mean_var(log_returns, window = period)
+                rolling_var[:period] = np.nan # as historical_volatility(), which requires periods+1 log returns
+                HV_df[f"HV{period}"] = np.sqrt(rolling_var) * (252**0.5)
+            return HV_df
+        return global_indicator_cache.get_or_compute(self.ticker, self.ticker_history, 'HV', _term_structure, periods = periods)
     
     @property
     def HV10(self):
@@ -39,7 +39,7 @@ from matplotlib.ticker import MultipleLocator, LogLocator, MaxNLocator
 
 from datetime import date, datetime, timedelta, timezone
 
-from ..data import Ticker, get_ticker_data_dict, get_formatted_ticker_data, volatility_indicator, momentum_indicator, trend_indicator, volume_indicator, moving_average, ticker_group_dict, subgroup_group_dict, ticker_subgroup_dict, group_desc_dict, global_data_root_dir, nasdaqlisted_df, otherlisted_df, tickers_with_no_volume, ARK_df_dict
+from ..data import Ticker, get_ticker_data_dict, download_tickers, download_scheduler, get_formatted_ticker_data, volatility_indicator, momentum_indicator, trend_indicator, volume_indicator, moving_average, indicator_pipeline, global_indicator_cache, ticker_group_dict, subgroup_group_dict, ticker_subgroup_dict, group_desc_dict, global_data_root_dir, nasdaqlisted_df, otherlisted_df, tickers_with_no_volume, ARK_df_dict
 from ..math_and_stats import Locally_Weighted_Scatterplot_Smoothing, Cubic_Spline_Approximation_Smoothing
 
 import numpy as np
@@ -503,25 +503,30 @@ class preferences_dialog(QDialog):
 # reference: https://pythonpyqt.com/pyqt-progressbar/
 class ticker_download_thread(QThread):
     _signal = Signal(int, str)
+    n_workers = 4 # tickers downloaded concurrently, rate limited per host by the download scheduler
     def __init__(self, app_window=None, smart_redownload=None, tickers_to_download=[], ascending=True):
         super().__init__()
         self.app_window = app_window
         self.smart_redownload = smart_redownload
         self.tickers_to_download = tickers_to_download
         self.ascending = ascending
+        self.scheduler = download_scheduler(n_workers=self.n_workers, progress_callback=self._progress)
+
+    def _progress(self, n_finished: int, n_tickers: int, task):
+        if task.status == 'failed':
+            print(f"Warning: Unable to download this ticker = {task.name}")
+        self._signal.emit(n_finished, task.name)
+
+    def cancel(self):
+        self.scheduler.cancel()
 
     def run(self):
         if self.ascending:
             tickers_to_download = self.tickers_to_download
         else:
             tickers_to_download = self.tickers_to_download[::-1]
-        for idx, ticker in enumerate(tickers_to_download):
-            try:
-                #time.sleep(0.001)
-                get_ticker_data_dict(ticker = ticker, force_redownload = True, smart_redownload = self.smart_redownload, download_today_data = self.app_window.app_menu.preferences_dialog.download_today_data, data_root_dir = self.app_window.app_menu.preferences_dialog.data_root_dir, auto_retry = True, web_scraper = self.app_window.web_scraper, download_short_interest = self.app_window.app_menu.preferences_dialog.download_short_interest)
-            except:
-                print(f"Warning: Unable to download this ticker = {ticker}")
-            self._signal.emit(idx+1, ticker)
+        download_tickers(tickers_to_download, scheduler = self.scheduler, force_redownload = True, smart_redownload = self.smart_redownload, download_today_data = self.app_window.app_menu.preferences_dialog.download_today_data, data_root_dir = self.app_window.app_menu.preferences_dialog.data_root_dir, auto_retry = True, web_scraper = self.app_window.web_scraper, download_short_interest = self.app_window.app_menu.preferences_dialog.download_short_interest)
+        self.scheduler.shutdown()
 
 
 class ticker_analyze_for_dividends_thread(QThread):
@@ -771,6 +776,10 @@ class download_data_dialog(QDialog):
         self.checkbox_smart_redownload.setEnabled(True)
 
     def _close_button_clicked(self):
+        if (getattr(self, 'thread1', None) is not None) and self.thread1.isRunning() and (self.download_progressbar.value() < self.n_tickers):
+            self.thread1.cancel() # the pending tickers are skipped, the running ones stop at their next request
+            self.close_button.setEnabled(False)
+            return
         self._reset()
         self.hide()
 
@@ -779,7 +788,7 @@ class download_data_dialog(QDialog):
             #
             self.checkbox_smart_redownload.setEnabled(False)
             self.download_button.setEnabled(False)
-            self.close_button.setEnabled(False)
+            self.close_button.setText('Cancel the download')
             #
             self.download_button.setDefault(False)
             self.download_button.repaint()
@@ -797,7 +806,7 @@ class download_data_dialog(QDialog):
         self.download_progressbar.setValue(idx)
         #time.sleep(0.003)
         if idx == self.n_tickers:
-            self.close_button.setText('Download completed. Return to App')
+            self.close_button.setText('Download cancelled. Return to App' if any(task.cancelled for task in self.thread1.scheduler.tasks) else 'Download completed. Return to App')
             #
             #self.checkbox_smart_redownload.setEnabled(True)
             #self.download_button.setEnabled(True)
@@ -1615,7 +1624,7 @@ class UI_control(object):
 
         elif self._index_selected == 'PVI and NVI':
             canvas.axes.set_ylabel('PVI (green) and NVI (orange) (EMA9, 255)', fontsize=10.0)
-            if all(v is None for v in self.ticker_data_dict_in_effect['history']['PVI_EMA9']):
+            if self.ticker_data_dict_in_effect['history']['PVI_EMA9'].isnull().all():
                 canvas.draw()
                 return
             # to skip non-existent dates on the plot
@@ -2083,13 +2092,42 @@ class UI_control(object):
             self._draw_ticker_canvas()
             self._draw_index_canvas()
 
+    def _cached_index(self, indicator: str, compute, **params):
+        return global_indicator_cache.get_or_compute(self.selected_ticker, self.ticker_data_dict_original['history'], indicator, compute, **params)
+
+    @staticmethod
+    def _index_pipeline():
+        pipeline = indicator_pipeline()
+        close = pipeline.column('Close')
+        pipeline.output(['PVI','NVI','PVI_EMA9','NVI_EMA9','PVI_EMA255','NVI_EMA255'], pipeline.PVI_NVI(short_periods=9, long_periods=255))
+        pipeline.output('RSI14', pipeline.RSI(RSI_periods=14)[0])
+        pipeline.output(['ADX', 'DMI+', 'DMI-', 'ADX14', 'DMI+14', 'DMI-14', 'trend', 'trend_short'], pipeline.ADX(ADX_smoothing_len=14, DI_len=14))
+        pipeline.output(['MACD_macd','MACD_signal','MACD_histogram'], pipeline.MACD(fast_period=12, slow_period=26, signal_period=9))
+        pipeline.output(['PPO_ppo','PPO_signal','PPO_histogram'], pipeline.PPO(fast_period=12, slow_period=26, signal_period=9)) # shares the EMA12/EMA26 of MACD
+        OBV = pipeline.OBV()[0]
+        pipeline.output(['OBV', 'OBV_EMA9', 'OBV_EMA255'], [OBV, pipeline.EMA(OBV, 9), pipeline.EMA(OBV, 255)])
+        Z_price_vol = pipeline.Z_price_vol()[0]
+        pipeline.output(['Z_price_vol','Z_price_vol_EMA9','Z_price_vol_EMA255'], [Z_price_vol, pipeline.EMA(Z_price_vol, 9), pipeline.EMA(Z_price_vol, 255)])
+        pipeline.output(['Accumulation_Distribution', 'Accumulation_Distribution_Zscore'], pipeline.accumulation_distribution())
+        pipeline.output('Money_Flow', pipeline.money_flow(periods=14)[0])
+        pipeline.output(['Close_EMA9', 'Close_EMA255'], [pipeline.EMA(close, 9), pipeline.EMA(close, 255)])
+        pipeline.output(['BB_st_MA', 'BB_st_BOLU', 'BB_st_BOLD'], pipeline.Bollinger_Band(n_smoothing_days = 10, n_std_dev = 1.5))
+        pipeline.output(['BB_mt_MA', 'BB_mt_BOLU', 'BB_mt_BOLD'], pipeline.Bollinger_Band(n_smoothing_days = 20, n_std_dev = 2))
+        pipeline.output(['BB_lt_MA', 'BB_lt_BOLU', 'BB_lt_BOLD'], pipeline.Bollinger_Band(n_smoothing_days = 50, n_std_dev = 2.5))
+        return pipeline
+
     def _calc_index(self):
         history_df = self.ticker_data_dict_in_effect['history']
         history_all_df = self.ticker_data_dict_original['history']
+        # the indicators are computed over the whole history and cached, so a change of timeframe or last date only costs a slice
+        in_effect = history_all_df['Date'].isin(history_df['Date'])
+        # all the indicators are evaluated in one pass, with the shared intermediates (EMAs of Close, True Range, typical price) computed once
+        index_dict = self._cached_index('index_pipeline', lambda: self._index_pipeline().run(history_all_df))
+        for column, values in index_dict.items():
+            history_all_df[column] = values
         ######################
         # positive volume index and negative volume index
-        history_all_df['PVI'], history_all_df['NVI'], history_all_df['PVI_EMA9'], history_all_df['NVI_EMA9'], history_all_df['PVI_EMA255'], history_all_df['NVI_EMA255'] = volume_indicator(short_periods=9, long_periods=255).PVI_NVI(history_all_df['Close'], history_all_df['Volume'])
-        history_df[['PVI','NVI','PVI_EMA9','NVI_EMA9','PVI_EMA255','NVI_EMA255']] = history_all_df[history_all_df['Date'].isin(history_df['Date'])][['PVI','NVI','PVI_EMA9','NVI_EMA9','PVI_EMA255','NVI_EMA255']]
+        history_df[['PVI','NVI','PVI_EMA9','NVI_EMA9','PVI_EMA255','NVI_EMA255']] = history_all_df[in_effect][['PVI','NVI','PVI_EMA9','NVI_EMA9','PVI_EMA255','NVI_EMA255']]
         if history_df[['PVI','PVI_EMA9','PVI_EMA255']].isnull().any(axis=None):
             PVI_max = PVI_min = NVI_max = NVI_min = None
         else:
@@ -2102,45 +2140,11 @@ class UI_control(object):
             # this is to keep NVI indexes between 0 and 1000
             history_df[['NVI','NVI_EMA9','NVI_EMA255']] = (history_df[['NVI','NVI_EMA9','NVI_EMA255']] - NVI_min) / (NVI_max - NVI_min) * 1000
         ######################
-        history_all_df['RSI14'] = momentum_indicator().RSI(close_price=history_all_df['Close'], RSI_periods=14)
-        history_df['RSI14'] = history_all_df[history_all_df['Date'].isin(history_df['Date'])]['RSI14']
-        ######################
-        history_all_df['ADX'], history_all_df['DMI+'], history_all_df['DMI-'], history_all_df['ADX14'], history_all_df['DMI+14'], history_all_df['DMI-14'], history_all_df['trend'], history_all_df['trend_short'] = trend_indicator().ADX(high_price=history_all_df['High'], low_price=history_all_df['Low'], close_price=history_all_df['Close'])
-        history_df[['ADX', 'DMI+', 'DMI-', 'ADX14', 'DMI+14', 'DMI-14', 'trend', 'trend_short']] = history_all_df[history_all_df['Date'].isin(history_df['Date'])][['ADX', 'DMI+', 'DMI-', 'ADX14', 'DMI+14', 'DMI-14', 'trend', 'trend_short']].fillna(method='backfill')      
-        ######################
-        history_all_df['MACD_macd'], history_all_df['MACD_signal'], history_all_df['MACD_histogram'] = momentum_indicator().MACD(close_price=history_all_df['Close'], fast_period=12, slow_period=26, signal_period=9)
-        history_df[['MACD_macd','MACD_signal','MACD_histogram']] = history_all_df[history_all_df['Date'].isin(history_df['Date'])][['MACD_macd','MACD_signal','MACD_histogram']]
+        ADX_columns = ['ADX', 'DMI+', 'DMI-', 'ADX14', 'DMI+14', 'DMI-14', 'trend', 'trend_short']
+        history_df[ADX_columns] = history_all_df[in_effect][ADX_columns].fillna(method='backfill')
         ######################
-        history_all_df['PPO_ppo'], history_all_df['PPO_signal'], history_all_df['PPO_histogram'] = momentum_indicator().PPO(close_price=history_all_df['Close'], fast_period=12, slow_period=26, signal_period=9)
-        history_df[['PPO_ppo','PPO_signal','PPO_histogram']] = history_all_df[history_all_df['Date'].isin(history_df['Date'])][['PPO_ppo','PPO_signal','PPO_histogram']]
-        ######################
-        history_all_df['OBV'] = momentum_indicator().OBV(close_price=history_all_df['Close'], volume=history_all_df['Volume'])
-        history_all_df['OBV_EMA9'] = moving_average(periods=9).exponential(history_all_df['OBV'])
-        history_all_df['OBV_EMA255'] = moving_average(periods=255).exponential(history_all_df['OBV'])
-        history_df[['OBV', 'OBV_EMA9', 'OBV_EMA255']] = history_all_df[history_all_df['Date'].isin(history_df['Date'])][['OBV', 'OBV_EMA9', 'OBV_EMA255']]
-        ######################
-        history_all_df['Z_price_vol'] = momentum_indicator().Z_price_vol(close_price=history_all_df['Close'], volume=history_all_df['Volume'])
-        history_all_df['Z_price_vol_EMA9'] = moving_average(periods=9).exponential(history_all_df['Z_price_vol'])
-        history_all_df['Z_price_vol_EMA255'] = moving_average(periods=255).exponential(history_all_df['Z_price_vol'])
-        history_df[['Z_price_vol','Z_price_vol_EMA9','Z_price_vol_EMA255']] = history_all_df[history_all_df['Date'].isin(history_df['Date'])][['Z_price_vol','Z_price_vol_EMA9','Z_price_vol_EMA255']]
-        ######################
-        history_all_df['Accumulation_Distribution'], history_all_df['Accumulation_Distribution_Zscore'] = volume_indicator().accumulation_distribution(high_price=history_all_df['High'],low_price=history_all_df['Low'],close_price=history_all_df['Close'],volume=history_all_df['Volume'])
-        history_df[['Accumulation_Distribution', 'Accumulation_Distribution_Zscore']] = history_all_df[history_all_df['Date'].isin(history_df['Date'])][['Accumulation_Distribution', 'Accumulation_Distribution_Zscore']]
-        ######################
-        history_all_df['Money_Flow'] = momentum_indicator().money_flow(high_price=history_all_df['High'],low_price=history_all_df['Low'],close_price=history_all_df['Close'],volume=history_all_df['Volume'])
-        history_df['Money_Flow'] = history_all_df[history_all_df['Date'].isin(history_df['Date'])]['Money_Flow']
-        ######################
-        history_all_df['Close_EMA9'], history_all_df['Close_EMA255'] = moving_average(periods=9).exponential(history_all_df['Close']), moving_average(periods=255).exponential(history_all_df['Close'])
-        history_df[['Close_EMA9', 'Close_EMA255']] = history_all_df[history_all_df['Date'].isin(history_df['Date'])][['Close_EMA9', 'Close_EMA255']]
-        ######################
-        history_all_df['BB_st_MA'], history_all_df['BB_st_BOLU'], history_all_df['BB_st_BOLD'] = volatility_indicator().Bollinger_Band(typical_price=history_all_df['Typical'], n_smoothing_days = 10, n_std_dev = 1.5)
-        history_df[['BB_st_MA', 'BB_st_BOLU', 'BB_st_BOLD']] = history_all_df[history_all_df['Date'].isin(history_df['Date'])][['BB_st_MA', 'BB_st_BOLU', 'BB_st_BOLD']]
-        #
-        history_all_df['BB_mt_MA'], history_all_df['BB_mt_BOLU'], history_all_df['BB_mt_BOLD'] = volatility_indicator().Bollinger_Band(typical_price=history_all_df['Typical'], n_smoothing_days = 20, n_std_dev = 2)
-        history_df[['BB_mt_MA', 'BB_mt_BOLU', 'BB_mt_BOLD']] = history_all_df[history_all_df['Date'].isin(history_df['Date'])][['BB_mt_MA', 'BB_mt_BOLU', 'BB_mt_BOLD']]
-        #
-        history_all_df['BB_lt_MA'], history_all_df['BB_lt_BOLU'], history_all_df['BB_lt_BOLD'] = volatility_indicator().Bollinger_Band(typical_price=history_all_df['Typical'], n_smoothing_days = 50, n_std_dev = 2.5)
-        history_df[['BB_lt_MA', 'BB_lt_BOLU', 'BB_lt_BOLD']] = history_all_df[history_all_df['Date'].isin(history_df['Date'])][['BB_lt_MA', 'BB_lt_BOLU', 'BB_lt_BOLD']]
+        other_columns = [column for column in index_dict.keys() if column not in ADX_columns and not column.startswith(('PVI','NVI'))]
+        history_df[other_columns] = history_all_df[in_effect][other_columns]
         ######################
         self.ticker_data_dict_in_effect['history'] = history_df
 
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+"""
+the modules of investment.data are loaded from their files, without running investment/data/__init__.py,
+which downloads the ticker lists on import; so the tests need neither the network nor the data cache
+"""
+
+import importlib.util
+import pathlib
+import sys
+import types
+
+root_dir = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+if 'investment.data' not in sys.modules:
+    _package = types.ModuleType('investment.data')
+    _package.__path__ = [str(root_dir / 'investment' / 'data')]
+    sys.modules['investment.data'] = _package
+
+
+def load_data_module(name: str):
+    """
+    investment.data.<name>, e.g., load_data_module('_indicator')
+    """
+    full_name = f'investment.data.{name}'
+    if full_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(full_name, root_dir / 'investment' / 'data' / f'{name}.py')
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[full_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[full_name]
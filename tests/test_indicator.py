@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+import numpy as np
+import pytest
+
+from conftest import load_data_module
+
+indicator = load_data_module('_indicator')
+
+
+def _money_flow_loop(high_price, low_price, close_price, volume, periods = 14):
+    """
+    the loop of the earlier versions, as the reference
+    """
+    n_periods = close_price.shape[0]
+    typical_price = (high_price + low_price + close_price)/3
+    money_flow = typical_price * volume
+    positive_money_flow = np.zeros(shape=n_periods, dtype=float)
+    negative_money_flow = np.zeros(shape=n_periods, dtype=float)
+    MFI = np.full(shape=n_periods, fill_value=np.nan, dtype=float)
+    for today_idx in range(periods, n_periods):
+        for idx in range(periods):
+            if typical_price[today_idx-idx] > typical_price[today_idx-idx-1]:
+                positive_money_flow[today_idx] += money_flow[today_idx-idx]
+            elif typical_price[today_idx-idx] < typical_price[today_idx-idx-1]:
+                negative_money_flow[today_idx] += money_flow[today_idx-idx]
+        MFI[today_idx] = 100 * positive_money_flow[today_idx] / (positive_money_flow[today_idx]+negative_money_flow[today_idx])
+    return MFI
+
+
+def _ohlcv(n_periods: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    close_price = 100 * np.exp(np.cumsum(0.01 * rng.standard_normal(n_periods)))
+    high_price = close_price * (1 + 0.01 * rng.random(n_periods))
+    low_price = close_price * (1 - 0.01 * rng.random(n_periods))
+    volume = rng.integers(1000, 100000, n_periods).astype(float)
+    return high_price, low_price, close_price, volume
+
+
+@pytest.mark.parametrize('periods', [1, 5, 14])
+def test_money_flow_as_the_loop(periods):
+    high_price, low_price, close_price, volume = _ohlcv(500)
+    MFI = indicator.momentum_indicator().money_flow(high_price, low_price, close_price, volume, periods = periods)
+    np.testing.assert_allclose(MFI, _money_flow_loop(high_price, low_price, close_price, volume, periods = periods), rtol = 1e-10)
+
+
+def test_money_flow_missing_volume_is_local():
+    high_price, low_price, close_price, volume = _ohlcv(3000)
+    volume[[100, 1500, 1501]] = np.nan
+    MFI = indicator.momentum_indicator().money_flow(high_price, low_price, close_price, volume, periods = 14)
+    reference = _money_flow_loop(high_price, low_price, close_price, volume, periods = 14)
+    np.testing.assert_array_equal(np.isnan(MFI), np.isnan(reference))
+    assert np.isnan(reference).sum() < 14 + 3 * 14 + 1 # the warm-up, and only the windows around the missing volumes
+    np.testing.assert_allclose(MFI, reference, rtol = 1e-10)
+
+
+def test_money_flow_panel_as_the_columns():
+    high_price, low_price, close_price, volume = (np.stack(columns, axis=1) for columns in zip(_ohlcv(400, seed = 1), _ohlcv(400, seed = 2)))
+    volume[50, 0] = np.nan
+    MFI = indicator.momentum_indicator().money_flow(high_price, low_price, close_price, volume, periods = 14)
+    for col in range(2):
+        np.testing.assert_allclose(MFI[:, col], _money_flow_loop(high_price[:, col], low_price[:, col], close_price[:, col], volume[:, col]), rtol = 1e-10)
+
+
+def _rolling_reference(data, window):
+    """
+    the rolling mean and (population) variance from the windows themselves, NaN where the window is incomplete or contains NaN
+    """
+    mean = np.full(shape=data.shape, fill_value=np.nan)
+    var = np.full(shape=data.shape, fill_value=np.nan)
+    if data.shape[0] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(data, window)
+        mean[(window-1):], var[(window-1):] = windows.mean(axis=1), windows.var(axis=1)
+    return mean, var
+
+
+def test_sweep_simple_as_moving_average():
+    _, _, close_price, _ = _ohlcv(1000)
+    close_price[[3, 500]] = np.nan
+    periods = list(range(1, 60, 7)) + [999, 1000, 1001]
+    SMA = indicator.indicator_sweep().simple(close_price, periods = periods)
+    for col, window in enumerate(periods):
+        np.testing.assert_allclose(SMA[:, col], indicator.moving_average(periods = window).simple(close_price), rtol = 1e-10)
+
+
+def test_sweep_Bollinger_Band_as_the_single_band():
+    _, _, close_price, _ = _ohlcv(1000)
+    close_price[[3, 500]] = np.nan
+    n_smoothing_days, n_std_dev = [1, 5, 20, 64, 200], [1, 2.5]
+    MA, BOLU, BOLD = indicator.indicator_sweep().Bollinger_Band(close_price, n_smoothing_days = n_smoothing_days, n_std_dev = n_std_dev)
+    assert BOLU.shape == BOLD.shape == (1000, 5, 2)
+    for col, window in enumerate(n_smoothing_days):
+        for k, n_std in enumerate(n_std_dev):
+            single_MA, single_BOLU, single_BOLD = indicator.volatility_indicator().Bollinger_Band(close_price, n_smoothing_days = window, n_std_dev = n_std)
+            np.testing.assert_allclose(MA[:, col], single_MA, rtol = 1e-10)
+            # sigma from the sums of squares of a block (~1e-12 of variance for a price of ~100, even for a one-day window)
+            np.testing.assert_allclose(BOLU[:, col, k], single_BOLU, rtol = 1e-7)
+            np.testing.assert_allclose(BOLD[:, col, k], single_BOLD, rtol = 1e-7)
+
+
+@pytest.mark.parametrize('n_periods', [1, 7, 99, 100, 101, 1000])
+def test_window_mean_var_edges(n_periods):
+    data = _ohlcv(n_periods, seed = n_periods)[2]
+    data[::37] = np.nan
+    windows = [1, 3, 50, 100]
+    mean, var = indicator._window_mean_var(data, windows)
+    for col, window in enumerate(windows):
+        reference_mean, reference_var = _rolling_reference(data, window)
+        np.testing.assert_allclose(mean[:, col], reference_mean, rtol = 1e-10)
+        np.testing.assert_allclose(var[:, col], reference_var, rtol = 1e-8, atol = 1e-12)
+
+
+def test_window_mean_var_on_a_drifting_price():
+    # a price falling from ~1e6 to ~1: a plain cumsum of squares would leave no significant digit in the late variances
+    rng = np.random.default_rng(0)
+    data = 1e6 * np.exp(np.cumsum(-0.0007 + 0.01 * rng.standard_normal(20000)))
+    windows = [10, 20, 50]
+    _, var = indicator._window_mean_var(data, windows)
+    for col, window in enumerate(windows):
+        _, reference_var = _rolling_reference(data, window)
+        np.testing.assert_allclose(np.sqrt(var[:, col]), np.sqrt(reference_var), rtol = 1e-6)
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+import io
+import threading
+import time
+import types
+from datetime import datetime, timedelta, timezone
+from email.message import Message
+from email.utils import format_datetime
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+from conftest import load_data_module
+
+scheduler = load_data_module('_scheduler')
+retry = load_data_module('_retry')
+
+
+class fake_http_error(Exception):
+    """
+    as requests' HTTPError: the status and the headers in error.response
+    """
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"{status_code} Error")
+        self.response = types.SimpleNamespace(status_code=status_code, headers={} if headers is None else headers)
+
+
+def urllib_http_error(code: int, retry_after: str = None):
+    headers = Message()
+    if retry_after is not None:
+        headers['Retry-After'] = retry_after
+    return HTTPError('https://query1.finance.yahoo.com/v8', code, 'error', headers, io.BytesIO())
+
+
+def failing_function(errors: list, result = 'downloaded'):
+    """
+    raises the errors one per call, then returns result; calls counts the calls
+    """
+    def function():
+        function.calls += 1
+        if len(errors) > 0:
+            raise errors.pop(0)
+        return result
+    function.calls = 0
+    return function
+
+
+@pytest.mark.parametrize('error, is_retryable, is_host_failure', [
+    (fake_http_error(429), True, True),
+    (fake_http_error(500), True, True),
+    (fake_http_error(503), True, True),
+    (fake_http_error(408), True, False), # a slow request, not a failing host
+    (fake_http_error(400), False, False),
+    (fake_http_error(404), False, False),
+    (urllib_http_error(429), True, True),
+    (urllib_http_error(403), False, False),
+    (ConnectionResetError(), True, True),
+    (TimeoutError(), True, True),
+    (URLError('connection refused'), True, True),
+    (retry.retryable_error("[AAPL] Too Many Requests"), True, True),
+    (scheduler.download_cancelled(), False, False),
+    (KeyError('regularMarketPrice'), False, False), # e.g., a delisted ticker
+    (ValueError('bad date'), False, False),
+])
+def test_error_classification(error, is_retryable, is_host_failure):
+    policy = retry.retry_policy(seed = 0)
+    assert policy.is_retryable(error) == is_retryable
+    assert policy.is_host_failure(error) == is_host_failure
+
+
+@pytest.mark.parametrize('error, retry_after', [
+    (fake_http_error(429, {'Retry-After': '120'}), 120.0),
+    (fake_http_error(429, {'Retry-After': '1.5'}), 1.5),
+    (fake_http_error(429, {'Retry-After': '-5'}), 0.0),
+    (fake_http_error(429, {'Retry-After': 'soon'}), None),
+    (fake_http_error(429), None),
+    (urllib_http_error(503, retry_after = '30'), 30.0),
+    (urllib_http_error(503), None),
+    (retry.retryable_error("throttled", retry_after = 7), 7),
+    (retry.retryable_error("throttled"), None),
+    (ConnectionResetError(), None),
+])
+def test_retry_after_seconds(error, retry_after):
+    assert retry.retry_after_seconds(error) == retry_after
+
+
+def test_retry_after_http_date():
+    now = datetime.now(timezone.utc)
+    future = fake_http_error(503, {'Retry-After': format_datetime(now + timedelta(seconds=60), usegmt=True)})
+    assert 55 <= retry.retry_after_seconds(future) <= 60
+    past = fake_http_error(503, {'Retry-After': format_datetime(now - timedelta(seconds=60), usegmt=True)})
+    assert retry.retry_after_seconds(past) == 0.0
+
+
+def test_delay_is_seeded_full_jitter():
+    policy, same_policy = [retry.retry_policy(base_delay = 1.0, multiplier = 2.0, max_delay = 10.0, seed = 42) for _ in range(2)]
+    delays = [policy.delay(attempt) for attempt in range(8)]
+    assert delays == [same_policy.delay(attempt) for attempt in range(8)]
+    for attempt, delay in enumerate(delays):
+        assert 0 <= delay <= min(10.0, 2.0**attempt)
+
+
+def test_delay_follows_retry_after_up_to_max_retry_after():
+    policy = retry.retry_policy(max_retry_after = 100.0, seed = 0)
+    assert policy.delay(0, fake_http_error(429, {'Retry-After': '30'})) == 30.0
+    assert policy.delay(0, fake_http_error(429, {'Retry-After': '3600'})) == 100.0
+
+
+def test_breaker_threshold_and_doubling_cooldown():
+    breaker = retry.circuit_breaker(failure_threshold = 3, cooldown = 10.0, max_cooldown = 35.0)
+    assert [breaker.record_failure('yahoo.com') for _ in range(2)] == [0.0, 0.0]
+    assert breaker.pause_seconds('yahoo.com') == 0.0
+    assert breaker.record_failure('yahoo.com') == 10.0 # the threshold
+    assert 9.0 < breaker.pause_seconds('yahoo.com') <= 10.0
+    assert breaker.pause_seconds('ishares.com') == 0.0 # per host
+    assert [breaker.record_failure('yahoo.com') for _ in range(3)] == [20.0, 35.0, 35.0] # doubled, up to max_cooldown
+    breaker.record_success('yahoo.com')
+    assert breaker.pause_seconds('yahoo.com') == 0.0
+    assert [breaker.record_failure('yahoo.com') for _ in range(3)] == [0.0, 0.0, 10.0] # closed again, from the first cooldown
+
+
+def test_call_retries_transient_errors():
+    policy = retry.retry_policy(base_delay = 0.0, seed = 0)
+    function = failing_function([fake_http_error(503), ConnectionResetError()])
+    assert policy.call(function, host = 'yahoo.com', verbose = False) == 'downloaded'
+    assert function.calls == 3
+
+
+def test_call_raises_fatal_errors_at_once():
+    policy = retry.retry_policy(base_delay = 0.0, seed = 0)
+    function = failing_function([fake_http_error(404)])
+    with pytest.raises(fake_http_error):
+        policy.call(function, host = 'yahoo.com', verbose = False)
+    assert function.calls == 1
+    assert policy.breaker.pause_seconds('yahoo.com') == 0.0
+
+
+def test_call_gives_up_after_max_retries():
+    policy = retry.retry_policy(max_retries = 2, base_delay = 0.0, seed = 0)
+    function = failing_function([fake_http_error(503) for _ in range(5)])
+    with pytest.raises(fake_http_error):
+        policy.call(function, verbose = False)
+    assert function.calls == 3
+
+
+def test_call_counts_only_host_failures_toward_the_breaker():
+    breaker = retry.circuit_breaker(failure_threshold = 2, cooldown = 0.05)
+    policy = retry.retry_policy(max_retries = 1, base_delay = 0.0, breaker = breaker, seed = 0)
+    with pytest.raises(fake_http_error):
+        policy.call(failing_function([fake_http_error(408), fake_http_error(408)]), host = 'https://query1.finance.yahoo.com', verbose = False)
+    assert breaker.pause_seconds('yahoo.com') == 0.0
+    with pytest.raises(fake_http_error):
+        policy.call(failing_function([fake_http_error(503), fake_http_error(503)]), host = 'https://query1.finance.yahoo.com', verbose = False)
+    assert breaker.pause_seconds('yahoo.com') > 0 # paused under the host's key
+    start_time = time.monotonic()
+    assert policy.call(failing_function([]), host = 'yahoo.com', verbose = False) == 'downloaded' # after the pause
+    assert time.monotonic() - start_time >= 0.03
+    assert breaker.pause_seconds('yahoo.com') == 0.0
+
+
+def test_cancel_while_waiting_to_retry():
+    policy = retry.retry_policy(seed = 0)
+    started = threading.Event()
+    def download():
+        started.set()
+        raise retry.retryable_error("throttled", retry_after = 100)
+    with scheduler.download_scheduler(n_workers = 1) as download_scheduler:
+        task = download_scheduler.submit(policy.call, download, verbose = False)
+        assert started.wait(10)
+        time.sleep(0.05)
+        task.cancel()
+        assert task.wait(timeout = 5)
+    assert task.status == 'cancelled'
+
+
+@pytest.mark.parametrize('message', [
+    "HTTP Error 429: Too Many Requests",
+    "429 Client Error",
+    "500 Server Error: Internal Server Error",
+    "HTTP Error 503: Service Unavailable",
+    "YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')",
+    "Rate limit exceeded",
+    "ratelimit",
+    "HTTPSConnectionPool(host='query1.finance.yahoo.com', port=443): Read timed out. (read timeout=10)",
+    "('Connection aborted.', RemoteDisconnected('Remote end closed connection without response'))",
+    "Connection reset by peer",
+])
+def test_throttled_pattern_matches(message):
+    assert retry._throttled_pattern.search(message)
+
+
+@pytest.mark.parametrize('message', [
+    "",
+    "No data found, symbol may be delisted",
+    "HTTP Error 404: Not Found",
+    "No timezone found, symbol may be delisted",
+    "1500", # numbers inside longer digit runs
+    "15000",
+    "5000 rows",
+    "4290",
+    "ticker 2429",
+    "period 15003",
+    "Data doesn't exist for startDate = 1500000000, endDate = 1600000000",
+])
+def test_throttled_pattern_does_not_match(message):
+    assert retry._throttled_pattern.search(message) is None
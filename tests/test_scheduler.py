@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+#  Author: Investment Prediction Enthusiast <investment.ml.prediction@gmail.com>
+#
+#  License: LGPL-3.0
+
+import random
+import threading
+import time
+
+import pytest
+
+from conftest import load_data_module
+
+scheduler = load_data_module('_scheduler')
+
+slow_host = 'slow.example.com'
+
+
+@pytest.fixture
+def slow_host_limit():
+    """
+    one request per 100 seconds to slow_host, its only token taken, so the next throttle() waits
+    """
+    scheduler.set_host_rate_limit(slow_host, rate = 0.01, capacity = 1)
+    scheduler.throttle(f"https://{slow_host}/first")
+    yield slow_host
+    scheduler.set_host_rate_limit(slow_host, rate = None)
+
+
+def test_progress_callback_in_order():
+    n_tasks = 200
+    rng = random.Random(0)
+    sleep_seconds = [rng.uniform(0, 0.002) for _ in range(n_tasks)]
+    reported, in_callback, n_concurrent = [], [], []
+    def progress_callback(n_finished, n_submitted, task):
+        in_callback.append(task)
+        n_concurrent.append(len(in_callback))
+        reported.append((n_finished, n_submitted))
+        time.sleep(sleep_seconds[n_finished-1] / 2)
+        in_callback.pop()
+    with scheduler.download_scheduler(n_workers = 8, progress_callback = progress_callback) as download_scheduler:
+        tasks = [download_scheduler.submit(time.sleep, seconds, name = str(idx)) for idx, seconds in enumerate(sleep_seconds)]
+        assert download_scheduler.wait(timeout = 30)
+        assert len(reported) == n_tasks # wait() returns once the progress is reported
+    assert [n_finished for n_finished, _ in reported] == list(range(1, n_tasks+1))
+    assert max(n_concurrent) == 1 # one call at a time
+    n_submitted = [n_submitted for _, n_submitted in reported] # the tasks can finish while others are being submitted
+    assert n_submitted == sorted(n_submitted) and n_submitted[-1] == n_tasks
+    assert all(task.status == 'done' for task in tasks)
+
+
+def test_failing_progress_callback_does_not_stop_the_workers(capsys):
+    def progress_callback(n_finished, n_submitted, task):
+        raise RuntimeError("callback")
+    with scheduler.download_scheduler(n_workers = 2, progress_callback = progress_callback) as download_scheduler:
+        tasks = [download_scheduler.submit(lambda x: x, idx) for idx in range(5)]
+        assert download_scheduler.wait(timeout = 10)
+    assert [task.result for task in tasks] == list(range(5))
+    assert "Warning: the progress callback failed" in capsys.readouterr().out
+
+
+def test_priority_then_submission_order():
+    started = threading.Event()
+    release = threading.Event()
+    def block():
+        started.set()
+        release.wait(10)
+    order = []
+    with scheduler.download_scheduler(n_workers = 1) as download_scheduler:
+        download_scheduler.submit(block)
+        assert started.wait(10) # the others queue behind it
+        for name, priority in [('a', 2), ('b', 0), ('c', 1), ('d', 0)]:
+            download_scheduler.submit(order.append, name, priority = priority)
+        release.set()
+        assert download_scheduler.wait(timeout = 10)
+    assert order == ['b', 'd', 'c', 'a']
+
+
+def test_task_status():
+    def fail():
+        raise KeyError('delisted')
+    with scheduler.download_scheduler(n_workers = 1) as download_scheduler:
+        done = download_scheduler.submit(lambda: 42)
+        failed = download_scheduler.submit(fail)
+        assert download_scheduler.wait(timeout = 10)
+    assert (done.status, done.result) == ('done', 42)
+    assert failed.status == 'failed'
+    assert isinstance(failed.error, KeyError)
+
+
+def test_cancelled_pending_task_is_not_run():
+    started = threading.Event()
+    release = threading.Event()
+    def block():
+        started.set()
+        release.wait(10)
+    ran = []
+    with scheduler.download_scheduler(n_workers = 1) as download_scheduler:
+        download_scheduler.submit(block)
+        assert started.wait(10)
+        pending = download_scheduler.submit(ran.append, 'pending')
+        pending.cancel()
+        release.set()
+        assert download_scheduler.wait(timeout = 10)
+    assert pending.status == 'cancelled'
+    assert ran == []
+
+
+def test_cancel_during_throttle(slow_host_limit):
+    started = threading.Event()
+    def download():
+        started.set()
+        scheduler.throttle(f"https://{slow_host_limit}/data") # waits ~100 seconds for a token
+        return 'downloaded'
+    with scheduler.download_scheduler(n_workers = 1) as download_scheduler:
+        task = download_scheduler.submit(download)
+        assert started.wait(10)
+        time.sleep(0.05)
+        start_time = time.monotonic()
+        task.cancel()
+        assert task.wait(timeout = 5)
+    assert time.monotonic() - start_time < 5
+    assert task.status == 'cancelled'
+    assert task.result is None
+
+
+def test_cancel_during_throttle_of_the_task_host(slow_host_limit):
+    with scheduler.download_scheduler(n_workers = 1) as download_scheduler:
+        task = download_scheduler.submit(lambda: 'downloaded', host = f"https://{slow_host_limit}/data")
+        time.sleep(0.05)
+        task.cancel()
+        assert task.wait(timeout = 5)
+    assert task.status == 'cancelled'
+
+
+def test_throttle_with_a_set_cancel_event(slow_host_limit):
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(scheduler.download_cancelled):
+        scheduler.throttle(slow_host_limit, cancel_event = cancel_event)
+
+
+def test_throttle_without_limit_does_not_wait():
+    cancel_event = threading.Event()
+    cancel_event.set()
+    scheduler.throttle('https://no-limit.example.org/data', cancel_event = cancel_event) # no bucket, so no wait to cancel
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = scheduler.token_bucket(rate = 1000, capacity = 3)
+    start_time = time.monotonic()
+    for _ in range(3 + 20):
+        assert bucket.acquire()
+    assert time.monotonic() - start_time >= 0.015 # the burst of 3, then 20 at 1000 per second
+    with pytest.raises(ValueError):
+        scheduler.token_bucket(rate = 0)
+
+
+def test_host_key():
+    assert scheduler._host_key('https://query1.finance.yahoo.com/v8/finance/chart/AAPL') == 'yahoo.com'
+    assert scheduler._host_key('YAHOO.COM') == 'yahoo.com'
+    assert scheduler._host_key('https://notyahoo.com/') is None
+    assert scheduler._host_key('example.org') is None
+
+
+def test_submit_after_shutdown():
+    download_scheduler = scheduler.download_scheduler(n_workers = 1)
+    download_scheduler.shutdown()
+    with pytest.raises(RuntimeError):
+        download_scheduler.submit(lambda: None)